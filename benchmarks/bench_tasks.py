@@ -0,0 +1,360 @@
+"""
+Benchmarks of the hot paths in src/tasks.py on seeded synthetic task lists.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tasks --sizes 1000 100000 --save baseline.json
+    python -m benchmarks.bench_tasks --sizes 1000 100000 --compare baseline.json
+
+Comparing exits with status 1 if any benchmark got slower or used more peak
+memory than its baseline by more than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from src.shard_store import load_tasks_sharded, save_tasks_sharded, shutdown_process_pool
+from src.task_store import TaskStore
+from src.tasks import (
+    add_task,
+    export_to_csv_bytes,
+    filter_tasks_by_category,
+    filter_tasks_by_completion,
+    filter_tasks_by_priority,
+    get_overdue_tasks,
+    get_paginated_tasks,
+    load_tasks,
+    query_tasks,
+    save_tasks,
+    search_tasks,
+)
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+
+# Allowed slowdown or memory growth over the baseline before a run fails, 0.25 being 25%
+DEFAULT_TOLERANCE = 0.25
+
+# Timings below this many seconds are compared as if they took this long, as
+# they are mostly noise
+MIN_COMPARED_SECONDS = 0.001
+
+PRIORITIES = ("High", "Medium", "Low")
+CATEGORIES = ("Work", "Personal", "School", "Other")
+WORDS = (
+    "report", "meeting", "groceries", "exam", "invoice", "review", "gym",
+    "call", "budget", "essay", "deploy", "email", "plan", "clean", "read",
+)
+
+
+def generate_tasks(count, seed=0):
+    """
+    Generate a reproducible list of realistic tasks.
+
+    Args:
+        count (int): Number of tasks to generate
+        seed (int): Random seed; the same seed always gives the same tasks
+
+    Returns:
+        list: List of task dictionaries with IDs 1 to count
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    tasks = []
+    for task_id in range(1, count + 1):
+        created = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        tasks.append(
+            {
+                "id": task_id,
+                "title": " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize(),
+                "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 12))),
+                "priority": rng.choice(PRIORITIES),
+                "category": rng.choice(CATEGORIES),
+                "due_date": (created + timedelta(days=rng.randint(0, 90))).strftime("%Y-%m-%d"),
+                "completed": rng.random() < 0.3,
+                "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+    return tasks
+
+
+def _bench_load_tasks(tasks, work_dir):
+    file_path = os.path.join(work_dir, "load.json")
+    save_tasks(tasks, file_path)
+    return lambda: load_tasks(file_path)
+
+
+def _bench_binary_load_tasks(tasks, work_dir):
+    file_path = os.path.join(work_dir, "load.tbin")
+    save_tasks(tasks, file_path)
+    return lambda: load_tasks(file_path)
+
+
+def _bench_binary_get_task(tasks, work_dir):
+    from src.binary_store import get_binary_task
+
+    file_path = os.path.join(work_dir, "get.tbin")
+    save_tasks(tasks, file_path)
+    return lambda: get_binary_task(file_path, len(tasks) // 2)
+
+
+def _bench_record_toggle(tasks, work_dir):
+    from src.record_store import update_task_record
+
+    file_path = os.path.join(work_dir, "toggle.trec")
+    save_tasks(sorted(tasks, key=lambda task: task["id"]), file_path)
+    task_id = tasks[len(tasks) // 2]["id"]
+    completed = [False]
+
+    def run():
+        completed[0] = not completed[0]
+        return update_task_record(task_id, {"completed": completed[0]}, file_path)
+
+    return run
+
+
+def _bench_save_tasks(tasks, work_dir):
+    file_path = os.path.join(work_dir, "save.json")
+    return lambda: save_tasks(tasks, file_path)
+
+
+def _bench_add_task(tasks, work_dir):
+    return lambda: add_task(tasks, "Title", "Description", "High", "Work", "2024-01-01")
+
+
+def _bench_store_add_task(tasks, work_dir):
+    store = TaskStore(tasks)
+    # Deletes the added task again, so repeated runs see the same store
+    return lambda: store.delete(
+        add_task(store, "Title", "Description", "High", "Work", "2024-01-01").next_id - 1
+    )
+
+
+def _bench_search_tasks(tasks, work_dir):
+    return lambda: search_tasks(tasks, "budget")
+
+
+def _bench_store_search_tasks(tasks, work_dir):
+    store = TaskStore(tasks)
+    return lambda: search_tasks(store, "budget")
+
+
+def _bench_store_filter_tasks_by_category(tasks, work_dir):
+    store = TaskStore(tasks)
+    return lambda: filter_tasks_by_category(store, "Work")
+
+
+def _bench_paginate(tasks, work_dir):
+    return lambda: get_paginated_tasks(len(tasks) // 20 + 1, tasks, 10)
+
+
+def _bench_query_page(tasks, work_dir):
+    return lambda: query_tasks(tasks, category="Work", completed=False, sort_by="due_date", limit=10)
+
+
+def _bench_store_query_page(tasks, work_dir):
+    store = TaskStore(tasks)
+    return lambda: query_tasks(store, category="Work", completed=False, limit=10, offset=100)
+
+
+def _bench_columnar(function, *args):
+    # End to end calls on a ColumnarTasks, which hand back the matches as another one
+    def setup(tasks, work_dir):
+        from src.columnar import ColumnarTasks  # Needs NumPy
+
+        columnar = ColumnarTasks.from_dicts(tasks)
+        return lambda: function(columnar, *args)
+
+    return setup
+
+
+def _bench_sharded_load(parallel):
+    def setup(tasks, work_dir):
+        manifest_path = os.path.join(work_dir, "load_sharded.json")
+        save_tasks_sharded(tasks, manifest_path, partition="id")
+        return lambda: load_tasks_sharded(manifest_path, parallel=parallel)
+
+    return setup
+
+
+def _bench_sharded_save(changed):
+    # Saves after toggling one task, with or without saying which one changed
+    def setup(tasks, work_dir):
+        manifest_path = os.path.join(work_dir, f"save_sharded_{changed}.json")
+        tasks = list(tasks)
+        save_tasks_sharded(tasks, manifest_path, partition="id")
+
+        def run():
+            tasks[0] = {**tasks[0], "completed": not tasks[0]["completed"]}
+            changed_ids = [tasks[0]["id"]] if changed else None
+            return save_tasks_sharded(tasks, manifest_path, changed_ids=changed_ids)
+
+        return run
+
+    return setup
+
+
+# Benchmark name -> function of (tasks, scratch directory) returning the callable to time
+BENCHMARKS = {
+    "load_tasks": _bench_load_tasks,
+    "binary_load_tasks": _bench_binary_load_tasks,
+    "binary_get_task": _bench_binary_get_task,
+    "save_tasks": _bench_save_tasks,
+    "record_update_task": _bench_record_toggle,
+    "add_task": _bench_add_task,
+    "store_add_task": _bench_store_add_task,
+    "filter_tasks_by_priority": lambda tasks, _: lambda: filter_tasks_by_priority(tasks, "High"),
+    "filter_tasks_by_category": lambda tasks, _: lambda: filter_tasks_by_category(tasks, "Work"),
+    "filter_tasks_by_completion": lambda tasks, _: lambda: filter_tasks_by_completion(tasks, True),
+    "store_filter_tasks_by_category": _bench_store_filter_tasks_by_category,
+    "search_tasks": _bench_search_tasks,
+    "store_search_tasks": _bench_store_search_tasks,
+    "get_overdue_tasks": lambda tasks, _: lambda: get_overdue_tasks(tasks),
+    "export_to_csv_bytes": lambda tasks, _: lambda: export_to_csv_bytes(tasks),
+    "get_paginated_tasks": _bench_paginate,
+    "query_tasks": _bench_query_page,
+    "store_query_tasks": _bench_store_query_page,
+    "columnar_filter_tasks_by_priority": _bench_columnar(filter_tasks_by_priority, "High"),
+    "columnar_filter_tasks_by_completion": _bench_columnar(filter_tasks_by_completion, True),
+    "columnar_get_overdue_tasks": _bench_columnar(get_overdue_tasks),
+    "sharded_load_serial": _bench_sharded_load(False),
+    "sharded_load_parallel": _bench_sharded_load(True),
+    "sharded_save_one_change": _bench_sharded_save(False),
+    "sharded_save_changed_ids": _bench_sharded_save(True),
+}
+
+
+def measure(function, repeat=3):
+    """
+    Time a function and measure its peak memory allocation.
+
+    Args:
+        function (callable): Function to measure, called with no arguments
+        repeat (int): Number of timed calls, of which the fastest is kept
+
+    Returns:
+        dict: "seconds" of the fastest call and "peak_bytes" allocated by one call
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    # Traced separately, as tracing allocations slows the function down
+    tracemalloc.start()
+    try:
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak_bytes}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=0, repeat=3, names=None, report=None):
+    """
+    Run benchmarks at each task count.
+
+    Args:
+        sizes (iterable): Numbers of tasks to benchmark with
+        seed (int): Seed of the generated tasks
+        repeat (int): Number of timed calls per benchmark
+        names (iterable): Names of the benchmarks to run, or None for all of BENCHMARKS
+        report (callable): Called with (size, name, measurement) after each benchmark
+
+    Returns:
+        dict: Run details under "meta", and measurements by size and name under "results"
+    """
+    names = list(BENCHMARKS if names is None else names)
+    results = {}
+    try:
+        for size in sizes:
+            tasks = generate_tasks(size, seed)
+            results[str(size)] = {}
+            with tempfile.TemporaryDirectory() as work_dir:
+                for name in names:
+                    measurement = measure(BENCHMARKS[name](tasks, work_dir), repeat)
+                    results[str(size)][name] = measurement
+                    if report is not None:
+                        report(size, name, measurement)
+    finally:
+        # Parallel shard loads leave worker processes running until shut down
+        shutdown_process_pool()
+    return {
+        "meta": {
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Find the benchmarks that regressed against a baseline. Benchmarks missing
+    from either run are ignored.
+
+    Args:
+        results (dict): Output of run_benchmarks
+        baseline (dict): Earlier output of run_benchmarks
+        tolerance (float): Allowed growth in time or memory, 0.25 being 25%
+
+    Returns:
+        list: (size, name, metric, baseline value, current value) of each regression
+    """
+    regressions = []
+    for size, measurements in results["results"].items():
+        for name, current in measurements.items():
+            previous = baseline["results"].get(size, {}).get(name)
+            if previous is None:
+                continue
+            for metric, floor in (("seconds", MIN_COMPARED_SECONDS), ("peak_bytes", 0)):
+                if max(current[metric], floor) > max(previous[metric], floor) * (1 + tolerance):
+                    regressions.append((size, name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def _print_measurement(size, name, measurement):
+    print(
+        f"{size:>9} {name:<36} {measurement['seconds'] * 1000:>11.3f} ms"
+        f" {measurement['peak_bytes'] / 1024:>12.1f} KiB",
+        flush=True,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--save", help="Write the results to this JSON baseline file")
+    parser.add_argument("--compare", help="Fail on regressions against this JSON baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.seed, args.repeat, args.only, _print_measurement)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        for size, name, metric, previous, current in regressions:
+            print(f"REGRESSION {name} at {size} tasks: {metric} {previous:.6g} -> {current:.6g}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
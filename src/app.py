@@ -1,40 +1,196 @@
 import streamlit as st
-import subprocess
-import pandas as pd
 from datetime import datetime
-import sys
 from src.tasks import (
     add_task,
-    load_tasks,
-    save_tasks,
-    filter_tasks_by_priority,
-    filter_tasks_by_category,
+    reserve_task_ids,
+    get_task,
+    update_task,
+    delete_task,
     delete_tasks,
-    export_to_csv_bytes,
+    bulk_update,
+    bulk_delete,
+    make_task_predicate,
+    get_cached_csv_bytes,
+    get_facet_counts,
     get_num_pages,
-    get_paginated_tasks,
+    query_tasks,
+)
+from src.journal import journal_add, journal_update, journal_delete
+from src.task_cache import (
+    load_cached_tasks,
+    refresh_cached_tasks,
+    invalidate_cached_tasks,
+)
+from src.write_behind import get_write_behind_queue
+from src.suite_runner import start_test_run
+from src.persistent_tasks import TaskHistory
+from src.metrics import (
+    estimate_quantile,
+    export_prometheus,
+    get_metrics,
+    is_enabled as is_metrics_enabled,
+    is_profiling,
+    profile_next_slow_rerun,
+    record_rerun,
+    start_export_from_env,
 )
 
+# Where a profiled slow rerun is written, and how slow a rerun has to be to be kept
+PROFILE_DUMP_FILE = "rerun.prof"
+SLOW_RERUN_SECONDS = 0.5
 
-def run_script(script):
-    return subprocess.run(
-        [sys.executable] + script.split()[1:], capture_output=True, text=True
-    )
+# Seconds between refreshes of the output of a running test run
+TEST_OUTPUT_REFRESH_SECONDS = 1
 
+# Unit test runs record which tests ran which functions, so "Run Affected Tests"
+# only re-runs the tests affected by changes since they last passed
+TEST_SCRIPTS = [
+    (
+        "Run Affected Tests",
+        "python -m pytest --cov src --cov-context=test -p src.impact_selection --affected --cov-report= -s",
+    ),
+    (
+        "Run Unit Tests (All Functionality)",
+        "python -m pytest --cov src --cov-context=test -p src.impact_selection --cov-report term-missing -s --cov-report=html",
+    ),
+    (
+        "Run Unit Tests (pytest-cov)",
+        "python -m pytest --cov src --cov-context=test -p src.impact_selection --cov-report term-missing -s",
+    ),
+    (
+        "Run BDD Tests",
+        "python -m pytest tests/feature/steps --cov-report term-missing -s --cov-report=html -vv",
+    ),
+]
 
-def display_test_output(result):
-    if result.returncode == 0:
-        st.success("All tests passed!")
+
+def display_test_output(run):
+    if run.cancelled:
+        st.warning("Test run cancelled.")
+    elif run.returncode == 0:
+        st.success(f"All tests passed in {run.elapsed:.1f}s!")
     else:
         st.error("Some tests failed. Check the output below.")
-    st.sidebar.text_area("Test Output", result.stdout + result.stderr)
+    st.text_area("Test Output", run.output())
+
+
+def display_test_run(run, polling):
+    # Rendered in a fragment, so only this part of the page refreshes while tests run
+    if run.is_running():
+        st.info(f"Running tests... {run.elapsed:.0f}s")
+        if st.button("Cancel test run"):
+            run.cancel()
+        st.code(run.output()[-10000:] or " ", language=None)
+    elif polling:
+        # Rerun the whole app to stop refreshing and re-enable the test buttons
+        st.rerun()
+    else:
+        display_test_output(run)
+
+
+def on_tasks_committed(external_changes):
+    if external_changes:
+        # Another writer committed in between, so the cached tasks are stale
+        invalidate_cached_tasks()
+    else:
+        refresh_cached_tasks()
+
+
+def display_metrics():
+    metrics = get_metrics()
+    st.sidebar.header("Metrics")
+    st.sidebar.dataframe(
+        [
+            {
+                "Function": name,
+                "Calls": values["calls"],
+                "Errors": values["errors"],
+                "Mean (ms)": values["seconds"] / values["calls"] * 1000,
+                # Upper bound of the histogram bucket, so only as precise as the buckets
+                "p95 (ms)": estimate_quantile(values["buckets"], 0.95) * 1000,
+                "Tasks": values["tasks"],
+                "Read file size": values["read_file_size"],
+                "Written file size": values["written_file_size"],
+            }
+            for name, values in sorted(metrics["functions"].items())
+        ]
+    )
+    for name, values in sorted(metrics["caches"].items()):
+        st.sidebar.caption(
+            f"{name} cache: {values['hit_rate']:.0%} hits of {values['hits'] + values['misses']}"
+        )
+    st.sidebar.download_button(
+        label="Download Prometheus metrics",
+        data=export_prometheus,
+        file_name="metrics.prom",
+        mime="text/plain",
+    )
+    if is_profiling():
+        st.sidebar.caption(f"Profiling until a rerun takes {SLOW_RERUN_SECONDS}s")
+    elif st.sidebar.button("Profile next slow rerun"):
+        profile_next_slow_rerun(PROFILE_DUMP_FILE, SLOW_RERUN_SECONDS)
+
+
+def get_task_history(tasks):
+    # Undo history of this session. Its versions are the store's shared
+    # snapshots, so starting one doesn't copy the tasks again
+    history = st.session_state.get("task_history")
+    if history is None:
+        history = st.session_state["task_history"] = TaskHistory(tasks.snapshot())
+    return history
+
+
+def record_history(history, previous, tasks):
+    # Both snapshots are taken under the store's lock, so the step holds only
+    # this session's changes, and copies only them and their O(log n) trie nodes
+    history.push(tasks.snapshot(), previous)
 
 
+def apply_history_step(tasks, changes, writer):
+    # Restores each task an undo or redo changed and journals it like any edit,
+    # unless it has been changed since, e.g. by another session. Tasks are
+    # replaced whole, as merging would keep fields the restored task didn't have.
+    current = tasks.snapshot()
+    for task_id, task, expected in changes:
+        if current.get(task_id) != expected:
+            continue
+        if task is None:
+            delete_task(tasks, task_id)
+            journal_delete(task_id, writer=writer)
+        else:
+            tasks.add(dict(task))
+            journal_add(dict(task), writer=writer)
+
+
+def facet_labeller(facets, field, today):
+    # Labels filter options like "Work (1,204 open, 88 overdue)"
+    summary = facets.summary(field, today)
+
+    def label(value):
+        if value not in summary:
+            return value
+        counts = summary[value]
+        return f"{value} ({counts['open']:,} open, {counts['overdue']:,} overdue)"
+
+    return label
+
+
+@record_rerun()
 def main():
     st.title("To-Do Application")
 
-    # Load existing tasks
-    tasks = load_tasks()
+    # Load existing tasks, indexed by ID, category, priority and completion.
+    # They are only re-read from disk when the task file has changed.
+    tasks = load_cached_tasks()
+    # Changes are applied to the cached tasks right away and committed to disk
+    # shortly after, together with any other changes made in the meantime
+    writer = get_write_behind_queue(on_commit=on_tasks_committed)
+    history = get_task_history(tasks)
+
+    # Opt-in instrumentation, enabled with TASKS_METRICS=1
+    if is_metrics_enabled():
+        start_export_from_env()
+        display_metrics()
 
     # Sidebar for adding new tasks
     st.sidebar.header("Add New Task")
@@ -51,74 +207,92 @@ def main():
         submit_button = st.form_submit_button("Add Task")
 
         if submit_button and task_title:
-            tasks = add_task(
-                tasks,
-                task_title,
-                task_description,
-                task_priority,
-                task_category,
-                task_due_date.strftime("%Y-%m-%d"),
-            )
-            save_tasks(tasks)
+            # The ID comes from the task file's counter, so app processes with
+            # their own cached tasks never add two tasks with the same ID
+            with tasks.lock:
+                previous = tasks.snapshot()
+                task_id = reserve_task_ids(tasks=tasks)
+                add_task(
+                    tasks,
+                    task_title,
+                    task_description,
+                    task_priority,
+                    task_category,
+                    task_due_date.strftime("%Y-%m-%d"),
+                    task_id=task_id,
+                )
+                journal_add(get_task(tasks, task_id), writer=writer)
+                record_history(history, previous, tasks)
             st.sidebar.success("Task added successfully!")
 
-    for button_label, script in [
-        (
-            "Run Unit Tests (All Functionality)",
-            "python -m pytest --cov src --cov-report term-missing -s --cov-report=html",
-        ),
-        (
-            "Run Unit Tests (pytest-cov)",
-            "python -m pytest --cov src --cov-report term-missing -s",
-        ),
-        (
-            "Run BDD Tests",
-            "python -m pytest tests/feature/steps --cov-report term-missing -s --cov-report=html -vv",
-        ),
-    ]:
-        if st.sidebar.button(button_label):
-            with st.spinner(f"Running unit tests..."):
-                result = run_script(script)
-                display_test_output(result)
+    # Tests run in the background, spread across every core, one run per session
+    test_run = st.session_state.get("test_run")
+    running = test_run is not None and test_run.is_running()
+    for button_label, script in TEST_SCRIPTS:
+        if st.sidebar.button(button_label, disabled=running) and not running:
+            test_run = st.session_state["test_run"] = start_test_run(script)
+            running = True
+    if test_run is not None:
+        with st.sidebar:
+            st.fragment(
+                display_test_run,
+                run_every=TEST_OUTPUT_REFRESH_SECONDS if running else None,
+            )(test_run, running)
 
     # Main area to display tasks
     st.header("Your Tasks")
 
-    # Filter options
+    # Filter options, labelled with counts kept up to date as tasks change
+    facets = get_facet_counts(tasks)
+    today = datetime.now().strftime("%Y-%m-%d")
+    with tasks.lock:
+        categories = sorted(facets.values("category"), key=str)
+        category_labeller = facet_labeller(facets, "category", today)
+        priority_labeller = facet_labeller(facets, "priority", today)
     col1, col2 = st.columns(2)
     with col1:
         filter_category = st.selectbox(
             "Filter by Category",
-            ["All"] + list(set([task["category"] for task in tasks])),
+            ["All"] + categories,
+            format_func=category_labeller,
         )
     with col2:
         filter_priority = st.selectbox(
-            "Filter by Priority", ["All", "High", "Medium", "Low"]
+            "Filter by Priority",
+            ["All", "High", "Medium", "Low"],
+            format_func=priority_labeller,
         )
 
     show_completed = st.checkbox("Show Completed Tasks")
 
-    # Apply filters
-    filtered_tasks = tasks.copy()
+    # Filters are applied in a single pass, starting from the most selective index
+    criteria = {}
     if filter_category != "All":
-        filtered_tasks = filter_tasks_by_category(filtered_tasks, filter_category)
+        criteria["category"] = filter_category
     if filter_priority != "All":
-        filtered_tasks = filter_tasks_by_priority(filtered_tasks, filter_priority)
+        criteria["priority"] = filter_priority
     if not show_completed:
-        filtered_tasks = [task for task in filtered_tasks if not task["completed"]]
+        criteria["completed"] = False
 
     # Display tasks
     tasks_per_page = 5
     current_page = st.number_input(
         "Page",
         min_value=1,
-        max_value=get_num_pages(filtered_tasks, tasks_per_page),
+        max_value=get_num_pages(facets, tasks_per_page, **criteria),
         value=1,
         step=1,
         format="%d",
     )
 
-    for task in get_paginated_tasks(current_page, filtered_tasks, tasks_per_page):
+    page_tasks, _ = query_tasks(
+        tasks,
+        limit=tasks_per_page,
+        offset=(current_page - 1) * tasks_per_page,
+        count_total=False,
+        **criteria,
+    )
+    for task in page_tasks:
         col1, col2 = st.columns([4, 1])
         with col1:
             if task["completed"]:
@@ -134,23 +308,73 @@ def main():
                 "Complete" if not task["completed"] else "Undo",
                 key=f"complete_{task['id']}",
             ):
-                for t in tasks:
-                    if t["id"] == task["id"]:
-                        t["completed"] = not t["completed"]
-                        save_tasks(tasks)
-                        st.rerun()
+                changes = {"completed": not task["completed"]}
+                with tasks.lock:
+                    previous = tasks.snapshot()
+                    updated = update_task(tasks, task["id"], changes) is not None
+                    if updated:
+                        journal_update(task["id"], changes, writer=writer)
+                        record_history(history, previous, tasks)
+                if updated:
+                    st.rerun()
             if st.button("Delete", key=f"delete_{task['id']}"):
-                tasks = [t for t in tasks if t["id"] != task["id"]]
-                save_tasks(tasks)
+                with tasks.lock:
+                    previous = tasks.snapshot()
+                    delete_task(tasks, task["id"])
+                    journal_delete(task["id"], writer=writer)
+                    record_history(history, previous, tasks)
                 st.rerun()
 
+    # Bulk actions change every matching task in one pass, and the write-behind
+    # queue commits all of their journal records in a single write
+    if st.button("Complete overdue tasks"):
+        today = datetime.now().strftime("%Y-%m-%d")
+        changes = {"completed": True}
+        overdue = make_task_predicate(completed=False, due_before=today)
+        with tasks.lock:
+            previous = tasks.snapshot()
+            updated = bulk_update(tasks, overdue, changes)
+            for task in updated:
+                journal_update(task["id"], changes, writer=writer)
+            record_history(history, previous, tasks)
+        st.rerun()
+    if st.button("Delete completed tasks"):
+        with tasks.lock:
+            previous = tasks.snapshot()
+            deleted = bulk_delete(tasks, make_task_predicate(completed=True))
+            for task in deleted:
+                journal_delete(task["id"], writer=writer)
+            record_history(history, previous, tasks)
+        st.rerun()
+
+    # Undo and redo restore the tasks changed by this session's steps, whose
+    # versions share all but the changed tasks with each other
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Undo last change", disabled=not history.can_undo()):
+            with tasks.lock:
+                apply_history_step(tasks, history.undo(), writer)
+            st.rerun()
+    with col2:
+        if st.button("Redo", disabled=not history.can_redo()):
+            with tasks.lock:
+                apply_history_step(tasks, history.redo(), writer)
+            st.rerun()
+
     if st.button("Delete all tasks"):
+        writer.flush()
         delete_tasks()
+        invalidate_cached_tasks()
         st.rerun()
 
+    # The CSV is only generated when the button is clicked, and reused until tasks change
+    export_criteria = criteria if st.checkbox("Only export filtered tasks") else {}
+    export_view = tuple(sorted(export_criteria.items()))
     st.download_button(
         label="Download CSV",
-        data=export_to_csv_bytes(tasks),
+        data=lambda: get_cached_csv_bytes(
+            query_tasks(tasks, **export_criteria)[0], tasks.version, export_view
+        ),
         file_name="tasks.csv",
         mime="text/csv",
     )
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from src import tasks
+from src.tasks import DEFAULT_TASKS_FILE
+
+# Maximum number of blocking file reads, writes and exports running at once
+ASYNC_IO_WORKERS = 8
+
+_executor = None
+
+# Event loop -> absolute task file path -> lock serializing that file's I/O
+_file_locks = weakref.WeakKeyDictionary()
+
+# Event loop -> absolute task file path -> task of the load in flight
+_pending_loads = weakref.WeakKeyDictionary()
+
+
+def get_executor():
+    """
+    Get the bounded thread pool that blocking task I/O is run in.
+
+    Returns:
+        ThreadPoolExecutor: Pool of ASYNC_IO_WORKERS threads, shared by every event loop
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=ASYNC_IO_WORKERS, thread_name_prefix="async-tasks"
+        )
+    return _executor
+
+
+async def _run_blocking(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(), partial(function, *args)
+    )
+
+
+def _file_lock(file_path):
+    locks = _file_locks.setdefault(asyncio.get_running_loop(), {})
+    return locks.setdefault(os.path.abspath(file_path), asyncio.Lock())
+
+
+async def load_tasks(file_path=DEFAULT_TASKS_FILE):
+    """
+    Load tasks like src.tasks.load_tasks without blocking the event loop.
+    Concurrent loads of the same file share a single read, so callers must not
+    mutate the returned list.
+
+    Args:
+        file_path (str): Path to the JSON or SQLite file
+
+    Returns:
+        list: List of task dictionaries
+    """
+    loads = _pending_loads.setdefault(asyncio.get_running_loop(), {})
+    key = os.path.abspath(file_path)
+    if key not in loads:
+
+        async def load():
+            try:
+                # Waits for in-flight writes, so the read sees their results
+                async with _file_lock(file_path):
+                    return await _run_blocking(tasks.load_tasks, file_path)
+            finally:
+                del loads[key]
+
+        loads[key] = asyncio.ensure_future(load())
+    # Shielded, so one caller being cancelled doesn't cancel the others' read
+    return await asyncio.shield(loads[key])
+
+
+async def save_tasks(task_list, file_path=DEFAULT_TASKS_FILE):
+    """
+    Save tasks like src.tasks.save_tasks without blocking the event loop.
+    Writes to the same file are applied one at a time, in the order they were made.
+
+    Args:
+        task_list (list): List of task dictionaries
+        file_path (str): Path to the JSON or SQLite file
+    """
+    async with _file_lock(file_path):
+        await _run_blocking(tasks.save_tasks, task_list, file_path)
+
+
+async def delete_tasks(file_path=DEFAULT_TASKS_FILE):
+    """
+    Delete a task file like src.tasks.delete_tasks without blocking the event loop.
+
+    Args:
+        file_path (str): Path to the JSON file to delete
+    """
+    async with _file_lock(file_path):
+        await _run_blocking(tasks.delete_tasks, file_path)
+
+
+async def export_to_csv_bytes(task_list):
+    """
+    Export tasks to CSV bytes like src.tasks.export_to_csv_bytes, serializing
+    in the executor rather than on the event loop.
+
+    Args:
+        task_list (list): List of task dictionaries
+
+    Returns:
+        bytes: CSV byte data
+    """
+    return await _run_blocking(tasks.export_to_csv_bytes, task_list)
@@ -0,0 +1,334 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+from src.tasks import atomic_open, load_tasks, save_tasks
+
+# Identifies a binary task file, followed by the format version
+MAGIC = b"TSKB"
+FORMAT_VERSION = 2
+
+# magic, format version, reserved, task count, column count, string count
+HEADER = struct.Struct("<4sHHIII")
+
+# kind, name code in the string table, number of tasks without the field,
+# offset of the column's values, offset of the positions of the tasks without the field
+COLUMN = struct.Struct("<B3xIIQQ")
+
+LENGTH = struct.Struct("<I")
+
+# Column kinds, by what the column holds for each task
+ID_COLUMN = 0  # int64 ID
+BOOL_COLUMN = 1  # uint8 0 or 1
+CODE_COLUMN = 2  # int32 code of the value in the string table
+TEXT_COLUMN = 3  # uint64 offset of the value in the text following the offsets
+EXTRA_COLUMN = 4  # Like TEXT_COLUMN, holding the JSON of the fields no column takes
+
+# Fields whose few distinct values are stored once, in the string table
+CODED_FIELDS = ("priority", "category")
+
+# Ends every value in a text column, so a run of values is split in one call
+TEXT_SEPARATOR = "\0"
+
+# Tasks decoded at a time when iterating
+ITER_BATCH_SIZE = 10000
+
+
+def _get_column_kind(field, value):
+    # None for values that don't fit a column, e.g. non-string titles,
+    # which go with the extra fields
+    if field == "id":
+        return ID_COLUMN if type(value) is int else None
+    if field == "completed":
+        return BOOL_COLUMN if type(value) is bool else None
+    if not isinstance(value, str) or TEXT_SEPARATOR in value:
+        return None
+    return CODE_COLUMN if field in CODED_FIELDS else TEXT_COLUMN
+
+
+def _pack_array(typecode, values):
+    values = array(typecode, values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_text_column(values):
+    data = [value.encode("utf-8") for value in values]
+    offsets = [0]
+    for value in data:
+        offsets.append(offsets[-1] + len(value) + 1)
+    return _pack_array("Q", offsets) + b"".join(value + b"\0" for value in data)
+
+
+def _encode_column(kind, values, string_codes):
+    if kind == ID_COLUMN:
+        return _pack_array("q", (0 if value is None else value for value in values))
+    if kind == BOOL_COLUMN:
+        return bytes(value is True for value in values)
+    if kind == CODE_COLUMN:
+        codes = [0 if value is None else string_codes.setdefault(value, len(string_codes))
+                 for value in values]
+        return _pack_array("i", codes)
+    return _encode_text_column("" if value is None else value for value in values)
+
+
+def save_tasks_binary(tasks, file_path):
+    """
+    Save tasks to a binary task file, replacing it atomically.
+
+    Args:
+        tasks (list): List of task dictionaries
+        file_path (str): Path to the binary task file
+    """
+    tasks = list(tasks)
+    # Field -> (column kind, value of each task, None for tasks without the field)
+    columns = {"id": (ID_COLUMN, [None] * len(tasks))}
+    extras = []
+    for position, task in enumerate(tasks):
+        extra = {}
+        for field, value in task.items():
+            kind = _get_column_kind(field, value)
+            if kind is None:
+                extra[field] = value
+                continue
+            if field not in columns:
+                columns[field] = (kind, [None] * len(tasks))
+            columns[field][1][position] = value
+        extras.append(json.dumps(extra, separators=(",", ":")) if extra else "")
+
+    string_codes = {}
+    encoded = []
+    for field, (kind, values) in columns.items():
+        name_code = string_codes.setdefault(field, len(string_codes))
+        data = _encode_column(kind, values, string_codes)
+        absent = [position for position, value in enumerate(values) if value is None]
+        encoded.append((kind, name_code, data, absent))
+    name_code = string_codes.setdefault("", len(string_codes))
+    encoded.append((EXTRA_COLUMN, name_code, _encode_text_column(extras), []))
+
+    strings = []
+    for value in string_codes:
+        data = value.encode("utf-8")
+        strings += (LENGTH.pack(len(data)), data)
+    strings = b"".join(strings)
+
+    directory = []
+    sections = []
+    position = HEADER.size + len(encoded) * COLUMN.size + len(strings)
+    for kind, name_code, data, absent in encoded:
+        directory.append(COLUMN.pack(kind, name_code, len(absent), position, position + len(data)))
+        sections += (data, _pack_array("I", absent))
+        position += len(data) + len(sections[-1])
+    with atomic_open(file_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(tasks), len(encoded), len(string_codes)))
+        f.writelines(directory)
+        f.write(strings)
+        f.writelines(sections)
+
+
+class BinaryTasks:
+    """
+    Read-only view of a binary task file through a memory map. Only the header,
+    column directory and string table are read on open; tasks are decoded
+    when they are accessed by position.
+
+    The file stores tasks by column rather than one record per task: every
+    ID, then every title and so on, with each run of text joined into one
+    block. A run of tasks is decoded a column at a time, with one array read
+    per fixed-size column and one split per text column, so loading every
+    task is faster than parsing the same tasks from JSON, while reading one
+    task only touches its entry in each column.
+
+    The file layout is a fixed header, then the directory of columns, then
+    the table of column names and distinct priority and category strings,
+    then the values of each column followed by the positions of the tasks
+    that don't have its field. Fields that don't fit a column are stored as
+    JSON in the extra column.
+    """
+
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Path to the binary task file
+
+        Raises:
+            ValueError: If the file isn't a binary task file of a supported version
+        """
+        self._count = 0
+        self._strings = []
+        self._columns = []
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files can't be mapped, and hold no tasks
+                self._map = None
+                return
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, count, column_count, string_count = HEADER.unpack_from(self._map)
+        except struct.error:
+            self.close()
+            raise ValueError(f"{file_path} is too short to be a binary task file")
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{file_path} is not a version {FORMAT_VERSION} binary task file")
+        self._count = count
+
+        position = HEADER.size + column_count * COLUMN.size
+        for _ in range(string_count):
+            (length,) = LENGTH.unpack_from(self._map, position)
+            position += LENGTH.size
+            self._strings.append(str(self._map[position : position + length], "utf-8"))
+            position += length
+
+        for index in range(column_count):
+            kind, name_code, absent_count, offset, absent_offset = COLUMN.unpack_from(
+                self._map, HEADER.size + index * COLUMN.size
+            )
+            absent = self._read_array("I", absent_offset, absent_count)
+            self._columns.append((self._strings[name_code], kind, offset, absent))
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        Args:
+            index (int or slice): Position of the task, negative to count from
+                the end, or a slice of positions
+
+        Returns:
+            dict: The task dictionary at the position, or a list of them for a slice
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step == 1:
+                return self._read_tasks(start, stop)
+            return [self[position] for position in range(start, stop, step)]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("task index out of range")
+        return self._read_tasks(index, index + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, self._count, ITER_BATCH_SIZE):
+            yield from self._read_tasks(start, min(start + ITER_BATCH_SIZE, self._count))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        if self._map is not None:
+            self._map.close()
+
+    def _read_array(self, typecode, position, count):
+        values = array(typecode)
+        values.frombytes(self._map[position : position + count * values.itemsize])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def _read_text_column(self, offset, start, stop):
+        offsets = self._read_array("Q", offset + start * 8, stop - start + 1)
+        text_offset = offset + (self._count + 1) * 8
+        # Leaves out the last separator, so splitting gives one value per task
+        text = self._map[text_offset + offsets[0] : text_offset + offsets[-1] - 1]
+        return str(text, "utf-8").split(TEXT_SEPARATOR)
+
+    def _read_tasks(self, start, stop):
+        # Decodes the tasks at positions start to stop, a column at a time
+        if start >= stop:
+            return []
+        fields = []
+        values = []
+        extras = None
+        for field, kind, offset, _ in self._columns:
+            if kind == ID_COLUMN:
+                column = self._read_array("q", offset + start * 8, stop - start)
+            elif kind == BOOL_COLUMN:
+                column = map(bool, self._map[offset + start : offset + stop])
+            elif kind == CODE_COLUMN:
+                codes = self._read_array("i", offset + start * 4, stop - start)
+                column = map(self._strings.__getitem__, codes)
+            elif kind == TEXT_COLUMN:
+                column = self._read_text_column(offset, start, stop)
+            else:
+                extras = self._read_text_column(offset, start, stop)
+                continue
+            fields.append(field)
+            values.append(column)
+        tasks = list(map(dict, map(zip, repeat(fields), zip(*values))))
+
+        for field, _, _, absent in self._columns:
+            for position in absent[bisect_left(absent, start) : bisect_left(absent, stop)]:
+                del tasks[position - start][field]
+        if extras is not None:
+            for task, extra in zip(tasks, extras):
+                if extra:
+                    task.update(json.loads(extra))
+        return tasks
+
+
+def load_tasks_binary(file_path):
+    """
+    Load every task from a binary task file.
+
+    Args:
+        file_path (str): Path to the binary task file
+
+    Returns:
+        list: List of task dictionaries, empty list if file doesn't exist or is empty
+    """
+    try:
+        with BinaryTasks(file_path) as tasks:
+            return tasks[:]
+    except FileNotFoundError:
+        return []
+
+
+def get_binary_task(file_path, index):
+    """
+    Read one task from a binary task file without decoding the others.
+
+    Args:
+        file_path (str): Path to the binary task file
+        index (int): Position of the task
+
+    Returns:
+        dict: The task dictionary at the position
+    """
+    with BinaryTasks(file_path) as tasks:
+        return tasks[index]
+
+
+def convert_json_to_binary(json_path, binary_path):
+    """
+    Convert a JSON task file, including any journaled changes, to a binary task file.
+
+    Args:
+        json_path (str): Path to the JSON task file
+        binary_path (str): Path to the binary task file to write
+    """
+    save_tasks_binary(load_tasks(json_path), binary_path)
+
+
+def convert_binary_to_json(binary_path, json_path):
+    """
+    Convert a binary task file to a JSON task file.
+
+    Args:
+        binary_path (str): Path to the binary task file
+        json_path (str): Path to the JSON task file to write
+    """
+    save_tasks(load_tasks_binary(binary_path), json_path)
@@ -0,0 +1,309 @@
+import numpy as np
+from src.search_index import make_scorer
+
+# Code stored for tasks that don't have a field at all
+MISSING = -1
+
+# Stored in the side store for tasks without a title or description
+_ABSENT = object()
+
+# Fields kept in their own columns; any other fields are kept per task in the side store
+COLUMN_FIELDS = ("id", "title", "description", "priority", "category", "due_date", "completed")
+
+
+class ColumnarTasks:
+    """
+    Read-only, struct-of-arrays copy of a task list for bulk filtering and
+    analytics. Category, priority and completion are integer-coded NumPy
+    arrays and due dates are datetime64, so filters become vectorized boolean
+    masks. Titles, descriptions and any other fields stay in Python lists.
+
+    It can be passed to the filter, search and overdue functions in src.tasks
+    in place of a task list. They return the matching tasks as a view of the
+    same columns through an array of row positions, so selecting them is as
+    cheap as the mask, and task dictionaries are only built for the tasks that
+    are iterated, e.g. the page being shown. Masks of a view are over its own
+    tasks, so views can be filtered further like any ColumnarTasks.
+    """
+
+    def __init__(
+        self,
+        ids,
+        titles,
+        descriptions,
+        priorities,
+        categories,
+        completed,
+        due_dates,
+        extras,
+        priority_values,
+        category_values,
+        rows=None,
+    ):
+        """
+        Args:
+            ids (np.ndarray): Task IDs
+            titles (list): Task titles
+            descriptions (list): Task descriptions
+            priorities (np.ndarray): Indexes into priority_values, MISSING if absent
+            categories (np.ndarray): Indexes into category_values, MISSING if absent
+            completed (np.ndarray): 1 if completed, 0 if not, MISSING if absent
+            due_dates (np.ndarray): Due dates, NaT if absent
+            extras (list): Dictionary of the other fields of each task
+            priority_values (list): Distinct priority levels
+            category_values (list): Distinct categories
+            rows (np.ndarray): Positions in the columns of the tasks in this
+                view, in order, or None for every task
+        """
+        self.ids = ids
+        self.titles = titles
+        self.descriptions = descriptions
+        self.priorities = priorities
+        self.categories = categories
+        self.completed = completed
+        self.due_dates = due_dates
+        self.extras = extras
+        self.priority_values = priority_values
+        self.category_values = category_values
+        self.rows = rows
+
+    @classmethod
+    def from_dicts(cls, tasks):
+        """
+        Args:
+            tasks (iterable): Task dictionaries
+
+        Returns:
+            ColumnarTasks: Columnar copy of the tasks
+        """
+        ids, titles, descriptions, extras = [], [], [], []
+        priority_codes, category_codes, completed_codes, due_dates = [], [], [], []
+        priority_table, category_table = {}, {}
+        for task in tasks:
+            ids.append(task["id"])
+            titles.append(task.get("title", _ABSENT))
+            descriptions.append(task.get("description", _ABSENT))
+            priority_codes.append(
+                priority_table.setdefault(task["priority"], len(priority_table))
+                if "priority" in task
+                else MISSING
+            )
+            category_codes.append(
+                category_table.setdefault(task["category"], len(category_table))
+                if "category" in task
+                else MISSING
+            )
+            completed_codes.append(int(bool(task["completed"])) if "completed" in task else MISSING)
+            extra = {key: value for key, value in task.items() if key not in COLUMN_FIELDS}
+            due_date = task.get("due_date")
+            try:
+                due_dates.append(np.datetime64(due_date, "D") if due_date else None)
+            except ValueError:
+                due_dates.append(None)
+            if "due_date" in task and (due_dates[-1] is None or str(due_dates[-1]) != due_date):
+                extra["due_date"] = due_date  # Keep values that don't round-trip as is
+            extras.append(extra)
+        return cls(
+            ids=np.array(ids, dtype=np.int64),
+            titles=titles,
+            descriptions=descriptions,
+            priorities=np.array(priority_codes, dtype=np.int32),
+            categories=np.array(category_codes, dtype=np.int32),
+            completed=np.array(completed_codes, dtype=np.int8),
+            due_dates=np.array(
+                [np.datetime64("NaT") if date is None else date for date in due_dates],
+                dtype="datetime64[D]",
+            ),
+            extras=extras,
+            priority_values=list(priority_table),
+            category_values=list(category_table),
+        )
+
+    def __len__(self):
+        return len(self.ids) if self.rows is None else len(self.rows)
+
+    def __iter__(self):
+        return (self.task(index) for index in range(len(self)))
+
+    def task(self, index):
+        """
+        Args:
+            index (int): Position of the task
+
+        Returns:
+            dict: The task at the position, as a task dictionary
+        """
+        if self.rows is not None:
+            index = self.rows[index]
+        task = {"id": int(self.ids[index])}
+        for key, values in (("title", self.titles), ("description", self.descriptions)):
+            if values[index] is not _ABSENT:
+                task[key] = values[index]
+        if self.priorities[index] != MISSING:
+            task["priority"] = self.priority_values[self.priorities[index]]
+        if self.categories[index] != MISSING:
+            task["category"] = self.category_values[self.categories[index]]
+        if not np.isnat(self.due_dates[index]):
+            task["due_date"] = str(self.due_dates[index])
+        if self.completed[index] != MISSING:
+            task["completed"] = bool(self.completed[index])
+        task.update(self.extras[index])
+        return task
+
+    def select(self, mask):
+        """
+        Args:
+            mask (np.ndarray): Boolean mask of the tasks to keep
+
+        Returns:
+            ColumnarTasks: View of the tasks the mask selects, in their
+                original order, sharing this collection's columns
+        """
+        return self.take(np.flatnonzero(mask))
+
+    def take(self, positions):
+        """
+        Args:
+            positions (np.ndarray): Positions of the tasks to keep, in the order to keep them
+
+        Returns:
+            ColumnarTasks: View of the tasks at the positions, sharing this
+                collection's columns
+        """
+        rows = positions if self.rows is None else self.rows[positions]
+        return ColumnarTasks(
+            self.ids,
+            self.titles,
+            self.descriptions,
+            self.priorities,
+            self.categories,
+            self.completed,
+            self.due_dates,
+            self.extras,
+            self.priority_values,
+            self.category_values,
+            rows=rows,
+        )
+
+    def to_dicts(self, mask=None):
+        """
+        Args:
+            mask (np.ndarray): Boolean mask of the tasks to convert, or None for all
+
+        Returns:
+            list: Task dictionaries, in their original order
+        """
+        indices = range(len(self)) if mask is None else np.flatnonzero(mask)
+        return [self.task(index) for index in indices]
+
+    def mask(self, category=None, priority=None, completed=None, overdue_on=None):
+        """
+        Build a boolean mask of the tasks matching all of the inputted criteria.
+
+        Args:
+            category (str): Category to filter by, or None for any
+            priority (str): Priority level to filter by, or None for any
+            completed (bool): Completion status to filter by, or None for any
+            overdue_on (str): Only include tasks overdue on this YYYY-MM-DD date
+
+        Returns:
+            np.ndarray: Boolean mask over the tasks
+        """
+        # Computed over every row of the columns, which is vectorized, and
+        # then narrowed down to the view's rows
+        mask = np.ones(len(self.ids), dtype=bool)
+        if category is not None:
+            mask &= self.categories == self._code(self.category_values, category)
+        if priority is not None:
+            mask &= self.priorities == self._code(self.priority_values, priority)
+        if completed is not None:
+            mask &= self.completed == int(bool(completed))
+        if overdue_on is not None:
+            # Tasks without a due date count as overdue, as in get_overdue_tasks
+            due = np.isnat(self.due_dates) | (self.due_dates < np.datetime64(overdue_on, "D"))
+            mask &= (self.completed != 1) & due
+        return mask if self.rows is None else mask[self.rows]
+
+    def search_scores(self, query):
+        """
+        Score the tasks' titles and descriptions against a search query.
+
+        Args:
+            query (str): Search query, matched as in search_tasks
+
+        Returns:
+            np.ndarray: Relevance of each task, 0 for tasks that don't match
+        """
+        score = make_scorer(query)
+        rows = range(len(self.ids)) if self.rows is None else self.rows
+        return np.fromiter(
+            (
+                score(
+                    "" if self.titles[row] is _ABSENT else self.titles[row],
+                    "" if self.descriptions[row] is _ABSENT else self.descriptions[row],
+                )
+                for row in rows
+            ),
+            dtype=np.int64,
+            count=len(self),
+        )
+
+    def search_mask(self, query):
+        """
+        Build a boolean mask of the tasks matching a search query.
+
+        Args:
+            query (str): Search query, matched as in search_tasks
+
+        Returns:
+            np.ndarray: Boolean mask over the tasks
+        """
+        return self.search_scores(query) > 0
+
+    def search(self, query):
+        """
+        Args:
+            query (str): Search query, matched as in search_tasks
+
+        Returns:
+            ColumnarTasks: View of the matching tasks, most relevant first,
+                with ties in their original order
+        """
+        scores = self.search_scores(query)
+        order = np.argsort(-scores, kind="stable")
+        return self.take(order[scores[order] > 0])
+
+    def count(self, **criteria):
+        """
+        Args:
+            **criteria: Criteria accepted by mask
+
+        Returns:
+            int: Number of matching tasks
+        """
+        return int(np.count_nonzero(self.mask(**criteria)))
+
+    def value_counts(self, field):
+        """
+        Args:
+            field (str): "category" or "priority"
+
+        Returns:
+            dict: Number of tasks with each value of the field
+        """
+        codes, values = {
+            "category": (self.categories, self.category_values),
+            "priority": (self.priorities, self.priority_values),
+        }[field]
+        if self.rows is not None:
+            codes = codes[self.rows]
+        counts = np.bincount(codes[codes != MISSING], minlength=len(values))
+        return {value: int(count) for value, count in zip(values, counts)}
+
+    @staticmethod
+    def _code(values, value):
+        # A value no task has gets a code no task has either
+        try:
+            return values.index(value)
+        except ValueError:
+            return -2
@@ -0,0 +1,186 @@
+import bisect
+import heapq
+
+
+def _iter_from(entries, start):
+    # Walks a list from an index onwards without copying the rest of it
+    for index in range(start, len(entries)):
+        yield entries[index]
+
+
+class DueDateIndex:
+    """
+    Ordered index of tasks by due date, kept as one sorted list per completion
+    status. Overdue, date range and next-due lookups bisect into the lists, so
+    they cost O(log n) plus the number of tasks returned.
+
+    Tasks without a due date sort first, matching the string comparison the
+    list functions use. Tasks due on the same date are ordered by ID, so
+    (due date, ID) pairs can be used as stable pagination cursors.
+    """
+
+    def __init__(self):
+        # Completed status -> sorted [(due date, task ID)]
+        self._entries = {False: [], True: []}
+        self._positions = {}  # Task ID -> (completed status, entry)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def add(self, task):
+        """
+        Index the due date and completion status of a task, replacing any
+        previous entry, e.g. after it is completed or rescheduled.
+
+        Args:
+            task (dict): Task dictionary with an "id" key
+        """
+        task_id = task["id"]
+        if task_id in self._positions:
+            self._unindex(task_id)
+        completed = bool(task.get("completed", False))
+        entry = (task.get("due_date") or "", task_id)
+        bisect.insort(self._entries[completed], entry)
+        self._positions[task_id] = (completed, entry)
+
+    def remove(self, task_id):
+        """
+        Remove a task from the index.
+
+        Args:
+            task_id (int): ID of the task to remove
+        """
+        if task_id in self._positions:
+            self._unindex(task_id)
+
+    def add_many(self, tasks):
+        """
+        Index many tasks at once, replacing any previous entries. Entries are
+        appended and each list is sorted once, rather than inserting one by one.
+
+        Args:
+            tasks (iterable): Task dictionaries with "id" keys
+        """
+        tasks = {task["id"]: task for task in tasks}
+        self.remove_many(task_id for task_id in tasks if task_id in self._positions)
+        for task_id, task in tasks.items():
+            completed = bool(task.get("completed", False))
+            entry = (task.get("due_date") or "", task_id)
+            self._entries[completed].append(entry)
+            self._positions[task_id] = (completed, entry)
+        for entries in self._entries.values():
+            entries.sort()  # Two sorted runs, which sort merges in linear time
+
+    def remove_many(self, task_ids):
+        """
+        Remove many tasks from the index with one pass over each list.
+
+        Args:
+            task_ids (iterable): IDs of the tasks to remove
+        """
+        removed = {False: set(), True: set()}
+        for task_id in task_ids:
+            if task_id in self._positions:
+                completed, entry = self._positions.pop(task_id)
+                removed[completed].add(entry)
+        for completed, entries in removed.items():
+            if entries:
+                self._entries[completed] = [
+                    entry for entry in self._entries[completed] if entry not in entries
+                ]
+
+    def overdue(self, today):
+        """
+        Args:
+            today (str): Today's date in YYYY-MM-DD format
+
+        Returns:
+            list: IDs of incomplete tasks due before today, earliest first
+        """
+        return self.before(today, completed=False)
+
+    def count_before(self, date, completed=None):
+        """
+        Args:
+            date (str): Date in YYYY-MM-DD format
+            completed (bool): Completion status to include, or None for both
+
+        Returns:
+            int: Number of tasks due before the date
+        """
+        statuses = [False, True] if completed is None else [bool(completed)]
+        return sum(bisect.bisect_left(self._entries[status], (date,)) for status in statuses)
+
+    def before(self, date, completed=None):
+        """
+        Args:
+            date (str): Date in YYYY-MM-DD format
+            completed (bool): Completion status to include, or None for both
+
+        Returns:
+            list: IDs of the tasks due before the date, earliest first
+        """
+        statuses = [False, True] if completed is None else [bool(completed)]
+        ranges = []
+        for status in statuses:
+            entries = self._entries[status]
+            ranges.append(entries[: bisect.bisect_left(entries, (date,))])
+        return [task_id for _, task_id in heapq.merge(*ranges)]
+
+    def due_between(self, start, end, completed=None):
+        """
+        Args:
+            start (str): Earliest due date to include, in YYYY-MM-DD format
+            end (str): Latest due date to include, in YYYY-MM-DD format
+            completed (bool): Completion status to include, or None for both
+
+        Returns:
+            list: IDs of the tasks due in the range, earliest first
+        """
+        statuses = [False, True] if completed is None else [bool(completed)]
+        ranges = []
+        for status in statuses:
+            entries = self._entries[status]
+            # (end + "\0",) sorts after every entry due on the end date itself
+            first = bisect.bisect_left(entries, (start,))
+            last = bisect.bisect_left(entries, (end + "\0",))
+            ranges.append(entries[first:last])
+        return [task_id for _, task_id in heapq.merge(*ranges)]
+
+    def next_due(self, today, count):
+        """
+        Args:
+            today (str): Today's date in YYYY-MM-DD format
+            count (int): Maximum number of tasks to return
+
+        Returns:
+            list: IDs of the first incomplete tasks due on or after today
+        """
+        entries = self._entries[False]
+        start = bisect.bisect_left(entries, (today,))
+        return [task_id for _, task_id in entries[start : start + max(count, 0)]]
+
+    def iter_after(self, cursor=None, completed=None):
+        """
+        Iterate through the index in due date order, starting after a cursor.
+
+        Args:
+            cursor (tuple): (due date, task ID) of the last task already seen,
+                or None to start from the beginning
+            completed (bool): Completion status to include, or None for both
+
+        Yields:
+            tuple: (due date, task ID) of each following task
+        """
+        statuses = [False, True] if completed is None else [bool(completed)]
+        ranges = []
+        for status in statuses:
+            entries = self._entries[status]
+            start = 0 if cursor is None else bisect.bisect_right(entries, tuple(cursor))
+            ranges.append(_iter_from(entries, start))
+        yield from heapq.merge(*ranges)
+
+    def _unindex(self, task_id):
+        completed, entry = self._positions.pop(task_id)
+        entries = self._entries[completed]
+        del entries[bisect.bisect_left(entries, entry)]
@@ -0,0 +1,167 @@
+from collections import Counter
+
+# Stands for every value of a field in the counters' keys
+ANY = object()
+
+
+class FacetCounts:
+    """
+    Counts of tasks by category, priority and completion status, and of open
+    tasks past their due date, kept up to date as tasks are added and removed.
+
+    Every combination of facet values is counted, including with any of the
+    facets left unconstrained, so adding or removing a task updates a fixed
+    number of counters and any count is a single lookup. Overdue counts are
+    kept for the last date they were asked for, and recounted from the open
+    tasks' distinct due dates when that date changes, i.e. about once a day.
+    """
+
+    FIELDS = ("category", "priority", "completed")
+
+    def __init__(self, tasks=()):
+        """
+        Args:
+            tasks (iterable): Task dictionaries to count
+        """
+        # (category, priority, completed) -> number of tasks, with ANY for
+        # fields counted over every value
+        self._counts = Counter()
+        self._open_by_due = {}  # Due date -> Counter of open (category, priority)
+        # (category, priority) -> overdue tasks, with ANY as in _counts
+        self._overdue = Counter()
+        self._today = None  # Date the overdue counts are for
+        for task in tasks:
+            self.add(task)
+
+    def __len__(self):
+        return self.count()
+
+    def _change(self, task, delta):
+        # Unrolled over every combination of fields, as this runs on every change
+        category = task.get("category")
+        priority = task.get("priority")
+        completed = task.get("completed")
+        counts = self._counts
+        counts[category, priority, completed] += delta
+        counts[category, priority, ANY] += delta
+        counts[category, ANY, completed] += delta
+        counts[category, ANY, ANY] += delta
+        counts[ANY, priority, completed] += delta
+        counts[ANY, priority, ANY] += delta
+        counts[ANY, ANY, completed] += delta
+        counts[ANY, ANY, ANY] += delta
+        if task.get("completed", False):
+            return
+        due_date = task.get("due_date") or ""
+        due_counts = self._open_by_due.get(due_date)
+        if due_counts is None:
+            due_counts = self._open_by_due[due_date] = Counter()
+        due_counts[category, priority] += delta
+        if not due_counts[category, priority]:
+            del due_counts[category, priority]
+            if not due_counts:
+                del self._open_by_due[due_date]
+        if self._today is not None and due_date < self._today:
+            self._count_overdue(category, priority, delta)
+
+    def _count_overdue(self, category, priority, delta):
+        overdue = self._overdue
+        overdue[category, priority] += delta
+        overdue[category, ANY] += delta
+        overdue[ANY, priority] += delta
+        overdue[ANY, ANY] += delta
+
+    def add(self, task):
+        """
+        Count a task.
+
+        Args:
+            task (dict): Task dictionary
+        """
+        self._change(task, 1)
+
+    def remove(self, task):
+        """
+        Stop counting a task. Call before changing any of its counted fields,
+        and add it again afterwards.
+
+        Args:
+            task (dict): Task dictionary, with the values it was counted with
+        """
+        self._change(task, -1)
+
+    def _key(self, fields, criteria):
+        unknown = set(criteria) - set(fields)
+        if unknown:
+            raise ValueError(f"Can't count by {', '.join(sorted(unknown))}")
+        return tuple(criteria.get(field, ANY) for field in fields)
+
+    def count(self, **criteria):
+        """
+        Args:
+            **criteria: Field/value pairs, with fields from FIELDS
+
+        Returns:
+            int: Number of tasks whose fields equal all of the values
+        """
+        return self._counts[self._key(self.FIELDS, criteria)]
+
+    def overdue(self, today, **criteria):
+        """
+        Args:
+            today (str): Today's date in YYYY-MM-DD format
+            **criteria: Category and/or priority to count within
+
+        Returns:
+            int: Number of incomplete tasks due before today
+        """
+        if today != self._today:
+            self._recount_overdue(today)
+        return self._overdue[self._key(self.FIELDS[:2], criteria)]
+
+    def _recount_overdue(self, today):
+        self._today = today
+        self._overdue = Counter()
+        for due_date, due_counts in self._open_by_due.items():
+            if due_date < today:
+                for (category, priority), number in due_counts.items():
+                    self._count_overdue(category, priority, number)
+
+    def values(self, field):
+        """
+        Args:
+            field (str): One of FIELDS
+
+        Returns:
+            list: Distinct values of the field among the counted tasks
+        """
+        index = self.FIELDS.index(field)
+        return [
+            key[index]
+            for key, number in self._counts.items()
+            if number and key[index] is not ANY
+            and all(value is ANY for position, value in enumerate(key) if position != index)
+        ]
+
+    def summary(self, field, today):
+        """
+        Summarize the tasks with each value of a field, e.g. the open and
+        overdue tasks of each category.
+
+        Args:
+            field (str): "category" or "priority"
+            today (str): Today's date in YYYY-MM-DD format
+
+        Returns:
+            dict: Value -> {"total", "open", "overdue"} numbers of tasks
+        """
+        return {
+            value: {
+                "total": total,
+                "open": self.count(**{field: value, "completed": False}),
+                "overdue": self.overdue(today, **{field: value}),
+            }
+            for value, total in (
+                (value, self.count(**{field: value})) for value in self.values(field)
+            )
+        }
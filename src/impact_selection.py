@@ -0,0 +1,414 @@
+import ast
+import hashlib
+import json
+import os
+import time
+from bisect import bisect_right
+import pytest
+
+# A pytest plugin, enabled with "-p src.impact_selection", that only runs the
+# tests affected by changes since they last passed. Every run records each
+# test's outcome with hashes of its test file, of the support files under the
+# test directory, and of each function and module it covered, so runs must
+# measure coverage with per-test contexts, e.g. "--cov src --cov-context=test".
+# With --affected, tests whose recorded pass still matches every hash are
+# deselected. Code that coverage doesn't measure, e.g. outside src, isn't tracked,
+# so tests that covered nothing, e.g. ones running code in a subprocess, always run.
+
+DEFAULT_CACHE_FILE = ".test_impact.json"
+CACHE_FORMAT = 1
+
+# Outcomes of recorded runs that can be reused instead of running the test again
+REUSABLE_OUTCOMES = ("passed", "skipped")
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _function_units(tree):
+    # Outermost functions, including methods of (nested) classes, by qualified name
+    units = []
+
+    def visit(body, prefix):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                units.append((prefix + node.name, node))
+            elif isinstance(node, ast.ClassDef):
+                visit(node.body, f"{prefix}{node.name}.")
+
+    visit(tree.body, "")
+    return units
+
+
+class _StripFunctions(ast.NodeTransformer):
+    def visit_FunctionDef(self, node):
+        return None
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+
+def hash_source_file(file_path):
+    """
+    Hash the functions of a Python file separately from the rest of it, so a
+    change to one function only invalidates the tests that ran it. Comments
+    and formatting don't change the hashes.
+
+    Args:
+        file_path (str): Path to the Python file
+
+    Returns:
+        dict: "module" hash of everything outside functions, "functions" hashes
+            by qualified name, and "lines" as sorted (first line, last line, name)
+            of each function; None if the file is missing or can't be parsed
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return None
+    functions = {}
+    lines = []
+    for name, node in _function_units(tree):
+        functions[name] = _hash(ast.dump(node))
+        first = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        lines.append((first, node.end_lineno, name))
+    lines.sort()
+    module = _hash(ast.dump(_StripFunctions().visit(tree)))
+    return {"module": module, "functions": functions, "lines": lines}
+
+
+def hash_file(file_path):
+    """
+    Args:
+        file_path (str): Path to any file
+
+    Returns:
+        str: Hash of the file's contents, None if it is missing
+    """
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def hash_support_files(test_dir):
+    """
+    Hash every file under the test directory that isn't a test module, e.g.
+    conftest.py and feature files, as changing them can affect any test.
+
+    Args:
+        test_dir (str): Path to the test directory
+
+    Returns:
+        str: Combined hash of the files' paths and contents
+    """
+    digest = hashlib.sha256()
+    for directory, subdirectories, file_names in os.walk(test_dir):
+        subdirectories[:] = sorted(d for d in subdirectories if d != "__pycache__")
+        for file_name in sorted(file_names):
+            if file_name.startswith("test_") and file_name.endswith(".py"):
+                continue
+            if file_name.endswith((".pyc", ".pyo")):
+                continue
+            file_path = os.path.join(directory, file_name)
+            digest.update(os.path.relpath(file_path, test_dir).encode("utf-8"))
+            digest.update((hash_file(file_path) or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SourceHashes:
+    """
+    Hashes of the current source files, each computed on first use.
+    """
+
+    def __init__(self, root_dir, test_dir):
+        self.root_dir = root_dir
+        self.support = hash_support_files(test_dir)
+        self._sources = {}
+        self._files = {}
+
+    def source(self, file_path):
+        """
+        Args:
+            file_path (str): Path relative to the root directory
+
+        Returns:
+            dict: hash_source_file of the file
+        """
+        if file_path not in self._sources:
+            self._sources[file_path] = hash_source_file(os.path.join(self.root_dir, file_path))
+        return self._sources[file_path]
+
+    def file(self, file_path):
+        """
+        Args:
+            file_path (str): Path relative to the root directory
+
+        Returns:
+            str: hash_file of the file
+        """
+        if file_path not in self._files:
+            self._files[file_path] = hash_file(os.path.join(self.root_dir, file_path))
+        return self._files[file_path]
+
+
+def get_test_file(nodeid):
+    """
+    Args:
+        nodeid (str): pytest node ID, e.g. "tests/test_basic.py::test_add"
+
+    Returns:
+        str: Path of the test's file relative to the root directory
+    """
+    return nodeid.split("::", 1)[0]
+
+
+def is_reusable(record, hashes):
+    """
+    Check whether a recorded test result still holds, because neither the
+    test nor any code it ran has changed since. Tests that covered no
+    measured code are never reused, as what they ran can't be told apart
+    from running nothing.
+
+    Args:
+        record (dict): Recorded result of the test
+        hashes (SourceHashes): Hashes of the current source files
+
+    Returns:
+        bool: Whether the test can be skipped and its result reused
+    """
+    if record["outcome"] not in REUSABLE_OUTCOMES or record["support"] != hashes.support:
+        return False
+    if record["file"] != hashes.file(record["test_file"]) or not record["sources"]:
+        return False
+    for file_path, covered in record["sources"].items():
+        source = hashes.source(file_path)
+        if source is None or source["module"] != covered["module"]:
+            return False
+        for name, function_hash in covered["functions"].items():
+            if source["functions"].get(name) != function_hash:
+                return False
+    return True
+
+
+def load_cache(cache_path):
+    """
+    Args:
+        cache_path (str): Path to the cache file
+
+    Returns:
+        dict: Recorded results under "tests" by node ID, empty if there are none yet
+    """
+    try:
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {"format": CACHE_FORMAT, "tests": {}}
+    if cache.get("format") != CACHE_FORMAT:
+        return {"format": CACHE_FORMAT, "tests": {}}
+    return cache
+
+
+def save_cache(cache, cache_path):
+    """
+    Args:
+        cache (dict): Recorded results, as returned by load_cache
+        cache_path (str): Path to the cache file
+    """
+    # Imported here, as importing src.tasks while pytest loads plugins would run
+    # its module code before coverage starts measuring it
+    from src.tasks import atomic_write_json
+
+    atomic_write_json(cache, cache_path)
+
+
+def get_covered_lines(data_file, root_dir):
+    """
+    Read which lines each test ran from coverage data with per-test contexts.
+
+    Args:
+        data_file (str): Path to the coverage data file
+        root_dir (str): Directory that recorded paths are made relative to
+
+    Returns:
+        dict: Node ID -> {relative file path -> set of line numbers}, None if
+            the data is missing or has no per-test contexts
+    """
+    from coverage import CoverageData
+
+    if not os.path.exists(data_file):
+        return None
+    data = CoverageData(data_file)
+    data.read()
+    if not any(data.measured_contexts()):
+        return None
+    covered = {}
+    for measured_file in data.measured_files():
+        if os.path.abspath(measured_file) == os.path.abspath(__file__):
+            continue  # This plugin's hooks run inside every test's context
+        file_path = os.path.relpath(measured_file, root_dir)
+        for line, contexts in data.contexts_by_lineno(measured_file).items():
+            for context in contexts:
+                if not context:
+                    continue  # Run outside any test, e.g. on import
+                nodeid = context.rsplit("|", 1)[0]
+                covered.setdefault(nodeid, {}).setdefault(file_path, set()).add(line)
+    return covered
+
+
+def make_record(nodeid, outcome, covered_lines, hashes):
+    """
+    Record a test's result with hashes of the test and of the code it ran.
+
+    Args:
+        nodeid (str): pytest node ID of the test
+        outcome (str): "passed", "failed" or "skipped"
+        covered_lines (dict): Relative file path -> set of line numbers the test ran
+        hashes (SourceHashes): Hashes of the source files as of the run
+
+    Returns:
+        dict: Record for is_reusable
+    """
+    sources = {}
+    for file_path, lines in covered_lines.items():
+        source = hashes.source(file_path)
+        if source is None:
+            continue
+        starts = [first for first, _, _ in source["lines"]]
+        functions = {}
+        for line in lines:
+            index = bisect_right(starts, line) - 1
+            if index >= 0 and line <= source["lines"][index][1]:
+                name = source["lines"][index][2]
+                functions[name] = source["functions"][name]
+        sources[file_path] = {"module": source["module"], "functions": functions}
+    test_file = get_test_file(nodeid)
+    return {
+        "outcome": outcome,
+        "test_file": test_file,
+        "file": hashes.file(test_file),
+        "support": hashes.support,
+        "sources": sources,
+    }
+
+
+class ImpactRecorder:
+    """
+    Deselects unaffected tests with --affected, and records every test's
+    result once the session finishes.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        # Not config.rootpath, as "--cov src" makes pytest pick src as the root
+        self.root_dir = str(config.invocation_params.dir)
+        self.cache_path = os.path.join(self.root_dir, config.getoption("impact_cache"))
+        self.test_dir = os.path.join(self.root_dir, config.getoption("impact_test_dir"))
+        self.cache = load_cache(self.cache_path)
+        # Hashed as the session starts, so edits made during the run aren't
+        # recorded as tested
+        self.hashes = SourceHashes(self.root_dir, self.test_dir)
+        self.outcomes = {}
+        self.reused = 0
+        self.recorded = True
+        self.started_at = time.time()
+
+    def pytest_collection_modifyitems(self, config, items):
+        if not config.getoption("affected"):
+            return
+        selected, deselected = [], []
+        for item in items:
+            record = self.cache["tests"].get(item.nodeid)
+            if record is not None and is_reusable(record, self.hashes):
+                deselected.append(item)
+            else:
+                selected.append(item)
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+        self.reused = len(deselected)
+
+    def pytest_runtest_logreport(self, report):
+        if report.failed:
+            self.outcomes[report.nodeid] = "failed"
+        elif report.skipped:
+            self.outcomes.setdefault(report.nodeid, "skipped")
+        elif report.when == "call":
+            self.outcomes.setdefault(report.nodeid, "passed")
+
+    def pytest_sessionfinish(self, session):
+        if session.exitstatus == pytest.ExitCode.NO_TESTS_COLLECTED and self.reused:
+            # Every test was deselected, as none were affected
+            session.exitstatus = pytest.ExitCode.OK
+        if not self.outcomes or is_worker(self.config):
+            return
+        data_file = os.environ.get("COVERAGE_FILE", os.path.join(os.getcwd(), ".coverage"))
+        covered = None
+        # Older coverage data would be from another run
+        if os.path.exists(data_file) and os.path.getmtime(data_file) >= self.started_at:
+            covered = get_covered_lines(data_file, self.root_dir)
+        if covered is None:
+            self.recorded = False
+            return
+        tests = self.cache["tests"]
+        for nodeid, outcome in self.outcomes.items():
+            tests[nodeid] = make_record(nodeid, outcome, covered.get(nodeid, {}), self.hashes)
+        # Tests of files that changed but didn't run no longer exist
+        for nodeid in list(tests):
+            record = tests[nodeid]
+            if nodeid not in self.outcomes and record["file"] != self.hashes.file(
+                record["test_file"]
+            ):
+                del tests[nodeid]
+        save_cache(self.cache, self.cache_path)
+
+    def pytest_sessionstart(self, session):
+        if self.config.getoption("affected") and not is_worker(self.config):
+            # Under pytest-xdist only the workers collect and deselect, so count here
+            self.reused = sum(
+                is_reusable(record, self.hashes) for record in self.cache["tests"].values()
+            )
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if is_worker(self.config):
+            return
+        if self.config.getoption("affected"):
+            terminalreporter.write_line(f"Reused {self.reused} cached passing results")
+        if not self.recorded:
+            terminalreporter.write_line(
+                "Test impact not recorded, as there is no coverage data with per-test "
+                "contexts; run with --cov and --cov-context=test"
+            )
+
+
+def is_worker(config):
+    """
+    Returns:
+        bool: Whether pytest is running as a pytest-xdist worker
+    """
+    return hasattr(config, "workerinput")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("impact_selection", "test impact selection")
+    group.addoption(
+        "--affected",
+        action="store_true",
+        help="Only run tests affected by changes since they last passed",
+    )
+    group.addoption(
+        "--impact-cache",
+        default=DEFAULT_CACHE_FILE,
+        help="File of recorded test results, relative to the directory pytest runs from",
+    )
+    group.addoption(
+        "--impact-test-dir",
+        default="tests",
+        help="Directory of the tests, relative to the directory pytest runs from",
+    )
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(ImpactRecorder(config), "impact_recorder")
@@ -0,0 +1,242 @@
+import json
+import os
+from src.tasks import (
+    DEFAULT_TASKS_FILE,
+    file_lock,
+    get_journal_path,
+    load_meta,
+    load_tasks,
+    update_meta,
+)
+from src.write_behind import commit_tasks
+
+# Once the journal grows past this many bytes it is folded back into the snapshot
+JOURNAL_COMPACT_THRESHOLD = 1024 * 1024
+
+# Number of bytes read at a time when looking back for the end of the last record
+JOURNAL_SCAN_SIZE = 4096
+
+
+def append_journal_records(records, file_path=DEFAULT_TASKS_FILE):
+    """
+    Durably append mutation records to the journal of a task file as one
+    commit, under the file lock. The commit version and ID counter in the
+    metadata file are advanced with it, and the journal is compacted into the
+    snapshot once it passes JOURNAL_COMPACT_THRESHOLD.
+
+    Args:
+        records (list): Mutation records with an "op" key of add, update or delete
+        file_path (str): Path to the JSON snapshot file the journal belongs to
+
+    Returns:
+        int: The version of the task file after the commit
+    """
+    data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+    with file_lock(file_path):
+        with open(get_journal_path(file_path), "a+b") as f:
+            discard_torn_tail(f)
+            f.write(data.encode())
+            f.flush()
+            os.fsync(f.fileno())
+            journal_size = f.tell()
+        meta = load_meta(file_path)
+        version = meta.get("version", 0) + 1
+        next_id = max(
+            [meta.get("next_id", 1)]
+            + [record["task"]["id"] + 1 for record in records if record["op"] == "add"]
+        )
+        update_meta(file_path, version=version, next_id=next_id)
+        if journal_size >= JOURNAL_COMPACT_THRESHOLD:
+            version = compact_journal(file_path)
+    return version
+
+
+def discard_torn_tail(f):
+    """
+    Truncate a journal opened for appending back to the end of its last
+    complete record, so a write torn by a crash isn't glued onto the next one.
+
+    Args:
+        f (file): Journal file opened in binary append mode
+    """
+    end = f.seek(0, os.SEEK_END)
+    position = end
+    while position > 0:
+        start = max(position - JOURNAL_SCAN_SIZE, 0)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b"\n")
+        if newline != -1:
+            position = start + newline + 1
+            break
+        position = start
+    if position != end:
+        f.truncate(position)
+
+
+def append_journal_record(record, file_path=DEFAULT_TASKS_FILE, writer=None):
+    """
+    Append a single mutation record to the journal of a task file.
+
+    Args:
+        record (dict): Mutation record with an "op" key of add, update or delete
+        file_path (str): Path to the JSON snapshot file the journal belongs to
+        writer (WriteBehindQueue): Queue to group-commit the record through,
+            or None to commit it immediately
+    """
+    if writer is not None:
+        writer.append(record)
+    else:
+        append_journal_records([record], file_path)
+
+
+def journal_add(task, file_path=DEFAULT_TASKS_FILE, writer=None):
+    """
+    Record the addition of a task.
+
+    Args:
+        task (dict): The new task dictionary
+        file_path (str): Path to the JSON snapshot file
+        writer (WriteBehindQueue): Queue to group-commit the record through, if any
+    """
+    append_journal_record({"op": "add", "task": task}, file_path, writer)
+
+
+def journal_update(task_id, changes, file_path=DEFAULT_TASKS_FILE, writer=None):
+    """
+    Record changes to the fields of an existing task.
+
+    Args:
+        task_id (int): ID of the task to update
+        changes (dict): Fields to overwrite on the task
+        file_path (str): Path to the JSON snapshot file
+        writer (WriteBehindQueue): Queue to group-commit the record through, if any
+    """
+    append_journal_record({"op": "update", "id": task_id, "changes": changes}, file_path, writer)
+
+
+def journal_delete(task_id, file_path=DEFAULT_TASKS_FILE, writer=None):
+    """
+    Record the deletion of a task.
+
+    Args:
+        task_id (int): ID of the task to delete
+        file_path (str): Path to the JSON snapshot file
+        writer (WriteBehindQueue): Queue to group-commit the record through, if any
+    """
+    append_journal_record({"op": "delete", "id": task_id}, file_path, writer)
+
+
+def read_journal(journal_path):
+    """
+    Read the records of a journal file.
+
+    Args:
+        journal_path (str): Path to the journal file
+
+    Yields:
+        dict: Mutation records in the order they were written
+
+    Raises:
+        ValueError: If a record other than the last one is invalid
+    """
+    with open(journal_path, "r") as f:
+        invalid_line = None
+        for line_number, line in enumerate(f, start=1):
+            if invalid_line is not None:
+                # Records were committed after it, so it isn't just a torn write
+                raise ValueError(f"{journal_path} line {invalid_line} is corrupt")
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                invalid_line = line_number
+                continue
+            yield record
+        if invalid_line is not None:
+            # A torn final write from a crash; it was never committed
+            print(f"Warning: {journal_path} line {invalid_line} is invalid. Ignoring it.")
+
+
+def iter_replay_journal(tasks, journal_path):
+    """
+    Apply the records of a journal file to a stream of tasks. The journal is
+    first reduced to the net effect on each task ID, so the snapshot tasks can
+    be passed through one at a time. Replaying is idempotent, so a journal left
+    behind by an interrupted compaction is safe.
+
+    Args:
+        tasks (iterable): Task dictionaries from the snapshot
+        journal_path (str): Path to the journal file
+
+    Yields:
+        dict: Task dictionaries with all journaled mutations applied
+    """
+    # Task ID -> net effect on the snapshot's copy of the task, one of
+    #   ("patch", changes): overwrite fields of the snapshot task, if there is one
+    #   ("replace", task): replace the snapshot task in place, or append it if there is none
+    #   ("append", task): drop any snapshot task and append this one
+    #   ("delete", None): drop any snapshot task
+    effects = {}
+    appended_at = {}  # Task ID -> order in which it would have been appended
+    for record in read_journal(journal_path):
+        task_id = record["task"]["id"] if record["op"] == "add" else record["id"]
+        kind, value = effects.get(task_id, (None, None))
+        if record["op"] == "add":
+            if kind in (None, "patch"):
+                effects[task_id] = ("replace", record["task"])
+                appended_at[task_id] = len(appended_at)
+            elif kind == "delete":
+                effects[task_id] = ("append", record["task"])
+                appended_at[task_id] = len(appended_at)
+            else:
+                effects[task_id] = (kind, record["task"])
+        elif record["op"] == "update":
+            if kind is None:
+                effects[task_id] = ("patch", record["changes"])
+            elif kind != "delete":
+                effects[task_id] = (kind, {**value, **record["changes"]})
+        elif record["op"] == "delete":
+            effects[task_id] = ("delete", None)
+
+    replaced = set()
+    for task in tasks:
+        kind, value = effects.get(task["id"], (None, None))
+        if kind is None:
+            yield task
+        elif kind == "patch":
+            yield {**task, **value}
+        elif kind == "replace":
+            replaced.add(task["id"])
+            yield value
+    for task_id in sorted(appended_at, key=appended_at.__getitem__):
+        kind, value = effects[task_id]
+        if kind == "append" or (kind == "replace" and task_id not in replaced):
+            yield value
+
+
+def replay_journal(tasks, journal_path):
+    """
+    Apply the records of a journal file to a list of tasks.
+
+    Args:
+        tasks (list): List of task dictionaries loaded from the snapshot
+        journal_path (str): Path to the journal file
+
+    Returns:
+        list: List of task dictionaries with all journaled mutations applied
+    """
+    return list(iter_replay_journal(tasks, journal_path))
+
+
+def compact_journal(file_path=DEFAULT_TASKS_FILE):
+    """
+    Fold the journal of a task file back into its snapshot, atomically and
+    under the file lock, so no concurrent append is lost.
+
+    Args:
+        file_path (str): Path to the JSON snapshot file
+
+    Returns:
+        int: The version of the task file after compaction
+    """
+    with file_lock(file_path):
+        return commit_tasks(load_tasks(file_path), file_path)  # Also discards the journal
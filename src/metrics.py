@@ -0,0 +1,502 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Set to enable metrics from process start, e.g. TASKS_METRICS=1 streamlit run src/app.py
+METRICS_ENV_VAR = "TASKS_METRICS"
+# Set to a path to rewrite it in the Prometheus text format after every rerun
+METRICS_FILE_ENV_VAR = "TASKS_METRICS_FILE"
+# Set to a port to serve the metrics over HTTP from the app's process
+METRICS_PORT_ENV_VAR = "TASKS_METRICS_PORT"
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+# Names under which app reruns are recorded, next to the instrumented functions
+RERUN_METRIC = "app_rerun"
+
+_enabled = os.environ.get(METRICS_ENV_VAR, "") not in ("", "0")
+_lock = threading.Lock()
+_functions = {}  # Function name -> recorded values, see _function_metrics
+_caches = {}  # Cache name -> [hits, misses]
+_profiler_request = None  # (dump path, minimum rerun seconds) while armed
+_server = None  # HTTP server started by start_export_from_env
+
+
+def is_enabled():
+    """
+    Returns:
+        bool: Whether metrics are being recorded
+    """
+    return _enabled
+
+
+def enable():
+    """
+    Start recording metrics.
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """
+    Stop recording metrics. Instrumented functions go back to a single flag
+    check of overhead per call.
+    """
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """
+    Discard every recorded metric.
+    """
+    with _lock:
+        _functions.clear()
+        _caches.clear()
+
+
+def _function_metrics(name):
+    metrics = _functions.get(name)
+    if metrics is None:
+        metrics = _functions[name] = {
+            "calls": 0,
+            "errors": 0,
+            "seconds": 0.0,
+            "buckets": [0] * len(LATENCY_BUCKETS),
+            "tasks": 0,
+            "read_file_size": 0,
+            "written_file_size": 0,
+            "bytes_returned": 0,
+        }
+    return metrics
+
+
+def record_call(
+    name, seconds, error=False, tasks=0, read_file_size=0, written_file_size=0, bytes_returned=0
+):
+    """
+    Record one call of an instrumented operation.
+
+    Args:
+        name (str): Name of the operation
+        seconds (float): How long the call took
+        error (bool): Whether the call raised
+        tasks (int): Number of tasks the call was given
+        read_file_size (int): Size of the files the call read, once it returned
+        written_file_size (int): Size of the files the call wrote, once it returned
+        bytes_returned (int): Size of bytes returned by the call, e.g. a CSV export
+    """
+    with _lock:
+        metrics = _function_metrics(name)
+        metrics["calls"] += 1
+        metrics["errors"] += error
+        metrics["seconds"] += seconds
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                metrics["buckets"][index] += 1
+                break
+        metrics["tasks"] += tasks
+        metrics["read_file_size"] += read_file_size
+        metrics["written_file_size"] += written_file_size
+        metrics["bytes_returned"] += bytes_returned
+
+
+def record_cache(name, hit):
+    """
+    Record a lookup in a cache, if metrics are enabled.
+
+    Args:
+        name (str): Name of the cache
+        hit (bool): Whether the lookup was served from the cache
+    """
+    if not _enabled:
+        return
+    with _lock:
+        counts = _caches.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def _file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except (OSError, TypeError):
+        return 0
+
+
+def instrument(function, reads_file=False, writes_file=False, get_file_paths=None):
+    """
+    Wrap a function to record its calls while metrics are enabled. Generator
+    functions are timed over their whole iteration rather than their creation.
+
+    File sizes are taken once the call returns, so they stand for the data a
+    full read or rewrite handles rather than the bytes actually transferred,
+    e.g. a load served from a cache still counts the whole file.
+
+    Args:
+        function (callable): Function to instrument
+        reads_file (bool): Whether its file_path argument is read, to record its size
+        writes_file (bool): Whether its file_path argument is written, to record its size
+        get_file_paths (callable): Maps the file_path argument to every file
+            whose size is recorded, or None for just file_path
+
+    Returns:
+        callable: The instrumented function
+    """
+    name = function.__name__
+    signature = inspect.signature(function)
+    parameters = list(signature.parameters)
+    tasks_position = parameters.index("tasks") if "tasks" in parameters else None
+    has_file = (reads_file or writes_file) and "file_path" in parameters
+
+    def measure_inputs(args, kwargs):
+        tasks = kwargs.get("tasks")
+        if tasks is None and tasks_position is not None and tasks_position < len(args):
+            tasks = args[tasks_position]
+        try:
+            task_count = len(tasks) if tasks is not None else 0
+        except TypeError:
+            task_count = 0  # A stream of tasks
+        file_path = None
+        if has_file:
+            bound = signature.bind_partial(*args, **kwargs)
+            bound.apply_defaults()
+            file_path = bound.arguments.get("file_path")
+        return task_count, file_path
+
+    def finish(start, error, task_count, file_path, result=None):
+        size = 0
+        if file_path is not None:
+            file_paths = (file_path,) if get_file_paths is None else get_file_paths(file_path)
+            size = sum(_file_size(path) for path in file_paths)
+        record_call(
+            name,
+            time.perf_counter() - start,
+            error=error,
+            tasks=task_count,
+            read_file_size=size if reads_file else 0,
+            written_file_size=size if writes_file else 0,
+            bytes_returned=len(result) if isinstance(result, bytes) else 0,
+        )
+
+    if inspect.isgeneratorfunction(function):
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            return _instrumented_generator(function, args, kwargs, measure_inputs, finish)
+
+    else:
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            task_count, file_path = measure_inputs(args, kwargs)
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                finish(start, True, task_count, file_path)
+                raise
+            finish(start, False, task_count, file_path, result)
+            return result
+
+    wrapper.__wrapped__ = function
+    return wrapper
+
+
+def _instrumented_generator(function, args, kwargs, measure_inputs, finish):
+    task_count, file_path = measure_inputs(args, kwargs)
+    start = time.perf_counter()
+    error = False
+    try:
+        yield from function(*args, **kwargs)
+    except Exception:
+        error = True
+        raise
+    finally:
+        finish(start, error, task_count, file_path)
+
+
+def instrument_functions(
+    namespace, reads_files=(), writes_files=(), exclude=(), get_file_paths=None
+):
+    """
+    Instrument every public function defined in a module, in place.
+
+    Args:
+        namespace (dict): The module's globals()
+        reads_files (iterable): Names of the functions that read their file_path
+        writes_files (iterable): Names of the functions that write their file_path
+        exclude (iterable): Names of public functions to leave alone, e.g.
+            context manager factories, whose calls return before any work is done
+        get_file_paths (dict): Function name -> get_file_paths argument of
+            instrument, for functions whose file_path isn't the only file they use
+    """
+    get_file_paths = get_file_paths or {}
+    module = namespace["__name__"]
+    for name, value in list(namespace.items()):
+        if (
+            not name.startswith("_")
+            and name not in exclude
+            and inspect.isfunction(value)
+            and value.__module__ == module
+        ):
+            namespace[name] = instrument(
+                value,
+                reads_file=name in reads_files,
+                writes_file=name in writes_files,
+                get_file_paths=get_file_paths.get(name),
+            )
+
+
+def profile_next_slow_rerun(dump_path, min_seconds=0.0):
+    """
+    Profile app reruns until one takes at least min_seconds, then write its
+    cProfile stats to a file and stop profiling.
+
+    Args:
+        dump_path (str): Path to write the stats to, readable with pstats
+        min_seconds (float): Shortest rerun worth keeping
+    """
+    global _profiler_request
+    _profiler_request = (dump_path, min_seconds)
+
+
+def cancel_profiling():
+    """
+    Stop waiting for a slow rerun to profile.
+    """
+    global _profiler_request
+    _profiler_request = None
+
+
+def is_profiling():
+    """
+    Returns:
+        bool: Whether a slow rerun is still waiting to be profiled
+    """
+    return _profiler_request is not None
+
+
+@contextmanager
+def record_rerun():
+    """
+    Time one rerun of the app, and profile it if a slow rerun was requested.
+    Can also decorate the function that renders the app.
+    """
+    global _profiler_request
+    request = _profiler_request
+    if not _enabled and request is None:
+        yield
+        return
+    profiler = None
+    if request is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        # Not BaseException, as Streamlit stops and reruns scripts by raising
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            dump_path, min_seconds = request
+            if seconds >= min_seconds and _profiler_request is request:
+                profiler.dump_stats(dump_path)
+                _profiler_request = None
+        if _enabled:
+            record_call(RERUN_METRIC, seconds, error=error)
+            metrics_file = os.environ.get(METRICS_FILE_ENV_VAR)
+            if metrics_file:
+                write_prometheus(metrics_file)
+
+
+def get_metrics():
+    """
+    Returns:
+        dict: Copies of the recorded metrics, under "functions" by function
+            name and under "caches" as {"hits", "misses", "hit_rate"} by cache name
+    """
+    with _lock:
+        functions = {
+            name: {**metrics, "buckets": list(metrics["buckets"])}
+            for name, metrics in _functions.items()
+        }
+        caches = {
+            name: {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+            for name, (hits, misses) in _caches.items()
+        }
+    return {"functions": functions, "caches": caches}
+
+
+def estimate_quantile(buckets, quantile):
+    """
+    Estimate a latency quantile from histogram bucket counts.
+
+    Args:
+        buckets (list): Count of calls per LATENCY_BUCKETS bucket
+        quantile (float): Quantile between 0 and 1, e.g. 0.95
+
+    Returns:
+        float: Upper bound of the bucket holding the quantile, 0.0 with no calls
+    """
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS, buckets):
+        seen += count
+        if seen >= quantile * total:
+            return bound
+    return LATENCY_BUCKETS[-1]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def export_prometheus():
+    """
+    Render the recorded metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: Metrics text
+    """
+    metrics = get_metrics()
+    lines = [
+        "# HELP tasks_calls_total Calls of each task operation.",
+        "# TYPE tasks_calls_total counter",
+    ]
+    functions = sorted(metrics["functions"].items())
+    for name, values in functions:
+        lines.append(f'tasks_calls_total{{function="{_label(name)}"}} {values["calls"]}')
+    lines += [
+        "# HELP tasks_errors_total Calls of each task operation that raised.",
+        "# TYPE tasks_errors_total counter",
+    ]
+    for name, values in functions:
+        lines.append(f'tasks_errors_total{{function="{_label(name)}"}} {values["errors"]}')
+    lines += [
+        "# HELP tasks_call_seconds Latency of each task operation.",
+        "# TYPE tasks_call_seconds histogram",
+    ]
+    for name, values in functions:
+        label = _label(name)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, values["buckets"]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'tasks_call_seconds_bucket{{function="{label}",le="{le}"}} {cumulative}')
+        lines.append(f'tasks_call_seconds_sum{{function="{label}"}} {values["seconds"]!r}')
+        lines.append(f'tasks_call_seconds_count{{function="{label}"}} {values["calls"]}')
+    for metric, field, help_text in (
+        ("tasks_input_tasks_total", "tasks", "Tasks passed to each task operation."),
+        (
+            "tasks_read_file_size_bytes_total",
+            "read_file_size",
+            "Sizes of the task files each operation read, not bytes transferred.",
+        ),
+        (
+            "tasks_written_file_size_bytes_total",
+            "written_file_size",
+            "Sizes of the task files each operation wrote, not bytes transferred.",
+        ),
+        ("tasks_returned_bytes_total", "bytes_returned", "Bytes returned, e.g. by CSV exports."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for name, values in functions:
+            if values[field]:
+                lines.append(f'{metric}{{function="{_label(name)}"}} {values[field]}')
+    lines += [
+        "# HELP tasks_cache_requests_total Lookups in each cache, by result.",
+        "# TYPE tasks_cache_requests_total counter",
+    ]
+    for name, values in sorted(metrics["caches"].items()):
+        for result, field in (("hit", "hits"), ("miss", "misses")):
+            lines.append(
+                f'tasks_cache_requests_total{{cache="{_label(name)}",result="{result}"}}'
+                f" {values[field]}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(file_path):
+    """
+    Write the recorded metrics in the Prometheus text format, e.g. for the
+    node exporter's textfile collector.
+
+    Args:
+        file_path (str): Path of the file to write
+    """
+    # Imported here, as src.tasks instruments itself with this module
+    from src.tasks import atomic_open
+
+    text = export_prometheus()
+    with atomic_open(file_path) as f:
+        f.write(text)
+
+
+def serve_prometheus(port=9464, host="127.0.0.1"):
+    """
+    Serve the recorded metrics over HTTP for Prometheus to scrape, from a
+    background thread.
+
+    Args:
+        port (int): Port to listen on, 0 for any free port
+        host (str): Address to listen on
+
+    Returns:
+        http.server.ThreadingHTTPServer: The running server; call shutdown() to stop it
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = export_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would otherwise be logged to stderr
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_export_from_env():
+    """
+    Serve the metrics on the port in the TASKS_METRICS_PORT environment
+    variable, if metrics are enabled and it is set. Only the first call starts
+    a server.
+
+    Returns:
+        http.server.ThreadingHTTPServer: The running server, or None
+    """
+    global _server
+    port = os.environ.get(METRICS_PORT_ENV_VAR)
+    with _lock:
+        if _server is None and _enabled and port:
+            _server = serve_prometheus(int(port))
+    return _server
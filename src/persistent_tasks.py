@@ -0,0 +1,320 @@
+# Each trie node has 2 ** BITS children, indexed by BITS bits of the task ID
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+_EMPTY_NODE = (None,) * WIDTH
+
+# Number of versions kept to undo by default
+UNDO_LIMIT = 50
+
+
+class PersistentTasks:
+    """
+    Immutable collection of tasks keyed by ID, stored as a 32-way trie on the
+    bits of each ID. Adding, replacing or deleting a task returns a new
+    collection that copies only the O(log n) nodes on the path to the task and
+    shares every other node with the old one, so keeping many versions costs
+    little more than keeping one.
+
+    Tasks are yielded in ID order. The task dictionaries are shared between
+    versions too, so they must never be changed in place; put a changed copy
+    instead, as update does.
+    """
+
+    __slots__ = ("_root", "_shift", "_count", "next_id")
+
+    def __init__(self, tasks=(), next_id=1):
+        """
+        Build a collection in one pass, rather than one version per task.
+
+        Args:
+            tasks (iterable): Task dictionaries with non-negative integer "id" keys
+            next_id (int): Lowest ID to allocate next, e.g. a TaskStore's next_id
+        """
+        leaves = {}
+        for task in tasks:
+            task_id = _check_id(task["id"])
+            leaf = leaves.setdefault(task_id >> BITS, [None] * WIDTH)
+            leaf[task_id & MASK] = task
+            next_id = max(next_id, task_id + 1)
+        self.next_id = next_id
+        self._count = sum(
+            sum(task is not None for task in leaf) for leaf in leaves.values()
+        )
+        # Group each level's nodes by their parent until a single root is left
+        shift = 0
+        nodes = {index: tuple(leaf) for index, leaf in leaves.items()}
+        while len(nodes) > 1 or (nodes and max(nodes) > 0):
+            parents = {}
+            for index, node in nodes.items():
+                parent = parents.setdefault(index >> BITS, [None] * WIDTH)
+                parent[index & MASK] = node
+            nodes = {index: tuple(parent) for index, parent in parents.items()}
+            shift += BITS
+        self._root = nodes.get(0)
+        self._shift = shift
+
+    @classmethod
+    def _make(cls, root, shift, count, next_id):
+        tasks = cls.__new__(cls)
+        tasks._root = root
+        tasks._shift = shift
+        tasks._count = count
+        tasks.next_id = next_id
+        return tasks
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return _iter_node(self._root, self._shift)
+
+    def __contains__(self, task_id):
+        return self.get(task_id) is not None
+
+    def to_list(self):
+        """
+        Returns:
+            list: List of task dictionaries in ID order
+        """
+        return list(self)
+
+    def get(self, task_id):
+        """
+        Args:
+            task_id (int): ID of the task to look up
+
+        Returns:
+            dict: The task with the ID, or None if there is none
+        """
+        if not isinstance(task_id, int) or task_id < 0 or task_id >> BITS >> self._shift:
+            return None
+        node = self._root
+        shift = self._shift
+        while node is not None and shift > 0:
+            node = node[(task_id >> shift) & MASK]
+            shift -= BITS
+        return None if node is None else node[task_id & MASK]
+
+    def set(self, task):
+        """
+        Add a task, or replace the task with the same ID.
+
+        Args:
+            task (dict): Task dictionary with a non-negative integer "id" key
+
+        Returns:
+            PersistentTasks: A new collection with the task
+        """
+        task_id = _check_id(task["id"])
+        root, shift = self._root, self._shift
+        while task_id >> BITS >> shift:
+            # Grow a level, keeping the current trie as the first child
+            root = None if root is None else (root,) + _EMPTY_NODE[1:]
+            shift += BITS
+        root, added = _assoc(root, shift, task_id, task)
+        return self._make(
+            root, shift, self._count + added, max(self.next_id, task_id + 1)
+        )
+
+    def update(self, task_id, changes):
+        """
+        Overwrite fields of a task, in a copy of it.
+
+        Args:
+            task_id (int): ID of the task to update
+            changes (dict): Fields to overwrite on the task
+
+        Returns:
+            PersistentTasks: A new collection with the updated task, or this
+                one if there is no task with the ID
+        """
+        task = self.get(task_id)
+        if task is None:
+            return self
+        return self.set({**task, **changes})
+
+    def delete(self, task_id):
+        """
+        Remove a task.
+
+        Args:
+            task_id (int): ID of the task to remove
+
+        Returns:
+            PersistentTasks: A new collection without the task, or this one if
+                there is no task with the ID
+        """
+        if self.get(task_id) is None:
+            return self
+        root = _dissoc(self._root, self._shift, task_id)
+        return self._make(root, self._shift, self._count - 1, self.next_id)
+
+    def diff(self, other):
+        """
+        Find the tasks that differ from another collection, only visiting the
+        parts of the tries that aren't shared between the two.
+
+        Args:
+            other (PersistentTasks): Collection to compare with, e.g. an older version
+
+        Yields:
+            tuple: (task ID, task in this collection, task in the other
+                collection) of each differing task, None where a task is missing
+        """
+        shift = max(self._shift, other._shift)
+        yield from _diff_nodes(
+            _raise_node(self._root, self._shift, shift),
+            _raise_node(other._root, other._shift, shift),
+            shift,
+            0,
+        )
+
+
+def _check_id(task_id):
+    if not isinstance(task_id, int) or task_id < 0:
+        raise ValueError(f"Task IDs must be non-negative integers, not {task_id!r}")
+    return task_id
+
+
+def _iter_node(node, shift):
+    if node is None:
+        return
+    if shift == 0:
+        for task in node:
+            if task is not None:
+                yield task
+        return
+    for child in node:
+        if child is not None:
+            yield from _iter_node(child, shift - BITS)
+
+
+def _assoc(node, shift, task_id, task):
+    # Copies of the nodes on the path to the task, and whether it is new
+    children = list(node or _EMPTY_NODE)
+    index = (task_id >> shift) & MASK
+    if shift == 0:
+        added = children[index] is None
+        children[index] = task
+    else:
+        children[index], added = _assoc(children[index], shift - BITS, task_id, task)
+    return tuple(children), added
+
+
+def _dissoc(node, shift, task_id):
+    children = list(node)
+    index = (task_id >> shift) & MASK
+    children[index] = None if shift == 0 else _dissoc(children[index], shift - BITS, task_id)
+    # Empty nodes are pruned, so deleting tasks frees their part of the trie
+    return tuple(children) if any(child is not None for child in children) else None
+
+
+def _raise_node(node, shift, target_shift):
+    while shift < target_shift:
+        node = None if node is None else (node,) + _EMPTY_NODE[1:]
+        shift += BITS
+    return node
+
+
+def _diff_nodes(node, other, shift, prefix):
+    if node is other:
+        return  # Shared, so everything below is equal
+    if shift == 0:
+        for index in range(WIDTH):
+            task = None if node is None else node[index]
+            other_task = None if other is None else other[index]
+            if task is not other_task:
+                yield prefix | index, task, other_task
+        return
+    for index in range(WIDTH):
+        yield from _diff_nodes(
+            None if node is None else node[index],
+            None if other is None else other[index],
+            shift - BITS,
+            (prefix | index) << BITS,
+        )
+
+
+class TaskHistory:
+    """
+    Undo and redo stack of the last changes to a PersistentTasks collection.
+    Each step keeps the versions from before and after it, which share
+    structure, so a step costs memory proportional to the tasks it changed
+    rather than to all tasks. A step's versions needn't follow on from the
+    previous step's, so changes made by others in between aren't undone.
+    """
+
+    def __init__(self, tasks, limit=UNDO_LIMIT):
+        """
+        Args:
+            tasks (PersistentTasks): Initial version
+            limit (int): Number of steps that can be undone
+        """
+        self.limit = limit
+        self._initial = tasks
+        self._steps = []  # (version before, version after) of each step
+        self._position = 0  # Number of steps currently applied
+
+    @property
+    def current(self):
+        """
+        PersistentTasks: The version after the last applied step
+        """
+        if self._position:
+            return self._steps[self._position - 1][1]
+        return self._steps[0][0] if self._steps else self._initial
+
+    def can_undo(self):
+        return self._position > 0
+
+    def can_redo(self):
+        return self._position < len(self._steps)
+
+    def push(self, tasks, previous=None):
+        """
+        Add a step to a new version, discarding any undone steps and the
+        oldest steps past the limit.
+
+        Args:
+            tasks (PersistentTasks): New version
+            previous (PersistentTasks): Version the step was made from, or None
+                for the current version
+        """
+        if previous is None:
+            previous = self.current
+        if tasks is previous:
+            return
+        del self._steps[self._position :]
+        self._steps.append((previous, tasks))
+        del self._steps[: max(len(self._steps) - self.limit, 0)]
+        self._position = len(self._steps)
+
+    def undo(self):
+        """
+        Go back to the version before the last applied step.
+
+        Returns:
+            list: (task ID, restored task, undone task) of each task the step
+                changed, the restored task being None if the step added it
+        """
+        if not self.can_undo():
+            return []
+        self._position -= 1
+        previous, tasks = self._steps[self._position]
+        return list(previous.diff(tasks))
+
+    def redo(self):
+        """
+        Go forward to the version after the next step, after an undo.
+
+        Returns:
+            list: (task ID, redone task, current task) of each task the step
+                changes, the redone task being None if the step deleted it
+        """
+        if not self.can_redo():
+            return []
+        previous, tasks = self._steps[self._position]
+        self._position += 1
+        return list(tasks.diff(previous))
@@ -0,0 +1,519 @@
+import json
+import os
+import struct
+from pathlib import Path
+from src.tasks import atomic_open, file_lock
+
+# Identifies a record task file, followed by the format version
+MAGIC = b"TSKR"
+FORMAT_VERSION = 1
+
+# magic, format version, flags, heap generation, record count,
+# string table offset and length in the heap, heap bytes no longer referenced
+HEADER = struct.Struct("<4sHHIIQIQ")
+
+# id, flags, completed (-1 if absent), priority code, category code (-1 if absent),
+# due date (empty if absent), offset and length of the task's text in the heap
+RECORD = struct.Struct("<qBbhh10sQI")
+
+# Set in a record's flags once its task is deleted
+DELETED = 1
+
+# Set in the header's flags while the records are in strictly ascending ID
+# order, so a task's record can be found by binary search
+SORTED = 1
+
+MISSING = -1
+
+# Fields kept in the fixed-width record rather than the text heap
+FIXED_FIELDS = ("id", "completed", "priority", "category", "due_date")
+
+# The heap is compacted once more than this fraction of it is unreferenced
+HEAP_COMPACT_RATIO = 0.5
+
+# Heaps smaller than this are never compacted
+HEAP_COMPACT_MIN_BYTES = 64 * 1024
+
+
+def get_heap_path(file_path, generation):
+    """
+    Get the path of one generation of the text heap belonging to a record file.
+
+    Args:
+        file_path (str): Path to the record file
+        generation (int): Heap generation, which changes on every compaction
+
+    Returns:
+        str: Path to the heap file
+    """
+    return f"{file_path}.heap.{generation}"
+
+
+def _encode_due_date(due_date):
+    if isinstance(due_date, str) and len(due_date) == 10 and due_date.isascii():
+        return due_date.encode("ascii")
+    return None
+
+
+def _split_task(task, code):
+    # Separates the fields stored in a record from the ones stored as heap text.
+    # Values that don't fit their fixed-width field, e.g. a non-string
+    # category, are kept in the heap text instead.
+    extra = {key: value for key, value in task.items() if key not in FIXED_FIELDS}
+    completed = task.get("completed")
+    if type(completed) is bool:
+        completed_code = int(completed)
+    else:
+        completed_code = MISSING
+        if "completed" in task:
+            extra["completed"] = completed
+    codes = []
+    for field in ("priority", "category"):
+        field_code = code(task[field]) if isinstance(task.get(field), str) else None
+        if field_code is None:
+            field_code = MISSING
+            if field in task:
+                extra[field] = task[field]
+        codes.append(field_code)
+    due_date = _encode_due_date(task.get("due_date"))
+    if due_date is None and "due_date" in task:
+        extra["due_date"] = task["due_date"]
+    return (completed_code, codes[0], codes[1], due_date or b""), extra
+
+
+class RecordFile:
+    """
+    Task file made of a fixed-width record per task, holding its ID, completion
+    status, priority and category codes, due date and the location of its
+    other fields in a separate append-only text heap.
+
+    Completing, reprioritizing, recategorizing, rescheduling or deleting a task
+    overwrites its record in place, without touching any other task. Text
+    changes append to the heap and repoint the record, leaving the old text as
+    garbage until the heap is compacted into a new generation.
+
+    While records are in ascending ID order, as save_tasks_records writes
+    them for tasks in ID order and as adding tasks with new, higher IDs keeps
+    them, a task's record is found by binary search rather than by reading
+    every record on open.
+
+    Task IDs must be integers.
+    """
+
+    def __init__(self, file_path, writable=True):
+        """
+        Args:
+            file_path (str): Path to the record file, which must exist
+            writable (bool): Whether to open the files for changes, or only
+                for reading, which never creates a heap file
+
+        Raises:
+            ValueError: If the file isn't a record task file of a supported version
+        """
+        self.file_path = file_path
+        self._file = open(file_path, "r+b" if writable else "rb")
+        self._heap = None
+        try:
+            (
+                magic,
+                version,
+                self._flags,
+                self.generation,
+                self._count,
+                self._strings_offset,
+                self._strings_length,
+                self.garbage,
+            ) = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(
+                    f"{file_path} is not a version {FORMAT_VERSION} record task file"
+                )
+            heap_path = get_heap_path(file_path, self.generation)
+            self._heap = open(heap_path, "a+b" if writable else "rb")
+            self._strings = json.loads(self._read_heap(self._strings_offset, self._strings_length))
+        except BaseException:
+            self.close()
+            raise
+        self._codes = {value: code for code, value in enumerate(self._strings)}
+        # Task ID -> record index for live tasks, only read once needed
+        self._positions = None
+
+    def __len__(self):
+        return len(self._get_positions())
+
+    def __contains__(self, task_id):
+        return self._find(task_id) is not None
+
+    def __iter__(self):
+        self._file.seek(HEADER.size)
+        records = self._file.read(self._count * RECORD.size)
+        for record in RECORD.iter_unpack(records):
+            if not record[1] & DELETED:
+                yield self._decode(record)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def heap_size(self):
+        """
+        int: Size of the current text heap in bytes
+        """
+        return self._heap.seek(0, os.SEEK_END)
+
+    def close(self):
+        """
+        Close the record file and its heap.
+        """
+        self._file.close()
+        if self._heap is not None:
+            self._heap.close()
+
+    def get(self, task_id):
+        """
+        Args:
+            task_id (int): ID of the task to look up
+
+        Returns:
+            dict: The task with the ID, or None if there is none
+        """
+        index = self._find(task_id)
+        return None if index is None else self._decode(self._read_record(index))
+
+    def add(self, task):
+        """
+        Append a task, replacing any existing task with the same ID.
+
+        Args:
+            task (dict): Task dictionary with an integer "id" key
+        """
+        if task["id"] in self:
+            self.delete(task["id"])
+        index = self._count
+        if index and self._read_record(index - 1)[0] >= task["id"]:
+            self._flags &= ~SORTED
+        self._write_record(index, self._encode(task))
+        self._count += 1
+        if self._positions is not None:
+            self._positions[task["id"]] = index
+        self._write_header()
+
+    def update(self, task_id, changes):
+        """
+        Overwrite fields of a task. If only fixed-width fields change, this is a
+        single in-place write of the task's record.
+
+        Args:
+            task_id (int): ID of the task to update
+            changes (dict): Fields to overwrite on the task
+
+        Returns:
+            dict: The updated task, or None if there is no task with the ID
+        """
+        index = self._find(task_id)
+        if index is None:
+            return None
+        record = self._read_record(index)
+        task = {**self._decode(record), **changes}
+        strings_before = len(self._strings)
+        fields, extra = _split_task(task, self._code)
+        text = record[6:8]
+        text_changed = extra != json.loads(self._read_heap(*text))
+        if text_changed:
+            self.garbage += text[1]
+            text = self._append_text(extra)
+        self._write_record(index, RECORD.pack(task_id, 0, *fields, *text))
+        if text_changed or len(self._strings) != strings_before:
+            self._write_header()
+        return task
+
+    def delete(self, task_id):
+        """
+        Mark a task's record as deleted.
+
+        Args:
+            task_id (int): ID of the task to delete
+
+        Returns:
+            bool: Whether there was a task with the ID
+        """
+        index = self._find(task_id)
+        if index is None:
+            return False
+        if self._positions is not None:
+            del self._positions[task_id]
+        record = list(self._read_record(index))
+        record[1] |= DELETED
+        self.garbage += record[7]
+        self._write_record(index, RECORD.pack(*record))
+        self._write_header()
+        return True
+
+    def needs_compaction(self):
+        """
+        Returns:
+            bool: Whether enough of the heap is garbage to be worth compacting
+        """
+        heap_size = self.heap_size
+        return heap_size >= HEAP_COMPACT_MIN_BYTES and self.garbage > heap_size * HEAP_COMPACT_RATIO
+
+    def _get_positions(self):
+        if self._positions is None:
+            self._positions = {}
+            self._file.seek(HEADER.size)
+            records = self._file.read(self._count * RECORD.size)
+            for index, (task_id, flags, *_) in enumerate(RECORD.iter_unpack(records)):
+                if not flags & DELETED:
+                    self._positions[task_id] = index
+        return self._positions
+
+    def _find(self, task_id):
+        # Record index of the live task with the ID, or None
+        if self._positions is not None or not self._flags & SORTED:
+            return self._get_positions().get(task_id)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            middle_id, flags = self._read_record(middle)[:2]
+            if middle_id < task_id:
+                low = middle + 1
+            elif middle_id > task_id:
+                high = middle
+            else:
+                return None if flags & DELETED else middle
+        return None
+
+    def _read_heap(self, offset, length):
+        self._heap.seek(offset)
+        return self._heap.read(length)
+
+    def _append_heap(self, data):
+        offset = self._heap.seek(0, os.SEEK_END)
+        self._heap.write(data)
+        self._heap.flush()
+        os.fsync(self._heap.fileno())
+        return offset
+
+    def _read_record(self, index):
+        self._file.seek(HEADER.size + index * RECORD.size)
+        return RECORD.unpack(self._file.read(RECORD.size))
+
+    def _write_record(self, index, record):
+        self._file.seek(HEADER.size + index * RECORD.size)
+        self._file.write(record)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(
+            HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                self._flags,
+                self.generation,
+                self._count,
+                self._strings_offset,
+                self._strings_length,
+                self.garbage,
+            )
+        )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            # Append the grown string table; the header is rewritten by the caller
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+            self.garbage += self._strings_length
+            data = json.dumps(self._strings, separators=(",", ":")).encode("utf-8")
+            self._strings_offset = self._append_heap(data)
+            self._strings_length = len(data)
+        return code
+
+    def _append_text(self, extra):
+        data = json.dumps(extra, separators=(",", ":")).encode("utf-8")
+        return self._append_heap(data), len(data)
+
+    def _encode(self, task):
+        fields, extra = _split_task(task, self._code)
+        return RECORD.pack(task["id"], 0, *fields, *self._append_text(extra))
+
+    def _decode(self, record):
+        task_id, _, completed, priority, category, due_date, text_offset, text_length = record
+        task = {"id": task_id}
+        extra = json.loads(self._read_heap(text_offset, text_length))
+        for field in ("title", "description"):
+            if field in extra:
+                task[field] = extra.pop(field)
+        if priority != MISSING:
+            task["priority"] = self._strings[priority]
+        if category != MISSING:
+            task["category"] = self._strings[category]
+        due_date = due_date.rstrip(b"\0")  # Struct padding
+        if due_date:
+            task["due_date"] = due_date.decode("ascii")
+        if completed != MISSING:
+            task["completed"] = completed == 1
+        task.update(extra)
+        return task
+
+
+def save_tasks_records(tasks, file_path):
+    """
+    Save tasks to a record file with a fresh, garbage-free heap. The heap is
+    written under a new generation before the record file is atomically
+    replaced to point at it, so a crash leaves the previous file intact.
+
+    Args:
+        tasks (list): List of task dictionaries with integer IDs
+        file_path (str): Path to the record file
+    """
+    with file_lock(file_path):
+        try:
+            with open(file_path, "rb") as f:
+                old_generation = HEADER.unpack(f.read(HEADER.size))[3]
+        except (FileNotFoundError, struct.error):
+            old_generation = None
+        generation = 0 if old_generation is None else old_generation + 1
+
+        strings = {}
+        records = []
+        flags = SORTED
+        last_id = None
+        with atomic_open(get_heap_path(file_path, generation), "wb") as heap:
+            position = 0
+            for task in tasks:
+                fields, extra = _split_task(
+                    task, lambda value: strings.setdefault(value, len(strings))
+                )
+                data = json.dumps(extra, separators=(",", ":")).encode("utf-8")
+                heap.write(data)
+                if last_id is not None and last_id >= task["id"]:
+                    flags = 0
+                last_id = task["id"]
+                records.append(RECORD.pack(task["id"], 0, *fields, position, len(data)))
+                position += len(data)
+            string_table = json.dumps(list(strings), separators=(",", ":")).encode("utf-8")
+            heap.write(string_table)
+
+        with atomic_open(file_path, "wb") as f:
+            f.write(
+                HEADER.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    flags,
+                    generation,
+                    len(records),
+                    position,
+                    len(string_table),
+                    0,
+                )
+            )
+            f.writelines(records)
+        if old_generation is not None:
+            Path(get_heap_path(file_path, old_generation)).unlink(missing_ok=True)
+
+
+def load_tasks_records(file_path):
+    """
+    Load every task from a record file. The file lock is held, so a save
+    can't replace the heap generation between reading the records and the heap.
+
+    Args:
+        file_path (str): Path to the record file
+
+    Returns:
+        list: List of task dictionaries, empty list if file doesn't exist
+    """
+    with file_lock(file_path):
+        if not os.path.exists(file_path):
+            return []
+        with RecordFile(file_path, writable=False) as records:
+            return list(records)
+
+
+def compact_records(file_path):
+    """
+    Rewrite a record file without deleted records and unreferenced heap text.
+
+    Args:
+        file_path (str): Path to the record file
+    """
+    with file_lock(file_path):
+        save_tasks_records(load_tasks_records(file_path), file_path)
+
+
+def _modify_records(file_path, modify):
+    with file_lock(file_path):
+        if not os.path.exists(file_path):
+            save_tasks_records([], file_path)
+        with RecordFile(file_path) as records:
+            result = modify(records)
+            compact = records.needs_compaction()
+        if compact:
+            compact_records(file_path)
+    return result
+
+
+def add_task_record(task, file_path):
+    """
+    Append a task to a record file, creating the file if needed.
+
+    Args:
+        task (dict): Task dictionary with an integer "id" key
+        file_path (str): Path to the record file
+    """
+    _modify_records(file_path, lambda records: records.add(task))
+
+
+def update_task_record(task_id, changes, file_path):
+    """
+    Overwrite fields of a task in a record file. Completion, priority, category
+    and due date changes are written in place into the task's record.
+
+    Args:
+        task_id (int): ID of the task to update
+        changes (dict): Fields to overwrite on the task
+        file_path (str): Path to the record file
+
+    Returns:
+        dict: The updated task, or None if there is no task with the ID
+    """
+    return _modify_records(file_path, lambda records: records.update(task_id, changes))
+
+
+def delete_task_record(task_id, file_path):
+    """
+    Delete a task from a record file by marking its record as deleted.
+
+    Args:
+        task_id (int): ID of the task to delete
+        file_path (str): Path to the record file
+
+    Returns:
+        bool: Whether there was a task with the ID
+    """
+    return _modify_records(file_path, lambda records: records.delete(task_id))
+
+
+def delete_tasks_records(file_path):
+    """
+    Delete a record file and its heap.
+
+    Args:
+        file_path (str): Path to the record file
+    """
+    with file_lock(file_path):
+        try:
+            with open(file_path, "rb") as f:
+                generation = HEADER.unpack(f.read(HEADER.size))[3]
+        except FileNotFoundError:
+            return
+        Path(file_path).unlink()
+        Path(get_heap_path(file_path, generation)).unlink(missing_ok=True)
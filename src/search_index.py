@@ -0,0 +1,164 @@
+import bisect
+import re
+
+# Relevance awarded to a task for each query term found in its title or description
+TITLE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: List of tokens in order of appearance
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def make_scorer(query):
+    """
+    Build a function scoring a title and description against a query the
+    way SearchIndex does, for tasks that aren't indexed. Each term is matched
+    with a regular expression for a word starting with it, so the texts are
+    never tokenized.
+
+    Args:
+        query (str): Search query
+
+    Returns:
+        callable: Function of a title and description returning their
+            relevance, 0 if any term isn't a prefix of a word in either text.
+            Every text matches a query without terms.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return lambda title, description: 1
+    # Tokens are runs of word characters, so a word starting with the term is
+    # the term not preceded by a word character, followed by the rest of the word.
+    # The plain substring check first is much cheaper and rules out most texts
+    patterns = [(term, re.compile(rf"(?<!\w){re.escape(term)}\w*")) for term in terms]
+
+    def score(title, description):
+        title = title.lower()
+        description = description.lower()
+        total = 0
+        for term, pattern in patterns:
+            in_title = term in title and pattern.search(title)
+            in_description = term in description and pattern.search(description)
+            if in_title and in_description:
+                # A word in both texts is worth both weights, as a single index token
+                in_both = not set(pattern.findall(title)).isdisjoint(pattern.findall(description))
+                total += TITLE_WEIGHT + DESCRIPTION_WEIGHT if in_both else TITLE_WEIGHT
+            elif in_title:
+                total += TITLE_WEIGHT
+            elif in_description:
+                total += DESCRIPTION_WEIGHT
+            else:
+                return 0
+        return total
+
+    return score
+
+
+class SearchIndex:
+    """
+    Inverted index over task titles and descriptions. Each query term is
+    matched as a prefix of the indexed tokens, so partially typed words still
+    find results, and every term must match for a task to be returned.
+    """
+
+    def __init__(self):
+        self._postings = {}  # Token -> {task ID: weight}
+        self._vocabulary = []  # Sorted tokens, for prefix range lookups
+        self._tokens = {}  # Task ID -> tokens it is indexed under
+        self._sequence = {}  # Task ID -> insertion sequence number, for tie-breaking
+        self._next_sequence = 0
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def add(self, task):
+        """
+        Index the title and description of a task, replacing any previous entry.
+
+        Args:
+            task (dict): Task dictionary with an "id" key
+        """
+        task_id = task["id"]
+        if task_id in self._tokens:
+            self._unindex(task_id)
+        else:
+            self._sequence[task_id] = self._next_sequence
+            self._next_sequence += 1
+
+        weights = dict.fromkeys(tokenize(task.get("title", "")), TITLE_WEIGHT)
+        for token in set(tokenize(task.get("description", ""))):
+            weights[token] = weights.get(token, 0) + DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._vocabulary, token)
+            postings[task_id] = weight
+        self._tokens[task_id] = list(weights)
+
+    def remove(self, task_id):
+        """
+        Remove a task from the index.
+
+        Args:
+            task_id (int): ID of the task to remove
+        """
+        if task_id in self._tokens:
+            self._unindex(task_id)
+            del self._sequence[task_id]
+
+    def search(self, query):
+        """
+        Find the tasks matching every term of a query, most relevant first.
+        Title matches rank above description matches, and ties keep insertion order.
+
+        Args:
+            query (str): Search query
+
+        Returns:
+            list: IDs of the matching tasks
+        """
+        terms = tokenize(query)
+        if not terms:
+            return sorted(self._tokens, key=self._sequence.__getitem__)
+
+        # Score the rarest term first, so later terms only need to check its matches
+        term_scores = sorted((self._prefix_scores(term) for term in set(terms)), key=len)
+        scores = term_scores[0]
+        for other in term_scores[1:]:
+            scores = {
+                task_id: score + other[task_id]
+                for task_id, score in scores.items()
+                if task_id in other
+            }
+        return sorted(scores, key=lambda task_id: (-scores[task_id], self._sequence[task_id]))
+
+    def _prefix_scores(self, term):
+        scores = {}
+        index = bisect.bisect_left(self._vocabulary, term)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(term):
+            for task_id, weight in self._postings[self._vocabulary[index]].items():
+                if weight > scores.get(task_id, 0):
+                    scores[task_id] = weight
+            index += 1
+        return scores
+
+    def _unindex(self, task_id):
+        for token in self._tokens.pop(task_id):
+            postings = self._postings[token]
+            del postings[task_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from src.tasks import atomic_write_json, file_lock
+
+# Format version written to manifests
+MANIFEST_FORMAT = 1
+
+# Ways tasks can be partitioned into shards
+PARTITIONS = ("category", "id")
+
+# Number of consecutive IDs per shard when partitioning by ID range
+DEFAULT_SHARD_SIZE = 10000
+
+# Below this many bytes of shards, parsing in this process beats starting workers.
+# Parsed shards are pickled back from the workers, and unpickling them costs the
+# loading process about half as much as parsing them, so parallel loads only win
+# on several cores, and never on one
+PARALLEL_LOAD_MIN_BYTES = 8 * 1024 * 1024
+
+_process_pool = None
+
+
+def get_process_pool():
+    """
+    Get the process pool that shards are parsed in.
+
+    Returns:
+        ProcessPoolExecutor: Pool with one worker per CPU, shared by every load
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor()
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """
+    Shut down the process pool shards are parsed in, if it was started,
+    waiting for its workers to exit. The next parallel load starts a new one.
+    """
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown()
+        _process_pool = None
+
+
+def load_manifest(manifest_path):
+    """
+    Load the manifest of a sharded task file.
+
+    Args:
+        manifest_path (str): Path to the manifest file
+
+    Returns:
+        dict: The manifest, with no shards if the file doesn't exist
+    """
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {
+            "format": MANIFEST_FORMAT,
+            "partition": "category",
+            "shard_size": DEFAULT_SHARD_SIZE,
+            "shards": [],
+        }
+
+
+def get_shard_key(task, partition, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Args:
+        task (dict): Task dictionary
+        partition (str): One of PARTITIONS
+        shard_size (int): Number of consecutive IDs per shard, for ID partitioning
+
+    Returns:
+        The category of the task, or the index of its ID range
+    """
+    if partition == "category":
+        return task.get("category")
+    return task["id"] // shard_size
+
+
+def _get_shard_path(manifest_path, shard):
+    return os.path.join(os.path.dirname(os.path.abspath(manifest_path)), shard["file"])
+
+
+def _read_shard(shard_path):
+    # Module-level, so it can be sent to worker processes. A shard the manifest
+    # lists but that doesn't exist raises FileNotFoundError rather than loading
+    # as empty, as its tasks would otherwise go missing without a trace
+    with open(shard_path, "r") as f:
+        return json.load(f)
+
+
+def load_tasks_sharded(manifest_path, parallel=None):
+    """
+    Load every task of a sharded task file. The file lock is held, so a save
+    can't remove the shards the manifest points to while they are read.
+
+    Args:
+        manifest_path (str): Path to the manifest file
+        parallel (bool): Whether to parse shards in the process pool, or None
+            to only do so with several CPUs and PARALLEL_LOAD_MIN_BYTES of shards
+
+    Returns:
+        list: List of task dictionaries in ID order
+    """
+    with file_lock(manifest_path):
+        shards = load_manifest(manifest_path)["shards"]
+        paths = [_get_shard_path(manifest_path, shard) for shard in shards]
+        if parallel is None:
+            parallel = (
+                len(shards) > 1
+                and (os.cpu_count() or 1) > 1
+                and sum(shard["bytes"] for shard in shards) >= PARALLEL_LOAD_MIN_BYTES
+            )
+        if parallel:
+            shard_tasks = get_process_pool().map(_read_shard, paths)
+        else:
+            shard_tasks = map(_read_shard, paths)
+        tasks = [task for tasks in shard_tasks for task in tasks]
+    # Each shard is already in ID order, so this only merges the runs
+    tasks.sort(key=lambda task: task["id"])
+    return tasks
+
+
+def load_category_tasks_sharded(category, manifest_path):
+    """
+    Load the tasks of one category from a sharded task file, only reading
+    the one shard holding it when the file is partitioned by category.
+
+    Args:
+        category (str): Category to load
+        manifest_path (str): Path to the manifest file
+
+    Returns:
+        list: List of task dictionaries in the category, in ID order
+    """
+    with file_lock(manifest_path):
+        manifest = load_manifest(manifest_path)
+        if manifest["partition"] != "category":
+            return [
+                task
+                for task in load_tasks_sharded(manifest_path)
+                if task.get("category") == category
+            ]
+        for shard in manifest["shards"]:
+            if shard["key"] == category:
+                return _read_shard(_get_shard_path(manifest_path, shard))
+    return []
+
+
+def save_tasks_sharded(tasks, manifest_path, partition=None, shard_size=None, changed_ids=None):
+    """
+    Save tasks to a sharded task file. Shards whose contents haven't changed
+    since the last save are left untouched, and shards that become empty are
+    deleted. The manifest is replaced atomically once every changed shard
+    has been written to a new file.
+
+    Without changed_ids, every shard is serialized and hashed to find the
+    changed ones. With them, only the shards holding a changed task or
+    having lost one are, so saving a few changes costs little more than
+    grouping the tasks by shard.
+
+    Args:
+        tasks (list): List of task dictionaries
+        manifest_path (str): Path to the manifest file
+        partition (str): One of PARTITIONS, or None to keep the current partitioning
+        shard_size (int): IDs per shard for ID partitioning, or None to keep the current size
+        changed_ids (iterable): IDs of every task added, updated or deleted
+            since the file was last saved or loaded, or None if unknown
+
+    Returns:
+        int: Number of shard files written
+    """
+    with file_lock(manifest_path):
+        manifest = load_manifest(manifest_path)
+        if partition is None:
+            partition = manifest["partition"]
+        if partition not in PARTITIONS:
+            raise ValueError(f"Can't partition tasks by {partition}, only by {PARTITIONS}")
+        if shard_size is None:
+            shard_size = manifest.get("shard_size", DEFAULT_SHARD_SIZE)
+        repartitioned = (partition, shard_size) != (manifest["partition"], manifest["shard_size"])
+
+        old_shards = {} if repartitioned else {shard["key"]: shard for shard in manifest["shards"]}
+        if changed_ids is not None and not repartitioned:
+            changed_ids = set(changed_ids)
+        else:
+            changed_ids = None
+        groups = {}
+        dirty_keys = set()
+        for task in tasks:
+            key = get_shard_key(task, partition, shard_size)
+            groups.setdefault(key, []).append(task)
+            if changed_ids is not None and task["id"] in changed_ids:
+                dirty_keys.add(key)
+
+        used_files = {shard["file"] for shard in manifest["shards"]}
+        base_name = os.path.basename(manifest_path)
+        shards = []
+        written = 0
+        for key, shard_tasks in groups.items():
+            old_shard = old_shards.pop(key, None)
+            if (
+                changed_ids is not None
+                and old_shard is not None
+                and key not in dirty_keys
+                and old_shard["count"] == len(shard_tasks)
+            ):
+                # Unchanged tasks never move between shards, so a shard without
+                # changed tasks only differs from its saved contents if it lost some
+                shards.append(old_shard)
+                continue
+            shard_tasks.sort(key=lambda task: task["id"])
+            data = json.dumps(shard_tasks, separators=(",", ":"))
+            digest = hashlib.sha256(data.encode()).hexdigest()
+            if old_shard is not None and old_shard["hash"] == digest:
+                shards.append(old_shard)
+                continue
+            # Changed shards go to new files, so the old manifest stays valid until replaced
+            number = 0
+            while f"{base_name}.{number}.json" in used_files:
+                number += 1
+            file_name = f"{base_name}.{number}.json"
+            used_files.add(file_name)
+            shard = {
+                "key": key,
+                "file": file_name,
+                "count": len(shard_tasks),
+                "bytes": len(data),
+                "hash": digest,
+            }
+            with open(_get_shard_path(manifest_path, shard), "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            shards.append(shard)
+            written += 1
+
+        old_files = {shard["file"] for shard in manifest["shards"]}
+        atomic_write_json(
+            {
+                "format": MANIFEST_FORMAT,
+                "partition": partition,
+                "shard_size": shard_size,
+                "shards": shards,
+            },
+            manifest_path,
+        )
+        # Only remove shards the new manifest no longer points to once it is in place
+        for file_name in old_files - {shard["file"] for shard in shards}:
+            Path(os.path.dirname(os.path.abspath(manifest_path)), file_name).unlink(missing_ok=True)
+    return written
+
+
+def delete_tasks_sharded(manifest_path):
+    """
+    Delete a sharded task file's manifest and shards.
+
+    Args:
+        manifest_path (str): Path to the manifest file
+    """
+    with file_lock(manifest_path):
+        for shard in load_manifest(manifest_path)["shards"]:
+            Path(_get_shard_path(manifest_path, shard)).unlink(missing_ok=True)
+        Path(manifest_path).unlink(missing_ok=True)
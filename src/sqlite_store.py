@@ -0,0 +1,357 @@
+import json
+import math
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+# Recorded in the database once SCHEMA has run, so connecting doesn't run it again
+SCHEMA_VERSION = 1
+
+# Fields that are filtered on get their own indexed column; the full task is kept in data.
+# Missing due dates are stored as "", which sorts before every date as in get_overdue_tasks
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY,
+    id INTEGER UNIQUE,
+    category TEXT,
+    priority TEXT,
+    completed INTEGER,
+    due_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks (category);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_open_due_date ON tasks (due_date)
+    WHERE COALESCE(completed, 0) = 0;
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+
+def connect(file_path):
+    """
+    Open a SQLite task database, creating the schema if needed.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+
+    Returns:
+        sqlite3.Connection: Open connection to the database
+    """
+    connection = sqlite3.connect(file_path)
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version < SCHEMA_VERSION:
+        connection.executescript(SCHEMA)
+    return connection
+
+
+def _to_row(task):
+    completed = task.get("completed")
+    return (
+        task.get("id"),
+        task.get("category"),
+        task.get("priority"),
+        None if completed is None else int(bool(completed)),
+        task.get("due_date") or "",
+        json.dumps(task, separators=(",", ":")),
+    )
+
+
+def load_tasks_sqlite(file_path):
+    """
+    Load every task from a SQLite task database.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+
+    Returns:
+        list: List of task dictionaries in insertion order, empty list if the
+            database doesn't exist
+    """
+    if not os.path.exists(file_path):
+        return []
+    with closing(connect(file_path)) as connection, connection:
+        rows = connection.execute("SELECT data FROM tasks ORDER BY seq")
+        return [json.loads(data) for (data,) in rows]
+
+
+def iter_tasks_sqlite(file_path):
+    """
+    Stream every task from a SQLite task database, one row at a time.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+
+    Yields:
+        dict: Task dictionaries in insertion order, none if the database doesn't exist
+    """
+    if not os.path.exists(file_path):
+        return
+    with closing(connect(file_path)) as connection:
+        for (data,) in connection.execute("SELECT data FROM tasks ORDER BY seq"):
+            yield json.loads(data)
+
+
+def save_tasks_sqlite(tasks, file_path):
+    """
+    Replace the contents of a SQLite task database with the inputted tasks.
+    The first bulk load gathers the statistics the query planner needs;
+    later saves keep them, as the shape of the data rarely changes.
+
+    Args:
+        tasks (list): List of task dictionaries
+        file_path (str): Path to the SQLite database file
+    """
+    with closing(connect(file_path)) as connection, connection:
+        connection.execute("DELETE FROM tasks")
+        connection.executemany(
+            "INSERT INTO tasks (id, category, priority, completed, due_date, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (_to_row(task) for task in tasks),
+        )
+        # Statistics for the planner, without which it scans rather than use
+        # the partial due date index
+        if not _has_statistics(connection):
+            connection.execute("ANALYZE")
+
+
+def _has_statistics(connection):
+    stat_table = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    if stat_table is None:
+        return False
+    stats = connection.execute("SELECT 1 FROM sqlite_stat1 WHERE tbl = 'tasks'").fetchone()
+    return stats is not None
+
+
+def insert_task(task, file_path):
+    """
+    Insert a single task row.
+
+    Args:
+        task (dict): The new task dictionary
+        file_path (str): Path to the SQLite database file
+    """
+    with closing(connect(file_path)) as connection, connection:
+        connection.execute(
+            "INSERT INTO tasks (id, category, priority, completed, due_date, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            _to_row(task),
+        )
+
+
+def update_task(task_id, changes, file_path):
+    """
+    Update the fields of a single task row.
+
+    Args:
+        task_id (int): ID of the task to update
+        changes (dict): Fields to overwrite on the task
+        file_path (str): Path to the SQLite database file
+
+    Returns:
+        dict: The updated task, or None if no task has the ID
+    """
+    with closing(connect(file_path)) as connection, connection:
+        row = connection.execute(
+            "SELECT data FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        task = {**json.loads(row[0]), **changes}
+        connection.execute(
+            "UPDATE tasks SET id = ?, category = ?, priority = ?, completed = ?, "
+            "due_date = ?, data = ? WHERE id = ?",
+            _to_row(task) + (task_id,),
+        )
+    return task
+
+
+def delete_task(task_id, file_path):
+    """
+    Delete a single task row.
+
+    Args:
+        task_id (int): ID of the task to delete
+        file_path (str): Path to the SQLite database file
+
+    Returns:
+        bool: Whether a task was deleted
+    """
+    with closing(connect(file_path)) as connection, connection:
+        deleted = connection.execute(
+            "DELETE FROM tasks WHERE id = ?", (task_id,)
+        ).rowcount
+    return deleted > 0
+
+
+def _where_clause(priority=None, category=None, completed=None, overdue=False):
+    conditions = []
+    parameters = []
+    if priority is not None:
+        conditions.append("priority = ?")
+        parameters.append(priority)
+    if category is not None:
+        conditions.append("category = ?")
+        parameters.append(category)
+    if completed is not None:
+        conditions.append("completed = ?")
+        parameters.append(int(bool(completed)))
+    if overdue:
+        # Matches idx_tasks_open_due_date, so only the open tasks' due dates are scanned
+        conditions.append("COALESCE(completed, 0) = 0 AND due_date < ?")
+        parameters.append(datetime.now().strftime("%Y-%m-%d"))
+    clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return clause, parameters
+
+
+def query_tasks(
+    file_path,
+    priority=None,
+    category=None,
+    completed=None,
+    overdue=False,
+    limit=None,
+    offset=0,
+):
+    """
+    Fetch the tasks matching all of the inputted criteria with one indexed query.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+        priority (str): Priority level to filter by, or None for any
+        category (str): Category to filter by, or None for any
+        completed (bool): Completion status to filter by, or None for any
+        overdue (bool): Whether to only include overdue tasks
+        limit (int): Maximum number of tasks to return, or None for all
+        offset (int): Number of matching tasks to skip
+
+    Returns:
+        list: List of matching task dictionaries in insertion order
+    """
+    clause, parameters = _where_clause(priority, category, completed, overdue)
+    sql = "SELECT data FROM tasks" + clause + " ORDER BY seq LIMIT ? OFFSET ?"
+    parameters += [-1 if limit is None else limit, offset]
+    with closing(connect(file_path)) as connection, connection:
+        rows = connection.execute(sql, parameters).fetchall()
+    return [json.loads(data) for (data,) in rows]
+
+
+def count_tasks(file_path, priority=None, category=None, completed=None, overdue=False):
+    """
+    Count the tasks matching all of the inputted criteria.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+        priority (str): Priority level to filter by, or None for any
+        category (str): Category to filter by, or None for any
+        completed (bool): Completion status to filter by, or None for any
+        overdue (bool): Whether to only include overdue tasks
+
+    Returns:
+        int: Number of matching tasks
+    """
+    clause, parameters = _where_clause(priority, category, completed, overdue)
+    with closing(connect(file_path)) as connection, connection:
+        (count,) = connection.execute(
+            "SELECT COUNT(*) FROM tasks" + clause, parameters
+        ).fetchone()
+    return count
+
+
+def filter_tasks_by_priority(file_path, priority):
+    """
+    Filter tasks by priority level using the priority index.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+        priority (str): Priority level to filter by (High, Medium, Low)
+
+    Returns:
+        list: Filtered list of tasks matching the priority
+    """
+    return query_tasks(file_path, priority=priority)
+
+
+def filter_tasks_by_category(file_path, category):
+    """
+    Filter tasks by category using the category index.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+        category (str): Category to filter by
+
+    Returns:
+        list: Filtered list of tasks matching the category
+    """
+    return query_tasks(file_path, category=category)
+
+
+def filter_tasks_by_completion(file_path, completed=True):
+    """
+    Filter tasks by completion status using the completion index.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+        completed (bool): Completion status to filter by
+
+    Returns:
+        list: Filtered list of tasks matching the completion status
+    """
+    return query_tasks(file_path, completed=completed)
+
+
+def get_overdue_tasks(file_path):
+    """
+    Get tasks that are past their due date and not completed using the index
+    of open tasks' due dates.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+
+    Returns:
+        list: List of overdue tasks
+    """
+    return query_tasks(file_path, overdue=True)
+
+
+def get_num_pages(file_path, tasks_per_page, **filters):
+    """
+    Calculate the number of pages needed to display the matching tasks.
+
+    Args:
+        file_path (str): Path to the SQLite database file
+        tasks_per_page (int): Number of tasks per page
+        **filters: Criteria accepted by query_tasks
+
+    Returns:
+        int: Number of pages needed to display tasks
+    """
+    if tasks_per_page <= 0:
+        return 1
+    return max(math.ceil(count_tasks(file_path, **filters) / tasks_per_page), 1)
+
+
+def get_paginated_tasks(page_number, file_path, tasks_per_page, **filters):
+    """
+    Get one page of the matching tasks with LIMIT/OFFSET.
+
+    Args:
+        page_number (int): The current page number
+        file_path (str): Path to the SQLite database file
+        tasks_per_page (int): Number of tasks per page
+        **filters: Criteria accepted by query_tasks
+
+    Returns:
+        list: A list of tasks for the current page
+    """
+    if tasks_per_page <= 0:
+        return []
+    return query_tasks(
+        file_path,
+        limit=tasks_per_page,
+        offset=(page_number - 1) * tasks_per_page,
+        **filters,
+    )
@@ -0,0 +1,164 @@
+import importlib.util
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+# Number of pytest-xdist workers, "auto" being one per CPU core
+DEFAULT_WORKERS = "auto"
+
+# Seconds a cancelled run gets to exit before it is killed
+CANCEL_TIMEOUT = 5
+
+if os.name == "nt":
+    _GROUP_KWARGS = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    # Its own session, so cancelling also stops the xdist workers it starts
+    _GROUP_KWARGS = {"start_new_session": True}
+
+
+def build_pytest_command(script, workers=DEFAULT_WORKERS):
+    """
+    Build the command of a "python -m pytest ..." script line, run by the
+    current interpreter and spread across workers with pytest-xdist if it is
+    installed.
+
+    Args:
+        script (str): Command line starting with "python"
+        workers (str | int): Number of xdist workers, "auto", or None to run serially
+
+    Returns:
+        list: Command arguments
+    """
+    command = [sys.executable] + script.split()[1:]
+    if (
+        workers is not None
+        and command[1:3] == ["-m", "pytest"]
+        and "-n" not in command
+        and importlib.util.find_spec("xdist") is not None
+    ):
+        command += ["-n", str(workers)]
+    return command
+
+
+class SuiteRun:
+    """
+    A command running in the background, with its combined stdout and stderr
+    collected line by line while it runs.
+    """
+
+    def __init__(self, command, cwd=None):
+        """
+        Start running a command.
+
+        Args:
+            command (list): Command arguments
+            cwd (str): Directory to run the command in, None for the current one
+        """
+        self.command = command
+        self.cancelled = False
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self._lines = []
+        self._lock = threading.Lock()
+        self._process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            cwd=cwd,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+            **_GROUP_KWARGS,
+        )
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+
+    def _read_output(self):
+        for line in self._process.stdout:
+            with self._lock:
+                self._lines.append(line)
+        self._process.stdout.close()
+        self._process.wait()
+        self.finished_at = time.monotonic()
+
+    def is_running(self):
+        """
+        Returns:
+            bool: Whether the command is still running or its output still being read
+        """
+        return self.finished_at is None
+
+    @property
+    def returncode(self):
+        """
+        int: Exit status of the command, None while it is running
+        """
+        return None if self.is_running() else self._process.returncode
+
+    @property
+    def elapsed(self):
+        """
+        float: Seconds the command has been running, or ran for
+        """
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def output(self):
+        """
+        Returns:
+            str: Everything the command has written so far
+        """
+        with self._lock:
+            return "".join(self._lines)
+
+    def wait(self, timeout=None):
+        """
+        Wait for the command to finish.
+
+        Args:
+            timeout (float): Seconds to wait at most, None to wait until it finishes
+
+        Returns:
+            int: Exit status of the command, None if it is still running
+        """
+        self._reader.join(timeout)
+        return self.returncode
+
+    def cancel(self):
+        """
+        Stop the command and every process it started, killing them if they
+        haven't exited within CANCEL_TIMEOUT seconds.
+        """
+        if not self.is_running():
+            return
+        self.cancelled = True
+        try:
+            if os.name == "nt":
+                self._process.terminate()
+            else:
+                os.killpg(self._process.pid, signal.SIGTERM)
+            self._process.wait(CANCEL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            if os.name == "nt":
+                self._process.kill()
+            else:
+                os.killpg(self._process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # Already exited
+        self.wait()
+
+
+def start_test_run(script, workers=DEFAULT_WORKERS):
+    """
+    Start running a pytest script line in the background.
+
+    Args:
+        script (str): Command line such as "python -m pytest --cov src"
+        workers (str | int): Number of xdist workers, "auto", or None to run serially
+
+    Returns:
+        SuiteRun: The running tests
+    """
+    return SuiteRun(build_pytest_command(script, workers))
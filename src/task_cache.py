@@ -0,0 +1,104 @@
+import os
+import threading
+from src.metrics import record_cache
+from src.task_store import TaskStore
+from src.tasks import (
+    DEFAULT_TASKS_FILE,
+    file_lock,
+    get_journal_path,
+    load_tasks,
+    load_next_id,
+)
+
+# Absolute task file path -> (file signature, TaskStore), shared by every session in the process
+_task_cache = {}
+_task_cache_lock = threading.Lock()
+
+
+def get_file_signature(file_path=DEFAULT_TASKS_FILE):
+    """
+    Get a cheap fingerprint of a task file and its journal, which changes
+    whenever either is written, replaced or deleted.
+
+    The metadata file is left out: commits that bump its version also write
+    the snapshot or journal, and reserving task IDs only moves its counter,
+    which reserve_task_ids reads from disk anyway. Reloading on a reservation
+    would drop tasks added to the cached store but not yet committed.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        tuple: (modification time, size, inode) of each file, None for missing files
+    """
+    signature = []
+    for path in (file_path, get_journal_path(file_path)):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(signature)
+
+
+def load_cached_tasks(file_path=DEFAULT_TASKS_FILE):
+    """
+    Get the indexed tasks of a task file, only reading and parsing the file
+    if it has changed on disk since it was last loaded or refreshed.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        TaskStore: The tasks, shared with every other caller in the process
+    """
+    key = os.path.abspath(file_path)
+    with _task_cache_lock:
+        signature = get_file_signature(file_path)
+        cached = _task_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            record_cache("tasks", True)
+            return cached[1]
+        record_cache("tasks", False)
+        with file_lock(file_path):
+            # Locked so a concurrent compaction can't swap the snapshot between
+            # reading it and reading the journal
+            signature = get_file_signature(file_path)
+            tasks = TaskStore(load_tasks(file_path), next_id=load_next_id(file_path))
+        _task_cache[key] = (signature, tasks)
+        return tasks
+
+
+def refresh_cached_tasks(file_path=DEFAULT_TASKS_FILE, tasks=None):
+    """
+    Record that the cached tasks match what was just written to disk, so the
+    write doesn't cause the next load to re-read the file. Call after saving or
+    journaling changes that have already been applied to the cached TaskStore.
+
+    Args:
+        file_path (str): Path to the task file
+        tasks (TaskStore): Tasks that were saved, or None to keep the cached ones
+    """
+    key = os.path.abspath(file_path)
+    with _task_cache_lock:
+        if tasks is None:
+            cached = _task_cache.get(key)
+            if cached is None:
+                return
+            tasks = cached[1]
+        _task_cache[key] = (get_file_signature(file_path), tasks)
+
+
+def invalidate_cached_tasks(file_path=None):
+    """
+    Drop cached tasks, so the next load reads from disk.
+
+    Args:
+        file_path (str): Path to the task file, or None to drop every cached file
+    """
+    with _task_cache_lock:
+        if file_path is None:
+            _task_cache.clear()
+        else:
+            _task_cache.pop(os.path.abspath(file_path), None)
@@ -0,0 +1,509 @@
+import bisect
+import functools
+import threading
+from itertools import count
+from src.due_index import DueDateIndex
+from src.facet_counts import FacetCounts
+from src.persistent_tasks import PersistentTasks
+from src.search_index import SearchIndex
+
+
+def _locked(method):
+    # Holds the store's lock for the whole call
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return locked
+
+
+class TaskStore:
+    """
+    In-memory collection of tasks keyed by ID, with hash indexes on the fields
+    the app filters by. Indexes are kept up to date as tasks are added, updated
+    and deleted, so filtering costs O(matching tasks) rather than O(all tasks).
+    Titles and descriptions are also kept in an inverted SearchIndex, due
+    dates in an ordered DueDateIndex, and counts of every combination of
+    indexed values in FacetCounts.
+
+    Tasks are yielded in insertion order, matching the order of the task list
+    the store was built from. IDs are allocated from a monotonic counter, so an
+    ID is never reused after its task is deleted.
+
+    Every mutation moves the store to a new version, drawn from a counter shared
+    by all stores, so a version identifies one exact state of one store and can
+    be used as a cache key for anything derived from it. Once snapshot has been
+    called, every mutation also puts copies of the changed tasks into a new
+    PersistentTasks snapshot.
+
+    A store may be shared between threads, such as the app's sessions. Its
+    methods hold its re-entrant lock while they run, except for the select and
+    iter_after generators and plain iteration, which callers must hold lock
+    around while consuming. Hold it as well around any sequence of calls that
+    must not be interleaved with other threads' changes, such as allocating an
+    ID and adding a task with it.
+    """
+
+    INDEXED_FIELDS = ("category", "priority", "completed")
+
+    # Fields that tasks are counted by in the facet counts
+    FACET_FIELDS = INDEXED_FIELDS + ("due_date",)
+
+    _versions = count(1)
+
+    def __init__(self, tasks=(), next_id=1):
+        """
+        Args:
+            tasks (iterable): Task dictionaries to populate the store with
+            next_id (int): Lowest ID to allocate next, e.g. a persisted counter
+        """
+        self.next_id = next_id
+        self.version = next(self._versions)
+        self.lock = threading.RLock()
+        self._tasks = {}  # Task ID -> task, in insertion order
+        self._sequence = {}  # Task ID -> insertion sequence number
+        self._next_sequence = 0
+        # Field -> value -> {task ID: None}, dicts being used as ordered sets
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        # (field, value) buckets that have had a task moved into them out of order
+        self._unsorted = set()
+        self._search_index = SearchIndex()
+        self._due_index = DueDateIndex()
+        self._sorted_ids = []  # For keyset pagination by ID
+        self.facets = FacetCounts()
+        self._snapshot = None  # PersistentTasks, only kept once asked for
+        for task in tasks:
+            self.add(task)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    @_locked
+    def to_list(self):
+        """
+        Returns:
+            list: List of task dictionaries in insertion order
+        """
+        return list(self._tasks.values())
+
+    @_locked
+    def snapshot(self):
+        """
+        Get an immutable copy of the current tasks, shared by every caller until
+        the store next changes. The first call copies every task; after that,
+        each change only copies the changed tasks into a new snapshot.
+
+        Returns:
+            PersistentTasks: Copies of the tasks, keyed by ID
+        """
+        if self._snapshot is None:
+            self._snapshot = PersistentTasks(
+                (dict(task) for task in self._tasks.values()), next_id=self.next_id
+            )
+        return self._snapshot
+
+    def get(self, task_id):
+        """
+        Args:
+            task_id (int): ID of the task to look up
+
+        Returns:
+            dict: The task with the ID, or None if there is none
+        """
+        return self._tasks.get(task_id)
+
+    @_locked
+    def add(self, task):
+        """
+        Add a task, replacing any existing task with the same ID in place.
+
+        Args:
+            task (dict): Task dictionary with an "id" key
+        """
+        task_id = task["id"]
+        if task_id in self._tasks:
+            self._unindex(self._tasks[task_id])
+            self.facets.remove(self._tasks[task_id])
+        else:
+            self._sequence[task_id] = self._next_sequence
+            self._next_sequence += 1
+            # New IDs are usually the largest, making this an append
+            bisect.insort(self._sorted_ids, task_id)
+        self._tasks[task_id] = task
+        self._index(task)
+        self.facets.add(task)
+        self._search_index.add(task)
+        self._due_index.add(task)
+        if task_id >= self.next_id:
+            self.next_id = task_id + 1
+        self._snapshot_tasks([task])
+        self.version = next(self._versions)
+
+    @_locked
+    def update(self, task_id, changes):
+        """
+        Overwrite fields of a task, re-indexing only the fields that changed.
+
+        Args:
+            task_id (int): ID of the task to update
+            changes (dict): Fields to overwrite on the task
+
+        Returns:
+            dict: The updated task, or None if there is no task with the ID
+        """
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+        self._apply_changes(task, changes)
+        if "due_date" in changes or "completed" in changes:
+            self._due_index.add(task)
+        self._snapshot_tasks([task])
+        self.version = next(self._versions)
+        return task
+
+    @_locked
+    def add_many(self, tasks):
+        """
+        Add many tasks, replacing existing tasks with the same IDs in place.
+        The ordered indexes are rebuilt once for the whole batch rather than
+        once per task.
+
+        Args:
+            tasks (iterable): Task dictionaries with "id" keys
+        """
+        tasks = list(tasks)
+        new_ids = []
+        for task in tasks:
+            task_id = task["id"]
+            if task_id in self._tasks:
+                self._unindex(self._tasks[task_id])
+                self.facets.remove(self._tasks[task_id])
+            else:
+                self._sequence[task_id] = self._next_sequence
+                self._next_sequence += 1
+                new_ids.append(task_id)
+            self._tasks[task_id] = task
+            self._index(task)
+            self.facets.add(task)
+            self._search_index.add(task)
+            if task_id >= self.next_id:
+                self.next_id = task_id + 1
+        self._sorted_ids.extend(new_ids)
+        self._sorted_ids.sort()
+        self._due_index.add_many(tasks)
+        self._snapshot_tasks(tasks)
+        self.version = next(self._versions)
+
+    @_locked
+    def update_many(self, task_ids, changes):
+        """
+        Overwrite the same fields of many tasks, re-indexing only the fields
+        that changed and rebuilding the due date index once for the batch.
+
+        Args:
+            task_ids (iterable): IDs of the tasks to update; unknown IDs are skipped
+            changes (dict): Fields to overwrite on each task
+
+        Returns:
+            list: The updated tasks
+        """
+        updated = []
+        for task_id in task_ids:
+            task = self._tasks.get(task_id)
+            if task is not None:
+                self._apply_changes(task, changes)
+                updated.append(task)
+        if updated:
+            if "due_date" in changes or "completed" in changes:
+                self._due_index.add_many(updated)
+            self._snapshot_tasks(updated)
+            self.version = next(self._versions)
+        return updated
+
+    @_locked
+    def delete(self, task_id):
+        """
+        Remove a task.
+
+        Args:
+            task_id (int): ID of the task to remove
+
+        Returns:
+            dict: The removed task, or None if there is no task with the ID
+        """
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self._unindex(task)
+            self.facets.remove(task)
+            self._search_index.remove(task_id)
+            self._due_index.remove(task_id)
+            del self._sequence[task_id]
+            del self._sorted_ids[bisect.bisect_left(self._sorted_ids, task_id)]
+            self._snapshot_tasks((), [task_id])
+            self.version = next(self._versions)
+        return task
+
+    @_locked
+    def delete_many(self, task_ids):
+        """
+        Remove many tasks, filtering the ordered indexes once for the batch.
+
+        Args:
+            task_ids (iterable): IDs of the tasks to remove; unknown IDs are skipped
+
+        Returns:
+            list: The removed tasks
+        """
+        removed = []
+        for task_id in task_ids:
+            task = self._tasks.pop(task_id, None)
+            if task is not None:
+                self._unindex(task)
+                self.facets.remove(task)
+                self._search_index.remove(task_id)
+                del self._sequence[task_id]
+                removed.append(task)
+        if removed:
+            removed_ids = {task["id"] for task in removed}
+            self._sorted_ids = [
+                task_id for task_id in self._sorted_ids if task_id not in removed_ids
+            ]
+            self._due_index.remove_many(removed_ids)
+            self._snapshot_tasks((), removed_ids)
+            self.version = next(self._versions)
+        return removed
+
+    def count(self, field, value):
+        """
+        Args:
+            field (str): One of INDEXED_FIELDS
+            value: Value of the field to count
+
+        Returns:
+            int: Number of tasks whose field equals the value
+        """
+        return len(self._indexes[field].get(value, ()))
+
+    def count_matching(self, **criteria):
+        """
+        Count the tasks whose indexed fields equal all of the inputted values,
+        read from the facet counts in O(1).
+
+        Args:
+            **criteria: Field/value pairs, with fields from INDEXED_FIELDS
+
+        Returns:
+            int: Number of matching tasks
+        """
+        return self.facets.count(**criteria)
+
+    def iter_after(self, sort_by="id", cursor=None, **criteria):
+        """
+        Yield tasks in ID or due date order, starting after a keyset cursor.
+        Only the tasks that are consumed are visited.
+
+        Args:
+            sort_by (str): "id" or "due_date"
+            cursor: Last ID seen when sorting by ID, or last (due date, ID)
+                pair seen when sorting by due date, or None to start at the beginning
+            **criteria: Field/value pairs, with fields from INDEXED_FIELDS
+
+        Yields:
+            dict: Matching task dictionaries
+        """
+        if sort_by == "id":
+            start = 0 if cursor is None else bisect.bisect_right(self._sorted_ids, cursor)
+            task_ids = (self._sorted_ids[index] for index in range(start, len(self._sorted_ids)))
+        elif sort_by == "due_date":
+            task_ids = (
+                task_id
+                for _, task_id in self._due_index.iter_after(cursor, criteria.get("completed"))
+            )
+        else:
+            raise ValueError(f"Can't paginate by {sort_by}, only by id or due_date")
+        buckets = [self._bucket(field, value) for field, value in criteria.items()]
+        for task_id in task_ids:
+            if all(task_id in bucket for bucket in buckets):
+                yield self._tasks[task_id]
+
+    @_locked
+    def filter(self, **criteria):
+        """
+        Get the tasks whose indexed fields equal all of the inputted values,
+        starting from the smallest matching index bucket.
+
+        Args:
+            **criteria: Field/value pairs, with fields from INDEXED_FIELDS
+
+        Returns:
+            list: Matching task dictionaries in insertion order
+        """
+        return list(self.select(**criteria))
+
+    def select(self, task_ids=None, due_before=None, **criteria):
+        """
+        Yield the tasks matching all of the inputted criteria. The smallest
+        candidate set out of the matching index buckets, the due date range and
+        task_ids is scanned, and every other criterion is checked per candidate.
+
+        Args:
+            task_ids (set): IDs to restrict the results to, or None for any
+            due_before (str): Only include tasks due before this YYYY-MM-DD date
+            **criteria: Field/value pairs, with fields from INDEXED_FIELDS
+
+        Yields:
+            dict: Matching task dictionaries in insertion order
+        """
+        checks = sorted(
+            (self._bucket(field, value) for field, value in criteria.items()),
+            key=len,
+        )
+        if task_ids is not None:
+            checks.append(task_ids)
+        if due_before is not None:
+            completed = criteria.get("completed")
+            due_count = self._due_index.count_before(due_before, completed)
+            if not checks or due_count < min(len(check) for check in checks):
+                # The due date range is the most selective, so scan it instead
+                checks.append(set(self._due_index.before(due_before, completed)))
+                due_before = None
+        if not checks:
+            yield from self._tasks.values()
+            return
+
+        source = min(checks, key=len)
+        others = [check for check in checks if check is not source]
+        if not isinstance(source, dict):
+            # Only index buckets are kept in insertion order
+            source = sorted(
+                (task_id for task_id in source if task_id in self._tasks),
+                key=self._sequence.__getitem__,
+            )
+        for task_id in source:
+            if not all(task_id in check for check in others):
+                continue
+            task = self._tasks[task_id]
+            if due_before is None or (task.get("due_date") or "") < due_before:
+                yield task
+
+    @_locked
+    def search(self, query):
+        """
+        Search task titles and descriptions through the inverted index.
+
+        Args:
+            query (str): Search query, whose terms may be partially typed words
+
+        Returns:
+            list: Task dictionaries matching every term, most relevant first
+        """
+        return [self._tasks[task_id] for task_id in self._search_index.search(query)]
+
+    @_locked
+    def overdue(self, today):
+        """
+        Args:
+            today (str): Today's date in YYYY-MM-DD format
+
+        Returns:
+            list: Incomplete task dictionaries due before today, earliest first
+        """
+        return [self._tasks[task_id] for task_id in self._due_index.overdue(today)]
+
+    @_locked
+    def due_between(self, start, end, completed=None):
+        """
+        Args:
+            start (str): Earliest due date to include, in YYYY-MM-DD format
+            end (str): Latest due date to include, in YYYY-MM-DD format
+            completed (bool): Completion status to include, or None for both
+
+        Returns:
+            list: Task dictionaries due in the range, earliest first
+        """
+        return [
+            self._tasks[task_id]
+            for task_id in self._due_index.due_between(start, end, completed)
+        ]
+
+    @_locked
+    def next_due(self, today, count):
+        """
+        Args:
+            today (str): Today's date in YYYY-MM-DD format
+            count (int): Maximum number of tasks to return
+
+        Returns:
+            list: The first incomplete task dictionaries due on or after today
+        """
+        return [self._tasks[task_id] for task_id in self._due_index.next_due(today, count)]
+
+    def _snapshot_tasks(self, tasks, deleted_ids=()):
+        # Copied, as the store changes its tasks in place
+        if self._snapshot is None:
+            return
+        snapshot = self._snapshot
+        for task in tasks:
+            snapshot = snapshot.set(dict(task))
+        for task_id in deleted_ids:
+            snapshot = snapshot.delete(task_id)
+        self._snapshot = snapshot
+
+    def _apply_changes(self, task, changes):
+        # Updates every index except the due date index, which callers batch
+        recount = any(
+            field in changes and changes[field] != task.get(field) for field in self.FACET_FIELDS
+        )
+        if recount:
+            self.facets.remove(task)
+        for field in self.INDEXED_FIELDS:
+            if field in changes and changes[field] != task.get(field):
+                self._unindex_field(task, field)
+                task[field] = changes[field]
+                self._index_field(task, field)
+        task.update(changes)
+        if recount:
+            self.facets.add(task)
+        if "title" in changes or "description" in changes:
+            self._search_index.add(task)
+
+    def _bucket(self, field, value):
+        bucket = self._indexes[field].get(value)
+        if bucket is None:
+            return {}
+        if (field, value) in self._unsorted:
+            # Restore insertion order once, rather than sorting on every query
+            bucket = dict.fromkeys(sorted(bucket, key=self._sequence.__getitem__))
+            self._indexes[field][value] = bucket
+            self._unsorted.discard((field, value))
+        return bucket
+
+    def _index(self, task):
+        for field in self.INDEXED_FIELDS:
+            self._index_field(task, field)
+
+    def _unindex(self, task):
+        for field in self.INDEXED_FIELDS:
+            self._unindex_field(task, field)
+
+    def _index_field(self, task, field):
+        value = task.get(field)
+        bucket = self._indexes[field].setdefault(value, {})
+        if bucket and self._sequence[task["id"]] < self._sequence[next(reversed(bucket))]:
+            self._unsorted.add((field, value))
+        bucket[task["id"]] = None
+
+    def _unindex_field(self, task, field):
+        value = task.get(field)
+        bucket = self._indexes[field][value]
+        del bucket[task["id"]]
+        if not bucket:
+            del self._indexes[field][value]
+            self._unsorted.discard((field, value))
@@ -1,38 +1,546 @@
+import csv
+import functools
 import json
 import os
 import io
 import math
-import pandas as pd
+import heapq
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from src.facet_counts import FacetCounts
+from src.metrics import instrument_functions, record_cache
+from src.persistent_tasks import PersistentTasks
+from src.search_index import make_scorer
+from src.task_store import TaskStore
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # File path for task storage
 DEFAULT_TASKS_FILE = "tasks.json"
 
+# Suffix appended to a task file's path to locate its mutation journal
+JOURNAL_SUFFIX = ".log"
+
+# Suffix appended to a task file's path to locate its metadata, such as the ID counter
+META_SUFFIX = ".meta"
+
+# Suffix appended to a task file's path to locate the file writers lock
+LOCK_SUFFIX = ".lock"
+
+# Number of characters read at a time when streaming tasks from a JSON file
+JSON_READ_CHUNK_SIZE = 64 * 1024
+
+# Number of tasks written per chunk when streaming CSV exports
+CSV_CHUNK_SIZE = 1000
+
+# Sort order of priority levels, most urgent first
+PRIORITY_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+
+# Task files with these extensions are stored in SQLite rather than JSON
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+# Task files with these extensions are manifests of a sharded task file
+SHARDED_EXTENSIONS = (".shards",)
+
+# Task files with these extensions are stored in the compact binary format
+BINARY_EXTENSIONS = (".tbin",)
+
+# Task files with these extensions are fixed-width record files with a text heap
+RECORD_EXTENSIONS = (".trec",)
+
+
+def _is_columnar(tasks):
+    # The columnar engine needs NumPy, so it can only be in use once something imported it
+    columnar = sys.modules.get("src.columnar")
+    return columnar is not None and isinstance(tasks, columnar.ColumnarTasks)
+
+
+def _holding_store_lock(function):
+    # Holds the lock of a TaskStore passed as the first argument for the whole
+    # call, as a cached store is shared by every session's thread
+    @functools.wraps(function)
+    def locked(tasks, *args, **kwargs):
+        if isinstance(tasks, TaskStore):
+            with tasks.lock:
+                return function(tasks, *args, **kwargs)
+        return function(tasks, *args, **kwargs)
+
+    return locked
+
+
+def is_sqlite_path(file_path):
+    """
+    Check whether a task file should use the SQLite storage engine.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        bool: True if the file extension selects SQLite storage
+    """
+    return os.path.splitext(str(file_path))[1].lower() in SQLITE_EXTENSIONS
+
+
+def is_sharded_path(file_path):
+    """
+    Check whether a task file should use the sharded storage engine.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        bool: True if the file extension selects sharded storage
+    """
+    return os.path.splitext(str(file_path))[1].lower() in SHARDED_EXTENSIONS
+
+
+def is_binary_path(file_path):
+    """
+    Check whether a task file should use the compact binary format.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        bool: True if the file extension selects binary storage
+    """
+    return os.path.splitext(str(file_path))[1].lower() in BINARY_EXTENSIONS
+
+
+def is_record_path(file_path):
+    """
+    Check whether a task file should use the fixed-width record format.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        bool: True if the file extension selects record storage
+    """
+    return os.path.splitext(str(file_path))[1].lower() in RECORD_EXTENSIONS
+
+
+def get_journal_path(file_path=DEFAULT_TASKS_FILE):
+    """
+    Get the path of the append-only journal belonging to a task file.
+
+    Args:
+        file_path (str): Path to the JSON snapshot file
+
+    Returns:
+        str: Path to the journal file
+    """
+    return str(file_path) + JOURNAL_SUFFIX
+
+
+def get_meta_path(file_path=DEFAULT_TASKS_FILE):
+    """
+    Get the path of the metadata file belonging to a task file.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        str: Path to the metadata file
+    """
+    return str(file_path) + META_SUFFIX
+
+
+# Absolute lock file path -> state of this process's hold on it
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(file_path=DEFAULT_TASKS_FILE):
+    """
+    Hold an exclusive advisory lock on a task file, shared with other processes
+    through a lock file next to it. Writers that take the lock never interleave
+    with each other. The lock is re-entrant within a thread, and other threads
+    of the same process wait for it like other processes do.
+
+    Args:
+        file_path (str): Path to the task file
+    """
+    lock_path = os.path.abspath(str(file_path) + LOCK_SUFFIX)
+    with _file_locks_guard:
+        state = _file_locks.setdefault(
+            lock_path, {"lock": threading.RLock(), "depth": 0, "file": None}
+        )
+    with state["lock"]:
+        if state["depth"] == 0:
+            lock_file = open(lock_path, "a+")
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            state["file"] = lock_file
+        state["depth"] += 1
+        try:
+            yield
+        finally:
+            state["depth"] -= 1
+            if state["depth"] == 0:
+                lock_file, state["file"] = state["file"], None
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                lock_file.close()
+
+
+@contextmanager
+def atomic_open(file_path, mode="w"):
+    """
+    Open a file for writing so readers only ever see its old or new contents.
+    Writes go to a temporary file in the same directory, which is flushed to
+    disk and renamed over the destination once the block exits without error.
+
+    Args:
+        file_path (str): Path to the file to write
+        mode (str): "w" for text or "wb" for bytes
+
+    Yields:
+        file: The temporary file to write to
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable; directories can't be opened on Windows
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def atomic_write_json(data, file_path, indent=None):
+    """
+    Write JSON to a file so readers only ever see the old or the new contents.
+
+    Args:
+        data: JSON-serializable data
+        file_path (str): Path to the file to write
+        indent (int): Indentation passed to json.dump
+    """
+    with atomic_open(file_path) as f:
+        json.dump(data, f, indent=indent)
+
+
+def load_meta(file_path=DEFAULT_TASKS_FILE):
+    """
+    Load the metadata of a task file.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        dict: The metadata, empty if none has been saved
+    """
+    try:
+        with open(get_meta_path(file_path), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def update_meta(file_path=DEFAULT_TASKS_FILE, **changes):
+    """
+    Overwrite fields of the metadata of a task file, keeping the other fields.
+
+    Args:
+        file_path (str): Path to the task file
+        **changes: Metadata fields to overwrite
+    """
+    with file_lock(file_path):
+        atomic_write_json({**load_meta(file_path), **changes}, get_meta_path(file_path))
+
+
+def load_next_id(file_path=DEFAULT_TASKS_FILE):
+    """
+    Load the persisted ID counter of a task file.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        int: The next ID to allocate, 1 if no counter has been saved
+    """
+    return load_meta(file_path).get("next_id", 1)
+
+
+def reserve_task_ids(count=1, file_path=DEFAULT_TASKS_FILE, tasks=None):
+    """
+    Allocate IDs for new tasks from the persisted ID counter of a task file,
+    under the file lock, so writers in other processes with their own cached
+    tasks never hand out the same ID.
+
+    Args:
+        count (int): Number of consecutive IDs to allocate
+        file_path (str): Path to the task file
+        tasks (list | TaskStore): Tasks known to this writer, whose IDs are
+            also skipped, or None
+
+    Returns:
+        int: The first allocated ID
+    """
+    with file_lock(file_path):
+        first_id = load_next_id(file_path)
+        if tasks is not None:
+            first_id = max(first_id, generate_unique_id(tasks))
+        save_next_id(first_id + count, file_path)
+    return first_id
+
+
+def save_next_id(next_id, file_path=DEFAULT_TASKS_FILE):
+    """
+    Persist the ID counter of a task file, so IDs of deleted tasks aren't reused.
+
+    Args:
+        next_id (int): The next ID to allocate
+        file_path (str): Path to the task file
+    """
+    update_meta(file_path, next_id=next_id)
+
 
 def load_tasks(file_path=DEFAULT_TASKS_FILE):
     """
-    Load tasks from a JSON file.
+    Load tasks from a JSON file, replaying any journaled mutations on top of it.
+    Files with a SQLite, sharded, binary or record extension are read from
+    that storage engine instead.
 
     Args:
-        file_path (str): Path to the JSON file containing tasks
+        file_path (str): Path to the task file, in any storage format
 
     Returns:
         list: List of task dictionaries, empty list if file doesn't exist
     """
+    if is_sqlite_path(file_path):
+        from src.sqlite_store import load_tasks_sqlite
+
+        return load_tasks_sqlite(file_path)
+    if is_sharded_path(file_path):
+        from src.shard_store import load_tasks_sharded
+
+        return load_tasks_sharded(file_path)
+    if is_binary_path(file_path):
+        from src.binary_store import load_tasks_binary
+
+        return load_tasks_binary(file_path)
+    if is_record_path(file_path):
+        from src.record_store import load_tasks_records
+
+        return load_tasks_records(file_path)
+
     try:
         with open(file_path, "r") as f:
-            return json.load(f)
+            tasks = json.load(f)
     except FileNotFoundError:
-        return []
+        tasks = []
     except json.JSONDecodeError:
         # Handle corrupted JSON file
         print(f"Warning: {file_path} contains invalid JSON. Creating new tasks list.")
-        return []
+        tasks = []
+
+    journal_path = get_journal_path(file_path)
+    if os.path.exists(journal_path):
+        from src.journal import replay_journal
+
+        tasks = replay_journal(tasks, journal_path)
+    return tasks
+
+
+def iter_json_array(f, chunk_size=JSON_READ_CHUNK_SIZE):
+    """
+    Incrementally parse a JSON array from a file, reading it a chunk at a time.
+
+    Args:
+        f (file): Text file positioned at the start of a JSON array
+        chunk_size (int): Number of characters to read at a time
 
+    Yields:
+        The elements of the array, as soon as each one has been read
 
-def add_task(tasks, title, description, priority, category, due_date):
+    Raises:
+        json.JSONDecodeError: If the file isn't a valid JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    expecting = "["  # One of "[", "first value", "value", "separator"
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise json.JSONDecodeError("Unexpected end of data", buffer, position)
+            buffer, position = f.read(chunk_size), 0
+            eof = not buffer
+            continue
+
+        char = buffer[position]
+        if expecting == "[":
+            if char != "[":
+                raise json.JSONDecodeError("Expecting '['", buffer, position)
+            position += 1
+            expecting = "first value"
+        elif expecting == "first value" and char == "]":
+            return
+        elif expecting in ("first value", "value"):
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            if end is None or (end == len(buffer) and not eof):
+                # The value may continue past the buffered data, so read more and retry
+                chunk = f.read(chunk_size)
+                buffer, position = buffer[position:] + chunk, 0
+                eof = not chunk
+                continue
+            yield value
+            position = end
+            expecting = "separator"
+        elif char == ",":
+            position += 1
+            expecting = "value"
+        elif char == "]":
+            return
+        else:
+            raise json.JSONDecodeError("Expecting ',' or ']'", buffer, position)
+
+
+def iter_tasks(file_path=DEFAULT_TASKS_FILE):
+    """
+    Stream tasks from a task file one at a time, without holding the whole file
+    or task list in memory. Any journaled mutations are applied as tasks are
+    read. The result can be passed straight to the filter and search functions,
+    or to get_paginated_tasks, which stops reading once the page is full.
+
+    Args:
+        file_path (str): Path to the task file, in any storage format
+
+    Yields:
+        dict: Task dictionaries in file order
+    """
+    if is_sqlite_path(file_path):
+        from src.sqlite_store import iter_tasks_sqlite
+
+        yield from iter_tasks_sqlite(file_path)
+        return
+    if is_sharded_path(file_path):
+        from src.shard_store import load_tasks_sharded
+
+        # Shards are merged into ID order, which needs all of them at once
+        yield from load_tasks_sharded(file_path)
+        return
+    if is_binary_path(file_path):
+        from src.binary_store import BinaryTasks
+
+        try:
+            with BinaryTasks(file_path) as tasks:
+                yield from tasks
+        except FileNotFoundError:
+            pass
+        return
+    if is_record_path(file_path):
+        from src.record_store import load_tasks_records
+
+        # Each task's text is a separate heap read, so there is no file-order stream to follow
+        yield from load_tasks_records(file_path)
+        return
+
+    journal_path = get_journal_path(file_path)
+    if os.path.exists(journal_path):
+        from src.journal import iter_replay_journal
+
+        yield from iter_replay_journal(_iter_snapshot_tasks(file_path), journal_path)
+    else:
+        yield from _iter_snapshot_tasks(file_path)
+
+
+def _iter_snapshot_tasks(file_path):
+    try:
+        with open(file_path, "r") as f:
+            yield from iter_json_array(f)
+    except FileNotFoundError:
+        return
+    except json.JSONDecodeError:
+        # Handle corrupted JSON file
+        print(f"Warning: {file_path} contains invalid JSON. Creating new tasks list.")
+
+
+def load_category_tasks(category, file_path=DEFAULT_TASKS_FILE):
+    """
+    Load only the tasks of one category from a task file. Sharded files
+    partitioned by category read just that category's shard, and SQLite files
+    query the category index, rather than loading every task.
+
+    Args:
+        category (str): Category to load
+        file_path (str): Path to the task file, in any storage format
+
+    Returns:
+        list: List of task dictionaries in the category
+    """
+    if is_sqlite_path(file_path):
+        from src.sqlite_store import query_tasks as query_tasks_sqlite
+
+        return query_tasks_sqlite(file_path, category=category)
+    if is_sharded_path(file_path):
+        from src.shard_store import load_category_tasks_sharded
+
+        return load_category_tasks_sharded(category, file_path)
+    return [task for task in iter_tasks(file_path) if task.get("category") == category]
+
+
+@_holding_store_lock
+def add_task(tasks, title, description, priority, category, due_date, task_id=None):
+    """
+    Create a new task with a unique ID.
+
+    Args:
+        tasks (list | TaskStore | PersistentTasks): List of task dictionaries,
+            an indexed TaskStore, or an immutable PersistentTasks
+        title (str): Task title
+        description (str): Task description
+        priority (str): Priority level (High, Medium, Low)
+        category (str): Task category
+        due_date (str): Due date in YYYY-MM-DD format
+        task_id (int): ID for the task, e.g. from reserve_task_ids, or None to
+            use the next ID after the tasks' own
+
+    Returns:
+        list | TaskStore | PersistentTasks: A new list with the task appended,
+            the same TaskStore with the task added in place, or a new
+            PersistentTasks version sharing all but O(log n) nodes with the old one
+    """
     new_task = {
-        "id": generate_unique_id(tasks),
+        "id": generate_unique_id(tasks) if task_id is None else task_id,
         "title": title,
         "description": description,
         "priority": priority,
@@ -41,18 +549,230 @@ def add_task(tasks, title, description, priority, category, due_date):
         "completed": False,
         "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     }
+    if isinstance(tasks, TaskStore):
+        tasks.add(new_task)
+        return tasks
+    if isinstance(tasks, PersistentTasks):
+        return tasks.set(new_task)
     return tasks + [new_task]
 
+
+def get_task(tasks, task_id):
+    """
+    Look up a task by ID.
+
+    Args:
+        tasks (list | TaskStore | PersistentTasks): List of task dictionaries,
+            or a TaskStore or PersistentTasks, which look tasks up by ID
+        task_id (int): ID of the task
+
+    Returns:
+        dict: The task with the ID, or None if there is none
+    """
+    if isinstance(tasks, (TaskStore, PersistentTasks)):
+        return tasks.get(task_id)
+    return next((task for task in tasks if task["id"] == task_id), None)
+
+
+def update_task(tasks, task_id, changes):
+    """
+    Overwrite fields of a task in place, or in a new version of a PersistentTasks.
+
+    Args:
+        tasks (list | TaskStore | PersistentTasks): List of task dictionaries,
+            an indexed TaskStore, or an immutable PersistentTasks
+        task_id (int): ID of the task
+        changes (dict): Fields to overwrite on the task
+
+    Returns:
+        dict | PersistentTasks: The updated task, or None if there is no task
+            with the ID; for a PersistentTasks, the new version holding an
+            updated copy of the task, as versions share their task dictionaries
+    """
+    if isinstance(tasks, TaskStore):
+        return tasks.update(task_id, changes)
+    if isinstance(tasks, PersistentTasks):
+        return tasks.update(task_id, changes)
+    task = get_task(tasks, task_id)
+    if task is not None:
+        task.update(changes)
+    return task
+
+
+def delete_task(tasks, task_id):
+    """
+    Remove a task in place, or from a new version of a PersistentTasks.
+
+    Args:
+        tasks (list | TaskStore | PersistentTasks): List of task dictionaries,
+            an indexed TaskStore, or an immutable PersistentTasks
+        task_id (int): ID of the task
+
+    Returns:
+        dict | PersistentTasks: The removed task, or None if there is no task
+            with the ID; for a PersistentTasks, the new version without the task
+    """
+    if isinstance(tasks, TaskStore):
+        return tasks.delete(task_id)
+    if isinstance(tasks, PersistentTasks):
+        return tasks.delete(task_id)
+    for index, task in enumerate(tasks):
+        if task["id"] == task_id:
+            return tasks.pop(index)
+    return None
+
+
+@_holding_store_lock
+def bulk_add(tasks, new_tasks):
+    """
+    Create many tasks in one pass, with consecutive unique IDs. Like the
+    other bulk functions, and unlike add_task, which returns a new list, a
+    task list is changed in place, so adding many tasks doesn't copy it.
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, extended in place,
+            or an indexed TaskStore
+        new_tasks (iterable): Dictionaries with the title, description,
+            priority, category and due_date of each new task
+
+    Returns:
+        list: The created task dictionaries
+    """
+    next_id = generate_unique_id(tasks)
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    created = [
+        {
+            "id": next_id + offset,
+            "title": fields["title"],
+            "description": fields.get("description", ""),
+            "priority": fields.get("priority"),
+            "category": fields.get("category"),
+            "due_date": fields.get("due_date"),
+            "completed": False,
+            "created_at": created_at,
+        }
+        for offset, fields in enumerate(new_tasks)
+    ]
+    if isinstance(tasks, TaskStore):
+        tasks.add_many(created)
+    else:
+        tasks.extend(created)
+    return created
+
+
+@_holding_store_lock
+def bulk_update(tasks, predicate, changes):
+    """
+    Overwrite fields of every task matching a predicate, in one pass. For
+    example, to complete everything overdue in Work:
+    bulk_update(tasks, make_task_predicate(category="Work", completed=False,
+    due_before=today), {"completed": True})
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore
+        predicate (callable): Function of a task returning whether to update it
+        changes (dict): Fields to overwrite on each matching task
+
+    Returns:
+        list: The updated task dictionaries
+    """
+    matching = [task for task in tasks if predicate(task)]
+    if isinstance(tasks, TaskStore):
+        return tasks.update_many([task["id"] for task in matching], changes)
+    for task in matching:
+        task.update(changes)
+    return matching
+
+
+@_holding_store_lock
+def bulk_delete(tasks, predicate):
+    """
+    Remove every task matching a predicate in place, in one pass. For example,
+    to delete completed tasks created over 90 days ago:
+    bulk_delete(tasks, make_task_predicate(completed=True, created_before=cutoff))
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore
+        predicate (callable): Function of a task returning whether to delete it
+
+    Returns:
+        list: The removed task dictionaries
+    """
+    if isinstance(tasks, TaskStore):
+        return tasks.delete_many([task["id"] for task in tasks if predicate(task)])
+    kept, removed = [], []
+    for task in tasks:
+        (removed if predicate(task) else kept).append(task)
+    tasks[:] = kept
+    return removed
+
+
+def make_task_predicate(
+    category=None,
+    priority=None,
+    completed=None,
+    text=None,
+    due_before=None,
+    created_before=None,
+):
+    """
+    Build a predicate matching tasks on all of the inputted criteria, for use
+    with bulk_update and bulk_delete.
+
+    Args:
+        category (str): Category to match, or None for any
+        priority (str): Priority level to match, or None for any
+        completed (bool): Completion status to match, or None for any
+        text (str): Search query, matched as in search_tasks
+        due_before (str): Only match tasks due before this YYYY-MM-DD date
+        created_before (str): Only match tasks created before this
+            "YYYY-MM-DD HH:MM:SS" timestamp
+
+    Returns:
+        callable: Function of a task returning whether it matches
+    """
+    matches = _compile_task_predicate(category, priority, completed, text, due_before)
+    if created_before is None:
+        return matches
+    return lambda task: matches(task) and task.get("created_at", "") < created_before
+
+
 def save_tasks(tasks, file_path=DEFAULT_TASKS_FILE):
     """
-    Save tasks to a JSON file.
+    Save tasks to a JSON file, atomically and under the file lock. The
+    snapshot supersedes any journaled mutations, so the journal is discarded
+    afterwards, and the commit version in the metadata file is advanced.
+    Files with a SQLite, sharded, binary or record extension are written to
+    that storage engine instead.
 
     Args:
         tasks (list): List of task dictionaries
-        file_path (str): Path to save the JSON file
+        file_path (str): Path to the task file, in any storage format
     """
-    with open(file_path, "w") as f:
-        json.dump(tasks, f, indent=2)
+    if is_sqlite_path(file_path):
+        from src.sqlite_store import save_tasks_sqlite
+
+        return save_tasks_sqlite(tasks, file_path)
+    if is_sharded_path(file_path):
+        from src.shard_store import save_tasks_sharded
+
+        save_tasks_sharded(tasks, file_path)
+        return
+    if is_binary_path(file_path):
+        from src.binary_store import save_tasks_binary
+
+        return save_tasks_binary(tasks, file_path)
+    if is_record_path(file_path):
+        from src.record_store import save_tasks_records
+
+        return save_tasks_records(tasks, file_path)
+
+    # Locked, so a concurrent journal append can't land between writing the
+    # snapshot and discarding the journal it supersedes
+    with file_lock(file_path):
+        atomic_write_json(tasks, file_path, indent=2)
+        Path(get_journal_path(file_path)).unlink(missing_ok=True)
+        update_meta(file_path, version=load_meta(file_path).get("version", 0) + 1)
 
 
 def generate_unique_id(tasks):
@@ -60,11 +780,15 @@ def generate_unique_id(tasks):
     Generate a unique ID for a new task.
 
     Args:
-        tasks (list): List of existing task dictionaries
+        tasks (list | TaskStore | PersistentTasks): List of existing task
+            dictionaries, or a TaskStore or PersistentTasks, which track their
+            next ID without scanning
 
     Returns:
         int: A unique ID for a new task
     """
+    if isinstance(tasks, (TaskStore, PersistentTasks)):
+        return tasks.next_id
     if not tasks:
         return 1
     return max(task["id"] for task in tasks) + 1
@@ -75,12 +799,18 @@ def filter_tasks_by_priority(tasks, priority):
     Filter tasks by priority level.
 
     Args:
-        tasks (list): List of task dictionaries
+        tasks (list | TaskStore | ColumnarTasks): List of task dictionaries, an
+            indexed TaskStore, or a NumPy ColumnarTasks
         priority (str): Priority level to filter by (High, Medium, Low)
 
     Returns:
-        list: Filtered list of tasks matching the priority
+        list | ColumnarTasks: Filtered list of tasks matching the priority, or a
+            ColumnarTasks of them when given one
     """
+    if isinstance(tasks, TaskStore):
+        return tasks.filter(priority=priority)
+    if _is_columnar(tasks):
+        return tasks.select(tasks.mask(priority=priority))
     return [task for task in tasks if task.get("priority") == priority]
 
 
@@ -89,12 +819,18 @@ def filter_tasks_by_category(tasks, category):
     Filter tasks by category.
 
     Args:
-        tasks (list): List of task dictionaries
+        tasks (list | TaskStore | ColumnarTasks): List of task dictionaries, an
+            indexed TaskStore, or a NumPy ColumnarTasks
         category (str): Category to filter by
 
     Returns:
-        list: Filtered list of tasks matching the category
+        list | ColumnarTasks: Filtered list of tasks matching the category, or a
+            ColumnarTasks of them when given one
     """
+    if isinstance(tasks, TaskStore):
+        return tasks.filter(category=category)
+    if _is_columnar(tasks):
+        return tasks.select(tasks.mask(category=category))
     return [task for task in tasks if task.get("category") == category]
 
 
@@ -103,33 +839,54 @@ def filter_tasks_by_completion(tasks, completed=True):
     Filter tasks by completion status.
 
     Args:
-        tasks (list): List of task dictionaries
+        tasks (list | TaskStore | ColumnarTasks): List of task dictionaries, an
+            indexed TaskStore, or a NumPy ColumnarTasks
         completed (bool): Completion status to filter by
 
     Returns:
-        list: Filtered list of tasks matching the completion status
+        list | ColumnarTasks: Filtered list of tasks matching the completion
+            status, or a ColumnarTasks of them when given one
     """
+    if isinstance(tasks, TaskStore):
+        return tasks.filter(completed=completed)
+    if _is_columnar(tasks):
+        return tasks.select(tasks.mask(completed=completed))
     return [task for task in tasks if task.get("completed") == completed]
 
 
 def search_tasks(tasks, query):
     """
-    Search tasks by a text query in title and description.
+    Search tasks by a text query in title and description. Each query word
+    is matched as a prefix of a word in the task, every word must match, and
+    tasks are ranked with title matches first, ties keeping their order. A
+    TaskStore is searched through its inverted index.
 
     Args:
-        tasks (list): List of task dictionaries
+        tasks (list | TaskStore | ColumnarTasks): List of task dictionaries, an
+            indexed TaskStore, or a NumPy ColumnarTasks
         query (str): Search query
 
     Returns:
-        list: Filtered list of tasks matching the search query
+        list | ColumnarTasks: Tasks matching the search query, most relevant
+            first, or a ColumnarTasks of them when given one
     """
-    query = query.lower()
-    return [
-        task
-        for task in tasks
-        if query in task.get("title", "").lower()
-        or query in task.get("description", "").lower()
-    ]
+    if isinstance(tasks, TaskStore):
+        return tasks.search(query)
+    if _is_columnar(tasks):
+        return tasks.search(query)
+    return _rank_by_relevance(tasks, query)
+
+
+def _rank_by_relevance(tasks, query):
+    # Matches and ranks tasks without an index, as SearchIndex.search does
+    scorer = make_scorer(query)
+    matches = []
+    for task in tasks:
+        score = scorer(task.get("title", ""), task.get("description", ""))
+        if score:
+            matches.append((score, task))
+    matches.sort(key=lambda match: -match[0])
+    return [task for _, task in matches]
 
 
 def get_overdue_tasks(tasks):
@@ -137,12 +894,19 @@ def get_overdue_tasks(tasks):
     Get tasks that are past their due date and not completed.
 
     Args:
-        tasks (list): List of task dictionaries
+        tasks (list | TaskStore | ColumnarTasks): List of task dictionaries, a
+            NumPy ColumnarTasks, or an indexed TaskStore, whose overdue tasks
+            come back ordered by due date
 
     Returns:
-        list: List of overdue tasks
+        list | ColumnarTasks: List of overdue tasks, or a ColumnarTasks of them
+            when given one
     """
     today = datetime.now().strftime("%Y-%m-%d")
+    if isinstance(tasks, TaskStore):
+        return tasks.overdue(today)
+    if _is_columnar(tasks):
+        return tasks.select(tasks.mask(overdue_on=today))
     return [
         task
         for task in tasks
@@ -150,58 +914,438 @@ def get_overdue_tasks(tasks):
     ]
 
 
+def _compile_task_predicate(category, priority, completed, text, due_before):
+    # Only the criteria that were given are checked per task
+    checks = []
+    if category is not None:
+        checks.append(lambda task: task.get("category") == category)
+    if priority is not None:
+        checks.append(lambda task: task.get("priority") == priority)
+    if completed is not None:
+        checks.append(lambda task: task.get("completed") == completed)
+    if due_before is not None:
+        checks.append(lambda task: (task.get("due_date") or "") < due_before)
+    if text:
+        scorer = make_scorer(text)
+        checks.append(
+            lambda task: scorer(task.get("title", ""), task.get("description", "")) > 0
+        )
+    return lambda task: all(check(task) for check in checks)
+
+
+def _index_criteria(category, priority, completed):
+    # The criteria a TaskStore can answer from its hash indexes
+    criteria = {"category": category, "priority": priority, "completed": completed}
+    return {field: value for field, value in criteria.items() if value is not None}
+
+
+def _sort_key(sort_by):
+    if sort_by == "priority":
+        return lambda task: PRIORITY_ORDER.get(task.get("priority"), len(PRIORITY_ORDER))
+    return lambda task: (task.get(sort_by) is None, task.get(sort_by))
+
+
+@_holding_store_lock
+def query_tasks(
+    tasks,
+    category=None,
+    priority=None,
+    completed=None,
+    text=None,
+    due_before=None,
+    sort_by=None,
+    limit=None,
+    offset=0,
+    count_total=True,
+):
+    """
+    Get one page of the tasks matching all of the inputted criteria, in a single
+    pass and without building intermediate filtered lists. A TaskStore is
+    queried through its indexes, starting from the most selective one.
+    Without count_total, an unsorted query stops as soon as the page is full.
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore
+        category (str): Category to filter by, or None for any
+        priority (str): Priority level to filter by, or None for any
+        completed (bool): Completion status to filter by, or None for any
+        text (str): Search query, as in search_tasks, or None for any
+        due_before (str): Only include tasks due before this YYYY-MM-DD date
+        sort_by (str): Task field to sort by, or None to keep the tasks' order,
+            most relevant first when searching. Priorities sort from High to Low.
+        limit (int): Maximum number of tasks to return, or None for all
+        offset (int): Number of matching tasks to skip
+        count_total (bool): Whether to count every match, e.g. for page counts
+
+    Returns:
+        tuple: The list of tasks on the page, and the total number of matches,
+            which is None if it wasn't counted
+    """
+    if isinstance(tasks, TaskStore):
+        criteria = _index_criteria(category, priority, completed)
+        if text:
+            ranks = {task["id"]: rank for rank, task in enumerate(tasks.search(text))}
+            matches = tasks.select(task_ids=set(ranks), due_before=due_before, **criteria)
+            if sort_by is None:
+                # Indexes yield in insertion order, so put the matches back in relevance order
+                matches = sorted(matches, key=lambda task: ranks[task["id"]])
+        else:
+            matches = tasks.select(due_before=due_before, **criteria)
+    else:
+        predicate = _compile_task_predicate(category, priority, completed, None, due_before)
+        matches = (task for task in tasks if predicate(task))
+        if text:
+            matches = _rank_by_relevance(matches, text)
+
+    total = 0
+    if sort_by is not None:
+
+        def counted(matches):
+            nonlocal total
+            for task in matches:
+                total += 1
+                yield task
+
+        if limit is None:
+            page = sorted(counted(matches), key=_sort_key(sort_by))[offset:]
+        elif offset + limit <= 0:
+            page = []
+            total = sum(1 for _ in matches)
+        else:
+            # Only the tasks up to the end of the page need to be kept while sorting
+            page = heapq.nsmallest(offset + limit, counted(matches), key=_sort_key(sort_by))
+            page = page[offset:]
+        return page, total
+
+    end = None if limit is None else offset + limit
+    stop = None if count_total else end
+    page = []
+    if stop == 0:
+        return page, None
+    for task in matches:
+        if offset <= total and (end is None or total < end):
+            page.append(task)
+        total += 1
+        if total == stop:
+            return page, None
+    return page, total if count_total else None
+
+
+@_holding_store_lock
+def count_tasks(
+    tasks, category=None, priority=None, completed=None, text=None, due_before=None
+):
+    """
+    Count the tasks matching all of the inputted criteria, as query_tasks would.
+    A TaskStore answers category, priority and completion counts from its indexes.
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore
+        category (str): Category to filter by, or None for any
+        priority (str): Priority level to filter by, or None for any
+        completed (bool): Completion status to filter by, or None for any
+        text (str): Search query, as in search_tasks, or None for any
+        due_before (str): Only include tasks due before this YYYY-MM-DD date
+
+    Returns:
+        int: Number of matching tasks
+    """
+    if isinstance(tasks, TaskStore) and not text and due_before is None:
+        criteria = _index_criteria(category, priority, completed)
+        return tasks.count_matching(**criteria)
+    _, total = query_tasks(tasks, category, priority, completed, text, due_before, limit=0)
+    return total
+
+
+@_holding_store_lock
+def get_tasks_after(
+    tasks,
+    tasks_per_page,
+    cursor=None,
+    sort_by="id",
+    category=None,
+    priority=None,
+    completed=None,
+):
+    """
+    Get the page of tasks following a keyset cursor. Unlike page numbers, a
+    cursor keeps pointing at the same place while tasks are added and deleted.
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore,
+            which only visits the tasks up to the end of the page
+        tasks_per_page (int): Number of tasks per page
+        cursor: The cursor returned with the previous page, or None for the first page
+        sort_by (str): "id" or "due_date"
+        category (str): Category to filter by, or None for any
+        priority (str): Priority level to filter by, or None for any
+        completed (bool): Completion status to filter by, or None for any
+
+    Returns:
+        tuple: The list of tasks on the page, and the cursor of the next page,
+            which is None if this is the last page
+    """
+    if sort_by == "id":
+        key = lambda task: task["id"]
+    elif sort_by == "due_date":
+        key = lambda task: (task.get("due_date") or "", task["id"])
+    else:
+        raise ValueError(f"Can't paginate by {sort_by}, only by id or due_date")
+    if tasks_per_page <= 0:
+        return [], cursor
+
+    if isinstance(tasks, TaskStore):
+        criteria = _index_criteria(category, priority, completed)
+        page = list(islice(tasks.iter_after(sort_by, cursor, **criteria), tasks_per_page + 1))
+    else:
+        if cursor is not None and sort_by == "due_date":
+            cursor = tuple(cursor)
+        predicate = _compile_task_predicate(category, priority, completed, None, None)
+        page = heapq.nsmallest(
+            tasks_per_page + 1,
+            (
+                task
+                for task in tasks
+                if (cursor is None or key(task) > cursor) and predicate(task)
+            ),
+            key=key,
+        )
+
+    # One task past the page is fetched to tell whether there is a next page
+    if len(page) <= tasks_per_page:
+        return page, None
+    page = page[:tasks_per_page]
+    return page, key(page[-1])
+
+
+def get_tasks_due_between(tasks, start, end, completed=None):
+    """
+    Get tasks due within a date range.
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore
+        start (str): Earliest due date to include, in YYYY-MM-DD format
+        end (str): Latest due date to include, in YYYY-MM-DD format
+        completed (bool): Completion status to include, or None for both
+
+    Returns:
+        list: List of tasks due in the range, earliest first
+    """
+    if isinstance(tasks, TaskStore):
+        return tasks.due_between(start, end, completed)
+    return sorted(
+        (
+            task
+            for task in tasks
+            if start <= (task.get("due_date") or "") <= end
+            and (completed is None or bool(task.get("completed", False)) == completed)
+        ),
+        key=lambda task: task.get("due_date") or "",
+    )
+
+
+def get_next_due_tasks(tasks, count):
+    """
+    Get the incomplete tasks due soonest, starting from today.
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore
+        count (int): Maximum number of tasks to return
+
+    Returns:
+        list: List of upcoming tasks, earliest first
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    if isinstance(tasks, TaskStore):
+        return tasks.next_due(today, count)
+    return heapq.nsmallest(
+        max(count, 0),
+        (
+            task
+            for task in tasks
+            if not task.get("completed", False) and (task.get("due_date") or "") >= today
+        ),
+        key=lambda task: task.get("due_date") or "",
+    )
+
+
 def delete_tasks(file_path=DEFAULT_TASKS_FILE):
     """
-    Deletes the inputted task file, if it exists.
+    Deletes the inputted task file and its journal, if they exist. Deleting a
+    shard manifest or record file also deletes its shards or text heap.
 
     Args:
         file_path (str): Path to the JSON file to delete
     """
+    if is_sharded_path(file_path):
+        from src.shard_store import delete_tasks_sharded
+
+        return delete_tasks_sharded(file_path)
+    if is_record_path(file_path):
+        from src.record_store import delete_tasks_records
+
+        return delete_tasks_records(file_path)
     if os.path.exists(file_path):
         os.remove(file_path)
+    Path(get_journal_path(file_path)).unlink(missing_ok=True)
+
+
+def get_csv_columns(tasks):
+    """
+    Get the CSV columns for the inputted tasks: every key, in order of first appearance.
+
+    Args:
+        tasks (list): List of task dictionaries
+
+    Returns:
+        list: List of column names
+    """
+    return list(dict.fromkeys(key for task in tasks for key in task))
+
+
+def iter_csv_chunks(tasks, columns=None, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Stream the inputted tasks as CSV, a chunk of rows at a time, so only one
+    chunk is held in memory at once.
+
+    Args:
+        tasks (iterable): Task dictionaries, in a collection or a one-shot
+            iterator such as iter_tasks
+        columns (list): Column names, or None to use every key of the tasks,
+            which requires an extra pass over them
+        chunk_size (int): Number of tasks to write per chunk
+
+    Yields:
+        bytes: UTF-8 encoded CSV data, starting with the header row
+
+    Raises:
+        TypeError: If columns is None and tasks is an iterator, which the
+            extra pass would use up
+    """
+    if columns is None:
+        if iter(tasks) is tasks:
+            raise TypeError("columns must be given to export tasks from an iterator")
+        columns = get_csv_columns(tasks)
+    if not columns:
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(
+        buffer, fieldnames=columns, extrasaction="ignore", lineterminator="\n"
+    )
+    writer.writeheader()
+    for index, task in enumerate(tasks, start=1):
+        writer.writerow(task)
+        if index % chunk_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
 
 def export_to_csv_bytes(tasks):
     """
-    Exports the inputted tasks to a CSV bytes buffer
+    Exports the inputted tasks to CSV bytes
 
     Args:
         tasks (list): List of task dictionaries
-    
+
     Returns:
         bytes: CSV byte data
     """
-    df = pd.DataFrame(tasks) # Convert tasks to a dataframe
-    
-    # Create a BytesIO buffer to hold the CSV byte data
-    buffer = io.BytesIO()
-    df.to_csv(buffer, index=False, encoding='utf-8') # Write to the buffer as if it were a file
+    return b"".join(iter_csv_chunks(tasks))
 
-    csv_bytes = buffer.getvalue()
-    
-    buffer.close()
-    
+
+# Number of views whose most recent CSV export is kept, as every distinct
+# filter combination exported is a view of its own
+CSV_EXPORT_CACHE_SIZE = 8
+
+# Most recent CSV export of each view, as view -> (dataset version, CSV bytes),
+# least recently used first
+_csv_export_cache = OrderedDict()
+_csv_export_cache_lock = threading.Lock()
+
+
+def get_cached_csv_bytes(tasks, version, view=None):
+    """
+    Exports the inputted tasks to CSV bytes, reusing the previous export of the
+    same view if the dataset hasn't changed since. Only the exports of the
+    CSV_EXPORT_CACHE_SIZE most recently exported views are kept.
+
+    Args:
+        tasks (list): List of task dictionaries to export
+        version: Version of the dataset the tasks came from, e.g. TaskStore.version
+        view: Hashable description of how the tasks were filtered, None for all tasks
+
+    Returns:
+        bytes: CSV byte data
+    """
+    with _csv_export_cache_lock:
+        cached = _csv_export_cache.get(view)
+        hit = cached is not None and cached[0] == version
+        if hit:
+            _csv_export_cache.move_to_end(view)
+    record_cache("csv_export", hit)
+    if hit:
+        return cached[1]
+    csv_bytes = export_to_csv_bytes(tasks)
+    with _csv_export_cache_lock:
+        _csv_export_cache[view] = (version, csv_bytes)
+        _csv_export_cache.move_to_end(view)
+        while len(_csv_export_cache) > CSV_EXPORT_CACHE_SIZE:
+            _csv_export_cache.popitem(last=False)
     return csv_bytes
 
-def get_num_pages(tasks, tasks_per_page):
+
+def get_facet_counts(tasks):
+    """
+    Get counts of tasks by category, priority and completion status, and of
+    overdue tasks. A TaskStore keeps its counts up to date as tasks change, so
+    they are read without scanning the tasks.
+
+    Args:
+        tasks (list | TaskStore): List of task dictionaries, or an indexed TaskStore
+
+    Returns:
+        FacetCounts: Counts of the tasks
+    """
+    if isinstance(tasks, TaskStore):
+        return tasks.facets
+    return FacetCounts(tasks)
+
+
+def get_num_pages(tasks, tasks_per_page, **criteria):
     """
     Calculate the number of pages needed to display tasks.
 
     Args:
-        tasks (list): List of task dictionaries
-    
+        tasks (list | int | TaskStore | FacetCounts): List of task dictionaries,
+            the number of tasks, an indexed TaskStore, or counts of tasks
+        tasks_per_page (int): Number of tasks per page
+        **criteria: Category, priority and/or completion status of the tasks
+            to display, counted from the facet counts
+
     Returns:
         int: Number of pages needed to display tasks
     """
     if tasks_per_page <= 0:
         return 1
-    return max(math.ceil(len(tasks) / tasks_per_page), 1)
+    if isinstance(tasks, int):
+        task_count = tasks
+    elif criteria or isinstance(tasks, FacetCounts):
+        facets = tasks if isinstance(tasks, FacetCounts) else get_facet_counts(tasks)
+        task_count = facets.count(**criteria)
+    else:
+        task_count = len(tasks)
+    return max(math.ceil(task_count / tasks_per_page), 1)
 
 def get_paginated_tasks(page_number, tasks, tasks_per_page):
     """
     Get a paginated list of tasks.
     Args:
         page_number (int): The current page number
-        tasks (list): List of task dictionaries
+        tasks (list | iterable): List of task dictionaries, or a stream of them
         tasks_per_page (int): Number of tasks per page
     
     Returns:
@@ -209,4 +1353,39 @@ def get_paginated_tasks(page_number, tasks, tasks_per_page):
     """
     start_index = (page_number - 1) * tasks_per_page
     end_index = start_index + tasks_per_page
+    if not isinstance(tasks, list):
+        # Streams such as iter_tasks are only read as far as the end of the page
+        if start_index < 0 or tasks_per_page <= 0:
+            return []
+        return list(islice(tasks, start_index, end_index))
     return tasks[start_index:end_index]
+
+
+def _journaled_file_paths(file_path):
+    # Loads replay the journal and saves fold it into the snapshot
+    return file_path, str(file_path) + JOURNAL_SUFFIX
+
+
+def _meta_file_paths(file_path):
+    return (str(file_path) + META_SUFFIX,)
+
+
+# Every public function records its calls while metrics are enabled, see src/metrics.py.
+# The lock and atomic write context managers are left alone, as calling them
+# only creates the context manager
+instrument_functions(
+    globals(),
+    reads_files=("load_tasks", "iter_tasks", "load_category_tasks", "load_meta", "load_next_id"),
+    writes_files=("save_tasks", "save_next_id", "update_meta", "atomic_write_json"),
+    exclude=("file_lock", "atomic_open"),
+    get_file_paths={
+        "load_tasks": _journaled_file_paths,
+        "iter_tasks": _journaled_file_paths,
+        "load_category_tasks": _journaled_file_paths,
+        "save_tasks": _journaled_file_paths,
+        "load_meta": _meta_file_paths,
+        "load_next_id": _meta_file_paths,
+        "save_next_id": _meta_file_paths,
+        "update_meta": _meta_file_paths,
+    },
+)
@@ -0,0 +1,158 @@
+import os
+import threading
+from src.tasks import (
+    DEFAULT_TASKS_FILE,
+    file_lock,
+    load_meta,
+    save_tasks,
+)
+
+# Seconds a write-behind queue waits for more mutations before committing them together
+GROUP_COMMIT_DELAY = 0.05
+
+# Absolute task file path -> the process's WriteBehindQueue for it
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+class WriteConflictError(Exception):
+    """
+    Raised when a task file was committed to by another writer since the
+    version a commit was based on.
+    """
+
+
+def load_version(file_path=DEFAULT_TASKS_FILE):
+    """
+    Load the commit version of a task file, which every commit increments.
+
+    Args:
+        file_path (str): Path to the task file
+
+    Returns:
+        int: The version, 0 if nothing has been committed
+    """
+    return load_meta(file_path).get("version", 0)
+
+
+def commit_tasks(tasks, file_path=DEFAULT_TASKS_FILE, expected_version=None):
+    """
+    Durably replace the snapshot of a task file, discarding its journal.
+    The snapshot is written atomically while holding the file lock, so
+    concurrent readers never see a torn file.
+
+    Args:
+        tasks (list): List of task dictionaries
+        file_path (str): Path to the JSON snapshot file
+        expected_version (int): Version the tasks were loaded at, or None to
+            overwrite whatever was committed since
+
+    Returns:
+        int: The new version of the task file
+
+    Raises:
+        WriteConflictError: If the file is no longer at expected_version
+    """
+    with file_lock(file_path):
+        version = load_version(file_path)
+        if expected_version is not None and expected_version != version:
+            raise WriteConflictError(
+                f"{file_path} is at version {version}, not {expected_version}"
+            )
+        save_tasks(list(tasks), file_path)  # Also advances the version
+    return version + 1
+
+
+class WriteBehindQueue:
+    """
+    Buffers journal records for a task file and commits every record that
+    arrives within GROUP_COMMIT_DELAY of the first one in a single locked,
+    fsynced append, so a burst of clicks costs one durable write.
+
+    Records describe operations rather than whole files, so commits from
+    other writers in between are merged rather than overwritten. The commit
+    callback is told whether any happened, so cached tasks can be reloaded.
+    """
+
+    def __init__(self, file_path=DEFAULT_TASKS_FILE, delay=GROUP_COMMIT_DELAY, on_commit=None):
+        """
+        Args:
+            file_path (str): Path to the JSON snapshot file
+            delay (float): Seconds to wait for more records before committing
+            on_commit (callable): Called after each commit with True if another
+                writer committed to the file since this queue's last commit
+        """
+        self.file_path = file_path
+        self.delay = delay
+        self.on_commit = on_commit
+        self.version = load_version(file_path)  # Last version this queue saw
+        self._records = []
+        self._timer = None
+        self._lock = threading.Lock()  # Guards the buffer and timer
+        self._commit_lock = threading.Lock()  # Keeps commits in submission order
+
+    def __len__(self):
+        return len(self._records)
+
+    def append(self, record):
+        """
+        Queue a mutation record, scheduling a commit if none is pending.
+
+        Args:
+            record (dict): Mutation record with an "op" key of add, update or delete
+        """
+        with self._lock:
+            self._records.append(record)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Commit every queued record now.
+
+        Returns:
+            int: The version of the task file after the commit
+        """
+        # Imported here, as the journal commits through this module
+        from src.journal import append_journal_records
+
+        with self._commit_lock:
+            with self._lock:
+                records, self._records = self._records, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not records:
+                return self.version
+            with file_lock(self.file_path):
+                external_changes = load_version(self.file_path) != self.version
+                self.version = append_journal_records(records, self.file_path)
+            if self.on_commit is not None:
+                self.on_commit(external_changes)
+            return self.version
+
+    def close(self):
+        """
+        Commit any queued records and stop the pending timer.
+        """
+        self.flush()
+
+
+def get_write_behind_queue(file_path=DEFAULT_TASKS_FILE, on_commit=None):
+    """
+    Get the write-behind queue shared by every caller in the process for a task file.
+
+    Args:
+        file_path (str): Path to the JSON snapshot file
+        on_commit (callable): Commit callback, only used when the queue is created
+
+    Returns:
+        WriteBehindQueue: The queue for the file
+    """
+    key = os.path.abspath(file_path)
+    with _queues_lock:
+        if key not in _queues:
+            _queues[key] = WriteBehindQueue(file_path, on_commit=on_commit)
+        return _queues[key]
@@ -1,8 +1,7 @@
 import pytest
 from unittest.mock import patch, mock_open, MagicMock
 from pytest_bdd import scenarios, given, when, then
-from src.app import (
-    add_task,
+from src.tasks import (
     save_tasks,
     load_tasks,
     filter_tasks_by_category,
@@ -102,18 +101,18 @@ def precondition(context):
 
 @when("I make any changes to the task list")
 def action(context):
-    with patch("builtins.open", mock_open()) as mocked_file:
-        with patch("json.dump") as mocked_json_dump:
+    with patch("src.tasks.file_lock") as mocked_lock, patch("src.tasks.update_meta"):
+        with patch("src.tasks.atomic_write_json") as mocked_write:
             save_tasks(context["tasks"], context["file_path"])
-            context["mocked_file"] = mocked_file
-            context["mocked_json_dump"] = mocked_json_dump
+            context["mocked_lock"] = mocked_lock
+            context["mocked_write"] = mocked_write
 
 
 @then("the task list should be saved")
 def outcome(context):
-    context["mocked_file"].assert_called_once_with(context["file_path"], "w")
-    context["mocked_json_dump"].assert_called_once_with(
-        context["tasks"], context["mocked_file"](), indent=2
+    context["mocked_lock"].assert_called_once_with(context["file_path"])
+    context["mocked_write"].assert_called_once_with(
+        context["tasks"], context["file_path"], indent=2
     )
 
 
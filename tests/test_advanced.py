@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
 from unittest.mock import patch, MagicMock
+from src.task_store import TaskStore
 from src.tasks import (
     generate_unique_id,
     filter_tasks_by_category,
@@ -105,7 +106,7 @@ def test_filter_tasks_by_completion(completed, expected):
 @pytest.mark.parametrize(
     "query, expected",
     [
-        ("important", [task1, task2, task4]),
+        ("important", [task2, task4, task1]),  # Title matches first
         ("Task 1", [task1]),
         ("invalid", []),
     ],
@@ -144,20 +145,35 @@ def test_get_overdue_tasks(tasks, expected, date):
         assert get_overdue_tasks(tasks) == expected
 
 
-@patch("src.app.load_tasks", return_value=tasks)
-@patch("src.app.save_tasks")
+@patch("src.app.load_cached_tasks", side_effect=lambda: TaskStore(tasks))
+@patch("src.app.reserve_task_ids", return_value=6)
+@patch("src.app.refresh_cached_tasks")
+@patch("src.app.invalidate_cached_tasks")
 @patch("src.app.delete_tasks")
-@patch("src.app.subprocess.run")
-@patch("src.app.get_paginated_tasks", return_value=tasks)
+@patch("src.app.start_test_run")
+@patch("src.app.query_tasks", return_value=(tasks, len(tasks)))
+@patch("src.app.journal_add")
+@patch("src.app.journal_update")
+@patch("src.app.journal_delete")
+@patch("src.app.get_write_behind_queue")
 def test_main(
-    mock_get_paginated_tasks,
-    mock_subprocess,
+    mock_get_write_behind_queue,
+    mock_journal_delete,
+    mock_journal_update,
+    mock_journal_add,
+    mock_query_tasks,
+    mock_start_test_run,
     mock_delete_tasks,
-    mock_save_tasks,
-    mock_load_tasks,
+    mock_invalidate_cached_tasks,
+    mock_refresh_cached_tasks,
+    mock_reserve_task_ids,
+    mock_load_cached_tasks,
 ):
     with patch("src.app.st") as mock_streamlit:
         mock_streamlit.columns.return_value = [MagicMock(), MagicMock()]
+        mock_streamlit.text_input.return_value = "Task 6"
+        mock_streamlit.text_area.return_value = "Task 6 description"
+        mock_streamlit.date_input.return_value = datetime(2000, 6, 15)
 
         from src.app import (
             main,
@@ -166,3 +182,10 @@ def test_main(
         # Run test as if all buttons pressed and all forms filled
         # Note - main is a script that Streamlit uses to re-create the entire app any time any changes are made, updating the UI
         main()
+
+    # Changes go through the cached tasks and the write-behind queue, not the task file
+    mock_load_cached_tasks.assert_called_once_with()
+    assert mock_journal_add.call_args_list[0].args[0]["title"] == "Task 6"
+    assert mock_journal_add.call_args.kwargs["writer"] is mock_get_write_behind_queue.return_value
+    mock_get_write_behind_queue.return_value.flush.assert_called_once_with()
+    mock_delete_tasks.assert_called_once_with()
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from src import async_tasks
+from src.tasks import export_to_csv_bytes, load_tasks, save_tasks
+
+
+@pytest.fixture
+def task_file(tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks([{"id": 1, "title": "Task 1", "completed": False}], file_path)
+    return file_path
+
+
+def test_load_tasks(task_file):
+    assert asyncio.run(async_tasks.load_tasks(task_file)) == load_tasks(task_file)
+
+
+def test_concurrent_loads_share_one_read(task_file):
+    async def load_many():
+        return await asyncio.gather(*(async_tasks.load_tasks(task_file) for _ in range(100)))
+
+    with patch("src.tasks.load_tasks", wraps=load_tasks) as mock_load_tasks:
+        results = asyncio.run(load_many())
+
+    mock_load_tasks.assert_called_once_with(task_file)
+    assert all(result is results[0] for result in results)
+
+
+def test_sequential_loads_read_again(task_file):
+    async def load_twice():
+        first = await async_tasks.load_tasks(task_file)
+        save_tasks([], task_file)
+        return first, await async_tasks.load_tasks(task_file)
+
+    first, second = asyncio.run(load_twice())
+    assert len(first) == 1
+    assert second == []
+
+
+def test_writes_are_serialized_in_order(task_file):
+    async def save_many():
+        await asyncio.gather(
+            *(async_tasks.save_tasks([{"id": task_id}], task_file) for task_id in range(50))
+        )
+        return await async_tasks.load_tasks(task_file)
+
+    assert asyncio.run(save_many()) == [{"id": 49}]
+
+
+def test_load_waits_for_pending_write(task_file):
+    async def save_then_load():
+        save = asyncio.ensure_future(async_tasks.save_tasks([{"id": 2}], task_file))
+        await asyncio.sleep(0)  # Let the save take the file lock
+        loaded = await async_tasks.load_tasks(task_file)
+        await save
+        return loaded
+
+    assert asyncio.run(save_then_load()) == [{"id": 2}]
+
+
+def test_delete_tasks(task_file):
+    async def delete_then_load():
+        await async_tasks.delete_tasks(task_file)
+        return await async_tasks.load_tasks(task_file)
+
+    assert asyncio.run(delete_then_load()) == []
+
+
+def test_export_to_csv_bytes():
+    tasks = [{"id": 1, "title": "Task 1"}, {"id": 2, "title": "Task 2"}]
+    assert asyncio.run(async_tasks.export_to_csv_bytes(tasks)) == export_to_csv_bytes(tasks)
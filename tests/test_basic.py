@@ -9,13 +9,13 @@ def test_save_tasks():
     tasks = [{"id": 1, "title": "Task 1"}, {"id": 2, "title": "Task 2"}]
     file_path = "mock_tasks.json"
 
-    with patch("builtins.open", mock_open()) as mocked_file:
-        with patch("json.dump") as mocked_json_dump:
+    with patch("src.tasks.file_lock") as mocked_lock, patch("src.tasks.update_meta"):
+        with patch("src.tasks.atomic_write_json") as mocked_write:
             save_tasks(tasks, file_path)
 
-            # Assert that the correct file was opened and received the correct JSON content
-            mocked_file.assert_called_once_with(file_path, "w")
-            mocked_json_dump.assert_called_once_with(tasks, mocked_file(), indent=2)
+            # Assert that the file was replaced atomically with the correct JSON content, under its lock
+            mocked_lock.assert_called_once_with(file_path)
+            mocked_write.assert_called_once_with(tasks, file_path, indent=2)
 
 
 def test_load_tasks_successful():
@@ -0,0 +1,56 @@
+import copy
+from src import shard_store
+from benchmarks.bench_tasks import (
+    BENCHMARKS,
+    compare_results,
+    generate_tasks,
+    main,
+    run_benchmarks,
+)
+
+
+def test_generate_tasks_is_reproducible():
+    tasks = generate_tasks(50, seed=1)
+    assert tasks == generate_tasks(50, seed=1)
+    assert tasks != generate_tasks(50, seed=2)
+    assert [task["id"] for task in tasks] == list(range(1, 51))
+
+
+def test_run_benchmarks_covers_every_benchmark():
+    results = run_benchmarks(sizes=[20], repeat=1)
+    assert set(results["results"]["20"]) == set(BENCHMARKS)
+    for measurement in results["results"]["20"].values():
+        assert measurement["seconds"] >= 0
+        assert measurement["peak_bytes"] >= 0
+    # The workers started by the parallel shard load don't outlive the run
+    assert shard_store._process_pool is None
+
+
+def test_compare_results_flags_regressions():
+    baseline = {
+        "results": {
+            "1000": {
+                "load_tasks": {"seconds": 0.01, "peak_bytes": 1000},
+                "save_tasks": {"seconds": 0.0001, "peak_bytes": 1000},
+            }
+        }
+    }
+    results = copy.deepcopy(baseline)
+    results["results"]["1000"]["load_tasks"] = {"seconds": 0.02, "peak_bytes": 1100}
+    # Sub-millisecond timings are noise, so tripling one isn't a regression
+    results["results"]["1000"]["save_tasks"]["seconds"] = 0.0003
+    results["results"]["1000"]["search_tasks"] = {"seconds": 1, "peak_bytes": 1}
+
+    assert compare_results(results, baseline, tolerance=0.25) == [
+        ("1000", "load_tasks", "seconds", 0.01, 0.02)
+    ]
+    assert compare_results(results, baseline, tolerance=1.5) == []
+
+
+def test_main_saves_and_compares(tmp_path):
+    baseline_path = str(tmp_path / "baseline.json")
+    arguments = ["--sizes", "10", "--repeat", "1", "--only", "add_task", "search_tasks"]
+
+    assert main(arguments + ["--save", baseline_path]) == 0
+    # Generous, as timings of so few tasks vary a lot between runs
+    assert main(arguments + ["--compare", baseline_path, "--tolerance", "100"]) == 0
@@ -0,0 +1,138 @@
+import json
+import os
+import pytest
+from unittest.mock import patch
+from src.tasks import iter_tasks, load_tasks, save_tasks
+from src.binary_store import (
+    BinaryTasks,
+    convert_binary_to_json,
+    convert_json_to_binary,
+    get_binary_task,
+    load_tasks_binary,
+)
+
+
+@pytest.fixture
+def tasks():
+    return [
+        {
+            "id": 1,
+            "title": "Task 1",
+            "description": "Description 1",
+            "priority": "High",
+            "category": "Work",
+            "due_date": "2024-01-01",
+            "completed": False,
+        },
+        {
+            "id": 2,
+            "title": "Tâche 2 ✓",
+            "description": "",
+            "priority": "Low",
+            "category": "Work",
+            "due_date": "2024-02-01",
+            "completed": True,
+        },
+        # Missing, null, oddly typed and extra fields all round-trip
+        {"id": 3, "title": None, "completed": "yes", "priority": 1, "tags": ["a", "b"]},
+        {"id": "4", "description": "No title"},
+    ]
+
+
+@pytest.fixture
+def binary_file(tmp_path):
+    return str(tmp_path / "tasks.tbin")
+
+
+def test_binary_round_trip(tasks, binary_file):
+    save_tasks(tasks, binary_file)
+
+    assert load_tasks(binary_file) == tasks
+    assert list(iter_tasks(binary_file)) == tasks
+
+
+def test_empty_binary_file(binary_file):
+    assert load_tasks(binary_file) == []
+    save_tasks([], binary_file)
+    assert load_tasks(binary_file) == []
+
+
+def test_zero_length_binary_file(binary_file):
+    open(binary_file, "wb").close()
+    assert load_tasks(binary_file) == []
+    assert list(iter_tasks(binary_file)) == []
+    with BinaryTasks(binary_file) as tasks:
+        assert len(tasks) == 0
+        with pytest.raises(IndexError):
+            tasks[0]
+
+
+def test_get_task_by_position(tasks, binary_file):
+    save_tasks(tasks, binary_file)
+
+    assert get_binary_task(binary_file, 1) == tasks[1]
+    with BinaryTasks(binary_file) as binary_tasks:
+        assert len(binary_tasks) == 4
+        assert binary_tasks[-1] == tasks[-1]
+        with pytest.raises(IndexError):
+            binary_tasks[4]
+
+
+def test_read_slices_and_batches(binary_file):
+    tasks = [
+        {"id": task_id, "title": f"Task {task_id}", "completed": task_id % 2 == 0}
+        for task_id in range(1, 8)
+    ]
+    del tasks[2]["title"]  # Fields missing from some tasks stay missing
+    tasks[3]["title"] = "Null\0byte"
+    tasks[5]["notes"] = "Only task 6 has notes"
+    save_tasks(tasks, binary_file)
+
+    with BinaryTasks(binary_file) as binary_tasks:
+        assert binary_tasks[2:5] == tasks[2:5]
+        assert binary_tasks[::3] == tasks[::3]
+        assert binary_tasks[5:2] == []
+        assert binary_tasks[3] == tasks[3]
+    with patch("src.binary_store.ITER_BATCH_SIZE", 3):
+        assert list(iter_tasks(binary_file)) == tasks
+
+
+def test_binary_file_is_smaller_than_json(tmp_path):
+    tasks = [
+        {
+            "id": task_id,
+            "title": f"Task {task_id}",
+            "description": f"Description {task_id}",
+            "priority": "Medium",
+            "category": "Personal",
+            "due_date": "2024-01-01",
+            "completed": False,
+        }
+        for task_id in range(1000)
+    ]
+    save_tasks(tasks, str(tmp_path / "tasks.json"))
+    save_tasks(tasks, str(tmp_path / "tasks.tbin"))
+
+    json_size = os.path.getsize(tmp_path / "tasks.json")
+    assert os.path.getsize(tmp_path / "tasks.tbin") < json_size / 2
+
+
+def test_rejects_other_files(tmp_path):
+    file_path = str(tmp_path / "tasks.tbin")
+    with open(file_path, "w") as f:
+        json.dump([{"id": 1}], f)
+
+    with pytest.raises(ValueError):
+        load_tasks_binary(file_path)
+
+
+def test_converters(tasks, tmp_path):
+    json_path = str(tmp_path / "tasks.json")
+    binary_path = str(tmp_path / "tasks.tbin")
+    save_tasks(tasks, json_path)
+
+    convert_json_to_binary(json_path, binary_path)
+    os.remove(json_path)
+    convert_binary_to_json(binary_path, json_path)
+
+    assert load_tasks(json_path) == tasks
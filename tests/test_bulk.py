@@ -0,0 +1,107 @@
+import copy
+import pytest
+from src.task_store import TaskStore
+from src.tasks import (
+    bulk_add,
+    bulk_delete,
+    bulk_update,
+    get_overdue_tasks,
+    make_task_predicate,
+)
+
+tasks = [
+    {
+        "id": 1,
+        "title": "Task 1",
+        "category": "Work",
+        "completed": False,
+        "due_date": "2000-01-15",
+        "priority": "High",
+        "created_at": "1999-01-01 00:00:00",
+    },
+    {
+        "id": 2,
+        "title": "Task 2",
+        "category": "Personal",
+        "completed": True,
+        "due_date": "2000-02-25",
+        "priority": "High",
+        "created_at": "1999-06-01 00:00:00",
+    },
+    {
+        "id": 3,
+        "title": "Task 3",
+        "category": "Work",
+        "completed": True,
+        "due_date": "2000-03-10",
+        "priority": "Medium",
+        "created_at": "1999-12-01 00:00:00",
+    },
+    {
+        "id": 4,
+        "title": "Task 4",
+        "category": "Work",
+        "completed": False,
+        "due_date": "2030-04-18",
+        "priority": "Low",
+        "created_at": "1999-12-01 00:00:00",
+    },
+]
+
+
+@pytest.fixture(params=[list, TaskStore])
+def collection(request):
+    return request.param(copy.deepcopy(tasks))
+
+
+def test_bulk_add(collection):
+    created = bulk_add(
+        collection,
+        [
+            {"title": "New 1", "priority": "Low", "category": "Work", "due_date": "2000-01-01"},
+            {"title": "New 2", "description": "Second"},
+        ],
+    )
+
+    assert [task["id"] for task in created] == [5, 6]
+    assert created[1]["description"] == "Second"
+    assert not created[0]["completed"]
+    assert [task["id"] for task in collection] == [1, 2, 3, 4, 5, 6]
+    assert bulk_add(collection, []) == []
+
+
+def test_bulk_add_extends_list_in_place():
+    task_list = copy.deepcopy(tasks)
+    same_list = task_list
+    created = bulk_add(task_list, [{"title": "New"}])
+    assert same_list is task_list
+    assert task_list[-1] is created[0]
+    assert len(task_list) == 5
+
+
+def test_bulk_update_overdue_in_category(collection):
+    overdue_work = make_task_predicate(category="Work", completed=False, due_before="2001-01-01")
+
+    updated = bulk_update(collection, overdue_work, {"completed": True})
+
+    assert [task["id"] for task in updated] == [1]
+    assert [task["id"] for task in collection if task["completed"]] == [1, 2, 3]
+    assert [task["id"] for task in get_overdue_tasks(collection)] == []
+
+
+def test_bulk_delete_old_completed_tasks(collection):
+    old_completed = make_task_predicate(completed=True, created_before="1999-09-01 00:00:00")
+
+    removed = bulk_delete(collection, old_completed)
+
+    assert [task["id"] for task in removed] == [2]
+    assert [task["id"] for task in collection] == [1, 3, 4]
+    assert bulk_delete(collection, old_completed) == []
+
+
+def test_bulk_delete_keeps_list_identity():
+    task_list = copy.deepcopy(tasks)
+    same_list = task_list
+    bulk_delete(task_list, lambda task: task["priority"] == "High")
+    assert same_list is task_list
+    assert [task["id"] for task in task_list] == [3, 4]
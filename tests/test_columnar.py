@@ -0,0 +1,142 @@
+import pytest
+import numpy as np
+from datetime import datetime
+from unittest.mock import patch
+from src.columnar import ColumnarTasks
+from src.tasks import (
+    filter_tasks_by_priority,
+    filter_tasks_by_category,
+    filter_tasks_by_completion,
+    search_tasks,
+    get_overdue_tasks,
+    get_num_pages,
+    get_paginated_tasks,
+)
+
+task1 = {
+    "id": 1,
+    "title": "Task 1",
+    "category": "Work",
+    "completed": False,
+    "description": "Task 1 description important",
+    "due_date": "2000-01-15",
+    "priority": "High",
+}
+task2 = {
+    "id": 2,
+    "title": "Task 2 important",
+    "category": "Personal",
+    "completed": True,
+    "description": "Task 2 description",
+    "due_date": "2000-02-25",
+    "priority": "High",
+}
+task3 = {
+    "id": 3,
+    "title": "Task 3",
+    "category": "Personal",
+    "completed": False,
+    "description": "Task 3 description",
+    "due_date": "2000-03-10",
+    "priority": "Medium",
+}
+task4 = {
+    "id": 4,
+    "title": "Task 4 important",
+    "category": "Work",
+    "completed": True,
+    "description": "Task 4 description",
+    "due_date": "2000-04-18",
+    "priority": "High",
+}
+task5 = {
+    "id": 5,
+    "title": "Task 5",
+    "category": "School",
+    "completed": False,
+    "description": "Task 5 description",
+    "due_date": "2000-05-30",
+    "priority": "Low",
+}
+tasks = [task1, task2, task3, task4, task5]
+
+
+@pytest.fixture
+def columnar():
+    return ColumnarTasks.from_dicts(tasks)
+
+
+def test_round_trip(columnar):
+    assert len(columnar) == 5
+    assert columnar.to_dicts() == tasks
+    assert list(columnar) == tasks
+
+
+def test_round_trip_preserves_missing_and_extra_fields():
+    odd_tasks = [
+        {"id": 1},
+        {"id": 2, "title": None, "due_date": None, "created_at": "2000-01-01 00:00:00"},
+        {"id": 3, "due_date": "someday", "completed": True, "category": None},
+    ]
+    assert ColumnarTasks.from_dicts(odd_tasks).to_dicts() == odd_tasks
+
+
+def test_columns_are_coded_arrays(columnar):
+    assert columnar.categories.dtype == np.int32
+    assert columnar.due_dates.dtype == np.dtype("datetime64[D]")
+    assert columnar.category_values == ["Work", "Personal", "School"]
+    assert columnar.value_counts("priority") == {"High": 3, "Medium": 1, "Low": 1}
+
+
+@pytest.mark.parametrize("priority", ["High", "Medium", "Low", "invalid"])
+def test_filter_tasks_by_priority(columnar, priority):
+    assert filter_tasks_by_priority(columnar, priority).to_dicts() == filter_tasks_by_priority(
+        tasks, priority
+    )
+
+
+@pytest.mark.parametrize("category", ["Work", "Personal", "School", "Fitness"])
+def test_filter_tasks_by_category(columnar, category):
+    assert filter_tasks_by_category(columnar, category).to_dicts() == filter_tasks_by_category(
+        tasks, category
+    )
+
+
+@pytest.mark.parametrize("completed", [True, False])
+def test_filter_tasks_by_completion(columnar, completed):
+    assert filter_tasks_by_completion(
+        columnar, completed
+    ).to_dicts() == filter_tasks_by_completion(tasks, completed)
+
+
+@pytest.mark.parametrize("query", ["important", "Task 1", "invalid"])
+def test_search_tasks(columnar, query):
+    assert search_tasks(columnar, query).to_dicts() == search_tasks(tasks, query)
+
+
+@pytest.mark.parametrize("date", ["2001-01-01", "2000-01-01", "2000-03-01"])
+def test_get_overdue_tasks(columnar, date):
+    with patch("src.tasks.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime.strptime(date, "%Y-%m-%d")
+        assert get_overdue_tasks(columnar).to_dicts() == get_overdue_tasks(tasks)
+
+
+def test_combined_mask_and_count(columnar):
+    mask = columnar.mask(category="Work", priority="High", completed=False)
+    assert columnar.to_dicts(mask) == [task1]
+    assert columnar.count(priority="High", overdue_on="2000-03-01") == 1
+
+
+def test_filters_return_columnar_tasks(columnar):
+    work = filter_tasks_by_category(columnar, "Work")
+    assert isinstance(work, ColumnarTasks)
+    assert work.category_values is columnar.category_values
+    assert len(work) == 2 and work.count(completed=True) == 1
+    # Filters can be chained without building task dictionaries in between
+    assert list(filter_tasks_by_priority(work, "High")) == [task1, task4]
+    assert get_paginated_tasks(2, work, 1) == [task4]
+
+
+def test_pagination(columnar):
+    assert get_num_pages(columnar, 2) == 3
+    assert get_paginated_tasks(2, columnar, 2) == [task3, task4]
@@ -0,0 +1,131 @@
+import copy
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from src.task_store import TaskStore
+from src.tasks import (
+    get_overdue_tasks,
+    get_tasks_due_between,
+    get_next_due_tasks,
+)
+
+task1 = {
+    "id": 1,
+    "title": "Task 1",
+    "category": "Work",
+    "completed": False,
+    "description": "Task 1 description important",
+    "due_date": "2000-01-15",
+    "priority": "High",
+}
+task2 = {
+    "id": 2,
+    "title": "Task 2 important",
+    "category": "Personal",
+    "completed": True,
+    "description": "Task 2 description",
+    "due_date": "2000-02-25",
+    "priority": "High",
+}
+task3 = {
+    "id": 3,
+    "title": "Task 3",
+    "category": "Personal",
+    "completed": False,
+    "description": "Task 3 description",
+    "due_date": "2000-03-10",
+    "priority": "Medium",
+}
+task4 = {
+    "id": 4,
+    "title": "Task 4 important",
+    "category": "Work",
+    "completed": True,
+    "description": "Task 4 description",
+    "due_date": "2000-04-18",
+    "priority": "High",
+}
+task5 = {
+    "id": 5,
+    "title": "Task 5",
+    "category": "School",
+    "completed": False,
+    "description": "Task 5 description",
+    "due_date": "2000-05-30",
+    "priority": "Low",
+}
+tasks = [task1, task2, task3, task4, task5]
+
+
+@pytest.fixture
+def store():
+    return TaskStore(copy.deepcopy(tasks))
+
+
+@pytest.fixture
+def today():
+    def set_today(date):
+        mock_datetime.now.return_value = datetime.strptime(date, "%Y-%m-%d")
+
+    with patch("src.tasks.datetime") as mock_datetime:
+        yield set_today
+
+
+@pytest.mark.parametrize(
+    "date, expected",
+    [
+        ("2001-01-01", [task1, task3, task5]),
+        ("2000-01-01", []),
+        ("2000-03-01", [task1]),
+        ("2000-03-10", [task1]),
+        ("2000-03-11", [task1, task3]),
+    ],
+)
+def test_get_overdue_tasks(store, today, date, expected):
+    today(date)
+    assert get_overdue_tasks(store) == expected
+    assert get_overdue_tasks(tasks) == expected
+
+
+@pytest.mark.parametrize(
+    "start, end, completed, expected",
+    [
+        ("2000-01-01", "2000-12-31", None, [task1, task2, task3, task4, task5]),
+        ("2000-02-25", "2000-04-18", None, [task2, task3, task4]),
+        ("2000-02-25", "2000-04-18", False, [task3]),
+        ("2000-02-25", "2000-04-18", True, [task2, task4]),
+        ("2000-04-19", "2000-05-29", None, []),
+    ],
+)
+def test_get_tasks_due_between(store, start, end, completed, expected):
+    assert get_tasks_due_between(store, start, end, completed) == expected
+    assert get_tasks_due_between(tasks, start, end, completed) == expected
+
+
+@pytest.mark.parametrize(
+    "date, count, expected",
+    [
+        ("2000-01-01", 2, [task1, task3]),
+        ("2000-03-10", 10, [task3, task5]),
+        ("2000-06-01", 3, []),
+        ("2000-01-01", 0, []),
+    ],
+)
+def test_get_next_due_tasks(store, today, date, count, expected):
+    today(date)
+    assert get_next_due_tasks(store, count) == expected
+    assert get_next_due_tasks(tasks, count) == expected
+
+
+def test_due_index_tracks_completion_and_rescheduling(store, today):
+    today("2000-04-01")
+    store.update(1, {"completed": True})
+    store.update(5, {"due_date": "2000-02-01"})
+    store.update(4, {"completed": False})
+    assert [task["id"] for task in get_overdue_tasks(store)] == [5, 3]
+    assert [task["id"] for task in get_next_due_tasks(store, 5)] == [4]
+
+    store.delete(5)
+    store.add({"id": 6, "completed": False, "due_date": "2000-04-01"})
+    assert [task["id"] for task in get_overdue_tasks(store)] == [3]
+    assert [task["id"] for task in get_next_due_tasks(store, 5)] == [6, 4]
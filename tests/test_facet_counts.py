@@ -0,0 +1,124 @@
+import copy
+import random
+import pytest
+from src.facet_counts import FacetCounts
+from src.task_store import TaskStore
+from src.tasks import get_facet_counts, get_num_pages
+
+CATEGORIES = ["Work", "Personal", "School"]
+PRIORITIES = ["High", "Medium", "Low"]
+DATES = ["2000-01-15", "2000-02-25", "2000-03-10", "", None]
+
+tasks = [
+    {"id": 1, "category": "Work", "priority": "High", "completed": False, "due_date": "2000-01-15"},
+    {"id": 2, "category": "Personal", "priority": "High", "completed": True, "due_date": "2000-02-25"},
+    {"id": 3, "category": "Personal", "priority": "Medium", "completed": False, "due_date": "2000-03-10"},
+    {"id": 4, "category": "Work", "priority": "High", "completed": True, "due_date": "2000-04-18"},
+    {"id": 5, "category": "Work", "priority": "Low", "completed": False, "due_date": "2000-05-30"},
+]
+
+
+def count_by_scan(tasks, **criteria):
+    return sum(all(task.get(field) == value for field, value in criteria.items()) for task in tasks)
+
+
+def overdue_by_scan(tasks, today, **criteria):
+    return sum(
+        not task.get("completed", False)
+        and (task.get("due_date") or "") < today
+        and all(task.get(field) == value for field, value in criteria.items())
+        for task in tasks
+    )
+
+
+@pytest.mark.parametrize(
+    "criteria, expected",
+    [
+        ({}, 5),
+        ({"category": "Work"}, 3),
+        ({"category": "Work", "completed": False}, 2),
+        ({"priority": "High", "completed": True}, 2),
+        ({"category": "School"}, 0),
+    ],
+)
+def test_count(criteria, expected):
+    assert FacetCounts(tasks).count(**criteria) == expected
+
+
+def test_overdue_and_summary():
+    facets = FacetCounts(tasks)
+    assert facets.overdue("2000-03-01") == 1
+    assert facets.overdue("2001-01-01", category="Work") == 2
+    assert facets.overdue("2001-01-01", category="Work", priority="Low") == 1
+    assert facets.summary("category", "2000-04-01") == {
+        "Work": {"total": 3, "open": 2, "overdue": 1},
+        "Personal": {"total": 2, "open": 1, "overdue": 1},
+    }
+    assert facets.values("priority") == ["High", "Medium", "Low"]
+    with pytest.raises(ValueError):
+        facets.overdue("2000-01-01", completed=True)
+
+
+def test_store_keeps_counts_up_to_date():
+    rng = random.Random(0)
+    store = TaskStore(copy.deepcopy(tasks))
+    store.facets.overdue("2000-03-01")  # Counted from here on as tasks change
+    for step in range(300):
+        action = rng.random()
+        task_ids = list(store._tasks)
+        if action < 0.4 or not task_ids:
+            store.add(
+                {
+                    "id": store.next_id,
+                    "category": rng.choice(CATEGORIES),
+                    "priority": rng.choice(PRIORITIES),
+                    "completed": rng.random() < 0.3,
+                    "due_date": rng.choice(DATES),
+                }
+            )
+        elif action < 0.7:
+            field = rng.choice(["category", "priority", "completed", "due_date", "title"])
+            value = {
+                "category": rng.choice(CATEGORIES),
+                "priority": rng.choice(PRIORITIES),
+                "completed": rng.random() < 0.5,
+                "due_date": rng.choice(DATES),
+                "title": f"Step {step}",
+            }[field]
+            store.update(rng.choice(task_ids), {field: value})
+        elif action < 0.8:
+            store.update_many(rng.sample(task_ids, min(3, len(task_ids))), {"completed": True})
+        elif action < 0.9:
+            store.delete_many(rng.sample(task_ids, min(2, len(task_ids))))
+        else:
+            store.delete(rng.choice(task_ids))
+
+        current = store.to_list()
+        category = rng.choice(CATEGORIES)
+        assert store.facets.count(category=category, completed=False) == count_by_scan(
+            current, category=category, completed=False
+        )
+        assert store.facets.overdue("2000-03-01", category=category) == overdue_by_scan(
+            current, "2000-03-01", category=category
+        )
+    assert sorted(store.facets.values("category")) == sorted({task["category"] for task in current})
+    assert store.facets.overdue("2000-02-01") == overdue_by_scan(current, "2000-02-01")
+    assert len(store.facets) == len(store)
+
+
+@pytest.mark.parametrize("as_store", [False, True])
+def test_get_num_pages_from_counts(as_store):
+    collection = TaskStore(copy.deepcopy(tasks)) if as_store else copy.deepcopy(tasks)
+    assert get_num_pages(collection, 2) == 3
+    assert get_num_pages(collection, 2, category="Work", completed=False) == 1
+    assert get_num_pages(get_facet_counts(collection), 2, priority="High") == 2
+    if as_store:
+        assert get_facet_counts(collection) is collection.facets
+
+
+def test_facet_labeller():
+    from src.app import facet_labeller
+
+    label = facet_labeller(FacetCounts(tasks), "category", "2000-04-01")
+    assert label("Work") == "Work (2 open, 1 overdue)"
+    assert label("All") == "All"
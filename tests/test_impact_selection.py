@@ -0,0 +1,146 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from src.impact_selection import (
+    DEFAULT_CACHE_FILE,
+    SourceHashes,
+    hash_source_file,
+    is_reusable,
+    make_record,
+)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE = '''
+LIMIT = 10
+
+
+def add(a, b):
+    return a + b
+
+
+class Counter:
+    @staticmethod
+    def double(value):
+        return value * 2
+'''
+
+TESTS = '''
+from lib.calc import Counter, add
+
+
+def test_add():
+    assert add(1, 2) == 3
+
+
+def test_double():
+    assert Counter.double(2) == 4
+'''
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(textwrap.dedent(text))
+
+
+def test_hash_source_file(tmp_path):
+    file_path = tmp_path / "calc.py"
+    write(file_path, SOURCE)
+    hashes = hash_source_file(str(file_path))
+    assert set(hashes["functions"]) == {"add", "Counter.double"}
+    assert [line[2] for line in hashes["lines"]] == ["add", "Counter.double"]
+    assert hashes["lines"][1][:2] == (10, 12)  # From the decorator to the last line
+
+    write(file_path, SOURCE.replace("a + b", "b + a") + "\n# A comment\n")
+    changed = hash_source_file(str(file_path))
+    assert changed["module"] == hashes["module"]
+    assert changed["functions"]["Counter.double"] == hashes["functions"]["Counter.double"]
+    assert changed["functions"]["add"] != hashes["functions"]["add"]
+
+    write(file_path, SOURCE.replace("LIMIT = 10", "LIMIT = 20"))
+    assert hash_source_file(str(file_path))["module"] != hashes["module"]
+    assert hash_source_file(str(tmp_path / "missing.py")) is None
+
+
+def test_is_reusable(tmp_path):
+    write(tmp_path / "lib" / "calc.py", SOURCE)
+    write(tmp_path / "tests" / "test_calc.py", TESTS)
+    nodeid = "tests/test_calc.py::test_add"
+    record = make_record(
+        nodeid, "passed", {"lib/calc.py": {6}}, SourceHashes(str(tmp_path), str(tmp_path / "tests"))
+    )
+    assert list(record["sources"]["lib/calc.py"]["functions"]) == ["add"]
+    assert is_reusable(record, SourceHashes(str(tmp_path), str(tmp_path / "tests")))
+    assert not is_reusable(
+        {**record, "outcome": "failed"}, SourceHashes(str(tmp_path), str(tmp_path / "tests"))
+    )
+
+    # Changing code the test didn't run keeps its result
+    write(tmp_path / "lib" / "calc.py", SOURCE.replace("value * 2", "2 * value"))
+    assert is_reusable(record, SourceHashes(str(tmp_path), str(tmp_path / "tests")))
+    write(tmp_path / "lib" / "calc.py", SOURCE.replace("a + b", "b + a"))
+    assert not is_reusable(record, SourceHashes(str(tmp_path), str(tmp_path / "tests")))
+
+    write(tmp_path / "lib" / "calc.py", SOURCE)
+    write(tmp_path / "tests" / "conftest.py", "")
+    assert not is_reusable(record, SourceHashes(str(tmp_path), str(tmp_path / "tests")))
+
+
+def test_tests_without_coverage_always_run(tmp_path):
+    # e.g. a test running the code under test in a subprocess
+    write(tmp_path / "lib" / "calc.py", SOURCE)
+    write(tmp_path / "tests" / "test_calc.py", TESTS)
+    hashes = SourceHashes(str(tmp_path), str(tmp_path / "tests"))
+    record = make_record("tests/test_calc.py::test_add", "passed", {}, hashes)
+    assert record["sources"] == {}
+    assert not is_reusable(record, hashes)
+
+
+def run_pytest(project_dir, *args):
+    return subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pytest",
+            "-p",
+            "src.impact_selection",
+            "--cov",
+            "lib",
+            "--cov-context=test",
+            "-p",
+            "no:cacheprovider",
+            "-v",
+            *args,
+        ],
+        cwd=project_dir,
+        env={**os.environ, "PYTHONPATH": ROOT_DIR},
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_affected_runs_only_changed_tests(tmp_path):
+    write(tmp_path / "lib" / "__init__.py", "")
+    write(tmp_path / "lib" / "calc.py", SOURCE)
+    write(tmp_path / "tests" / "test_calc.py", TESTS)
+
+    result = run_pytest(tmp_path, "--affected")
+    assert result.returncode == 0, result.stdout
+    assert "2 passed" in result.stdout
+    with open(tmp_path / DEFAULT_CACHE_FILE) as f:
+        assert set(json.load(f)["tests"]) == {
+            "tests/test_calc.py::test_add",
+            "tests/test_calc.py::test_double",
+        }
+
+    write(tmp_path / "lib" / "calc.py", SOURCE.replace("value * 2", "2 * value"))
+    result = run_pytest(tmp_path, "--affected")
+    assert result.returncode == 0, result.stdout
+    assert "test_double PASSED" in result.stdout
+    assert "test_add" not in result.stdout
+    assert "Reused 1 cached passing results" in result.stdout
+
+    # A full run is still available
+    assert "2 passed" in run_pytest(tmp_path).stdout
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# Import-time budgets in seconds, measured in a fresh interpreter. Wall-clock
+# timings depend on the machine and its load, so they are only checked when
+# this environment variable is set, e.g. IMPORT_TIME_BUDGETS=1 on a quiet machine
+IMPORT_BUDGETS_ENV_VAR = "IMPORT_TIME_BUDGETS"
+
+IMPORT_BUDGETS = {
+    "src.tasks": 0.25,
+    "src.app": 1.5,
+}
+
+# Heavy dependencies that must only be imported on first use
+LAZY_MODULES = ["pandas", "numpy", "sqlite3"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(name for name in {lazy_modules!r} if name in sys.modules))
+"""
+
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter.
+
+    Returns:
+        tuple: Import time in seconds, and the lazy modules that got imported with it
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT.format(module=module, lazy_modules=LAZY_MODULES)],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+        check=True,
+    )
+    seconds, loaded = result.stdout.split("\n")[:2]
+    return float(seconds), [name for name in loaded.split(",") if name]
+
+
+@pytest.mark.skipif(
+    not os.environ.get(IMPORT_BUDGETS_ENV_VAR), reason=f"set {IMPORT_BUDGETS_ENV_VAR}=1 to check"
+)
+@pytest.mark.parametrize("module, budget", IMPORT_BUDGETS.items())
+def test_import_time_budget(module, budget):
+    # Best of three runs, so a single slow run on a busy machine doesn't fail the budget
+    seconds = min(measure_import(module)[0] for _ in range(3))
+    assert seconds < budget, f"importing {module} took {seconds:.3f}s, budget is {budget}s"
+
+
+@pytest.mark.parametrize("module", IMPORT_BUDGETS)
+def test_heavy_dependencies_are_lazy(module):
+    assert measure_import(module)[1] == []
@@ -0,0 +1,108 @@
+import os
+import pytest
+from unittest.mock import patch
+from src.tasks import (
+    load_tasks,
+    save_tasks,
+    delete_tasks,
+    get_journal_path,
+)
+from src.journal import (
+    journal_add,
+    journal_update,
+    journal_delete,
+    compact_journal,
+)
+
+
+@pytest.fixture
+def task_file(tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks([{"id": 1, "title": "Task 1", "completed": False}], file_path)
+    return file_path
+
+
+def test_journal_mutations_are_replayed(task_file):
+    journal_add({"id": 2, "title": "Task 2", "completed": False}, task_file)
+    journal_update(1, {"completed": True}, task_file)
+    journal_delete(2, task_file)
+    journal_add({"id": 3, "title": "Task 3", "completed": False}, task_file)
+
+    assert load_tasks(task_file) == [
+        {"id": 1, "title": "Task 1", "completed": True},
+        {"id": 3, "title": "Task 3", "completed": False},
+    ]
+
+
+def test_journal_does_not_rewrite_snapshot(task_file):
+    with open(task_file) as f:
+        snapshot = f.read()
+    journal_update(1, {"completed": True}, task_file)
+    with open(task_file) as f:
+        assert f.read() == snapshot
+    assert os.path.exists(get_journal_path(task_file))
+
+
+def test_journal_replay_is_idempotent(task_file):
+    journal_add({"id": 2, "title": "Task 2"}, task_file)
+    journal_add({"id": 2, "title": "Task 2 again"}, task_file)
+    assert load_tasks(task_file) == [
+        {"id": 1, "title": "Task 1", "completed": False},
+        {"id": 2, "title": "Task 2 again"},
+    ]
+
+
+def test_journal_ignores_torn_final_record(task_file, capfd):
+    journal_update(1, {"completed": True}, task_file)
+    with open(get_journal_path(task_file), "a") as f:
+        f.write('{"op": "delete", "id"')
+
+    assert load_tasks(task_file) == [{"id": 1, "title": "Task 1", "completed": True}]
+    assert "is invalid. Ignoring it." in capfd.readouterr().out
+
+
+def test_journal_appends_after_torn_final_record(task_file):
+    with open(get_journal_path(task_file), "a") as f:
+        f.write('{"op": "delete", "id"')
+    journal_add({"id": 2, "title": "Task 2", "completed": False}, task_file)
+    journal_update(2, {"title": "Renamed"}, task_file)
+
+    assert load_tasks(task_file) == [
+        {"id": 1, "title": "Task 1", "completed": False},
+        {"id": 2, "title": "Renamed", "completed": False},
+    ]
+
+
+def test_journal_rejects_corrupt_record_before_committed_ones(task_file):
+    with open(get_journal_path(task_file), "a") as f:
+        f.write('{"op": "delete", "id"\n{"op": "delete", "id": 1}\n')
+    with pytest.raises(ValueError, match="line 1 is corrupt"):
+        load_tasks(task_file)
+
+
+def test_compact_journal(task_file):
+    journal_update(1, {"title": "Renamed"}, task_file)
+    compact_journal(task_file)
+
+    assert not os.path.exists(get_journal_path(task_file))
+    assert load_tasks(task_file) == [{"id": 1, "title": "Renamed", "completed": False}]
+
+
+def test_journal_compacts_past_threshold(task_file):
+    with patch("src.journal.JOURNAL_COMPACT_THRESHOLD", 1):
+        journal_update(1, {"completed": True}, task_file)
+
+    assert not os.path.exists(get_journal_path(task_file))
+    assert load_tasks(task_file) == [{"id": 1, "title": "Task 1", "completed": True}]
+
+
+def test_save_and_delete_discard_journal(task_file):
+    journal_add({"id": 2, "title": "Task 2"}, task_file)
+    save_tasks([], task_file)
+    assert not os.path.exists(get_journal_path(task_file))
+    assert load_tasks(task_file) == []
+
+    journal_add({"id": 2, "title": "Task 2"}, task_file)
+    delete_tasks(task_file)
+    assert not os.path.exists(get_journal_path(task_file))
+    assert load_tasks(task_file) == []
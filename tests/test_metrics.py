@@ -0,0 +1,198 @@
+import os
+import pstats
+import pytest
+import urllib.request
+from unittest.mock import patch
+from src import metrics
+from src.tasks import (
+    add_task,
+    get_cached_csv_bytes,
+    iter_tasks,
+    load_tasks,
+    save_tasks,
+)
+
+
+@pytest.fixture
+def tasks():
+    return [
+        {
+            "id": 1,
+            "title": "Task 1",
+            "description": "Description 1",
+            "priority": "High",
+            "category": "Work",
+            "due_date": "2024-01-01",
+            "completed": False,
+        },
+        {
+            "id": 2,
+            "title": "Task 2",
+            "description": "Description 2",
+            "priority": "Low",
+            "category": "Personal",
+            "due_date": "2024-02-01",
+            "completed": True,
+        },
+    ]
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_records_nothing(tasks):
+    metrics.reset()
+    assert not metrics.is_enabled()
+    add_task(tasks, "Task 3", "Description 3", "Low", "Work", "2024-03-01")
+    assert metrics.get_metrics() == {"functions": {}, "caches": {}}
+
+
+def test_records_calls_and_sizes(enabled, tasks, tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks(tasks, file_path)
+    assert load_tasks(file_path) == tasks
+    assert list(iter_tasks(file_path)) == tasks
+    with pytest.raises(TypeError):
+        add_task(None, "Task 3", "Description 3", "Low", "Work", "2024-03-01")
+
+    functions = metrics.get_metrics()["functions"]
+    size = os.path.getsize(file_path)
+    assert functions["save_tasks"]["calls"] == 1
+    assert functions["save_tasks"]["tasks"] == 2
+    assert functions["save_tasks"]["written_file_size"] == size
+    assert functions["load_tasks"]["read_file_size"] == size
+    assert functions["iter_tasks"]["calls"] == 1
+    assert functions["iter_tasks"]["read_file_size"] == size
+    assert functions["add_task"]["errors"] == 1
+    assert sum(functions["load_tasks"]["buckets"]) == functions["load_tasks"]["calls"]
+
+
+def test_file_sizes_include_journal_and_meta(enabled, tasks, tmp_path):
+    from src.journal import journal_update
+    from src.tasks import atomic_open, get_journal_path, get_meta_path, load_meta
+
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks(tasks, file_path)
+    journal_update(1, {"completed": True}, file_path)
+    metrics.reset()
+    load_tasks(file_path)
+    load_meta(file_path)
+
+    functions = metrics.get_metrics()["functions"]
+    journaled_size = os.path.getsize(file_path) + os.path.getsize(get_journal_path(file_path))
+    assert functions["load_tasks"]["read_file_size"] == journaled_size
+    assert functions["load_meta"]["read_file_size"] == os.path.getsize(get_meta_path(file_path))
+    # Context manager factories return before doing any work, so aren't timed
+    assert "file_lock" not in functions and "atomic_open" not in functions
+    with atomic_open(str(tmp_path / "other.json")) as f:
+        f.write("[]")
+    assert "atomic_open" not in metrics.get_metrics()["functions"]
+
+
+def test_cache_hit_rate(enabled, tasks):
+    for _ in range(3):
+        csv_bytes = get_cached_csv_bytes(tasks, ("test_cache_hit_rate", 1))
+
+    assert metrics.get_metrics()["caches"]["csv_export"] == {
+        "hits": 2,
+        "misses": 1,
+        "hit_rate": 2 / 3,
+    }
+    assert metrics.get_metrics()["functions"]["export_to_csv_bytes"]["bytes_returned"] == len(
+        csv_bytes
+    )
+
+
+def test_estimate_quantile():
+    buckets = [0] * len(metrics.LATENCY_BUCKETS)
+    assert metrics.estimate_quantile(buckets, 0.95) == 0.0
+    buckets[0] = 90
+    buckets[3] = 10
+    assert metrics.estimate_quantile(buckets, 0.5) == metrics.LATENCY_BUCKETS[0]
+    assert metrics.estimate_quantile(buckets, 0.95) == metrics.LATENCY_BUCKETS[3]
+
+
+def test_prometheus_export(enabled, tmp_path):
+    metrics.record_call("load_tasks", 0.002, tasks=5, read_file_size=100)
+    metrics.record_call("load_tasks", 2.0, error=True)
+    metrics.record_cache("tasks", True)
+
+    text = metrics.export_prometheus()
+    assert 'tasks_calls_total{function="load_tasks"} 2' in text
+    assert 'tasks_errors_total{function="load_tasks"} 1' in text
+    assert 'tasks_call_seconds_bucket{function="load_tasks",le="0.001"} 0' in text
+    assert 'tasks_call_seconds_bucket{function="load_tasks",le="0.005"} 1' in text
+    assert 'tasks_call_seconds_bucket{function="load_tasks",le="+Inf"} 2' in text
+    assert 'tasks_call_seconds_count{function="load_tasks"} 2' in text
+    assert 'tasks_read_file_size_bytes_total{function="load_tasks"} 100' in text
+    assert 'tasks_cache_requests_total{cache="tasks",result="hit"} 1' in text
+    assert 'tasks_cache_requests_total{cache="tasks",result="miss"} 0' in text
+
+    file_path = str(tmp_path / "metrics.prom")
+    metrics.write_prometheus(file_path)
+    with open(file_path) as f:
+        assert f.read() == text
+
+    server = metrics.serve_prometheus(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.read().decode("utf-8") == metrics.export_prometheus()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_record_rerun(enabled, tmp_path):
+    file_path = str(tmp_path / "metrics.prom")
+
+    @metrics.record_rerun()
+    def rerun():
+        pass
+
+    with patch.dict(os.environ, {metrics.METRICS_FILE_ENV_VAR: file_path}):
+        rerun()
+        rerun()
+
+    assert metrics.get_metrics()["functions"][metrics.RERUN_METRIC]["calls"] == 2
+    with open(file_path) as f:
+        assert f'tasks_calls_total{{function="{metrics.RERUN_METRIC}"}} 2' in f.read()
+
+
+def test_profile_next_slow_rerun(tmp_path):
+    dump_path = str(tmp_path / "rerun.prof")
+    metrics.profile_next_slow_rerun(dump_path, min_seconds=10)
+    with metrics.record_rerun():
+        pass
+    # Too fast to be kept, so the next rerun is profiled instead
+    assert metrics.is_profiling()
+    assert not os.path.exists(dump_path)
+
+    metrics.profile_next_slow_rerun(dump_path)
+    with metrics.record_rerun():
+        sorted(range(1000))
+    assert not metrics.is_profiling()
+    assert pstats.Stats(dump_path).total_calls > 0
+
+
+def test_display_metrics(enabled):
+    metrics.record_call("load_tasks", 0.002)
+    metrics.record_cache("tasks", False)
+    with patch("src.app.st") as mock_streamlit:
+        from src.app import display_metrics
+
+        display_metrics()
+
+    rows = mock_streamlit.sidebar.dataframe.call_args[0][0]
+    assert rows[0]["Function"] == "load_tasks"
+    assert rows[0]["p95 (ms)"] == 5.0
+    mock_streamlit.sidebar.caption.assert_called_with("tasks cache: 0% hits of 1")
+    assert metrics.is_profiling()
+    metrics.cancel_profiling()
+    assert not metrics.is_profiling()
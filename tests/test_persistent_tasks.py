@@ -0,0 +1,184 @@
+import random
+import pytest
+from unittest.mock import patch
+from src.persistent_tasks import PersistentTasks, TaskHistory
+from src.task_store import TaskStore
+from src.tasks import add_task, delete_task, generate_unique_id, get_task, update_task
+
+
+def make_tasks(count):
+    return [
+        {"id": task_id, "title": f"Task {task_id}", "completed": False}
+        for task_id in range(1, count + 1)
+    ]
+
+
+def test_versions_are_independent():
+    tasks = PersistentTasks(make_tasks(3))
+    added = tasks.set({"id": 10, "title": "Task 10"})
+    updated = added.update(2, {"completed": True})
+    deleted = updated.delete(1)
+
+    assert [task["id"] for task in tasks] == [1, 2, 3]
+    assert [task["id"] for task in deleted] == [2, 3, 10]
+    assert len(tasks) == 3 and len(added) == 4 and len(deleted) == 3
+    assert tasks.get(2)["completed"] is False
+    assert updated.get(2)["completed"] is True
+    assert 1 in updated and 1 not in deleted
+    assert deleted.next_id == 11
+    assert deleted.delete(99) is deleted
+    assert deleted.update(99, {"title": "Missing"}) is deleted
+    assert tasks.get(-1) is None and tasks.get(10**9) is None
+    with pytest.raises(ValueError):
+        tasks.set({"id": "1"})
+
+
+def test_changes_share_structure():
+    tasks = PersistentTasks(make_tasks(10000))
+    updated = tasks.update(5000, {"completed": True})
+
+    # Only the path to the changed task is copied
+    shared = sum(
+        child is not None and child is other for child, other in zip(tasks._root, updated._root)
+    )
+    assert shared == sum(child is not None for child in tasks._root) - 1
+    assert list(updated.diff(tasks)) == [(5000, updated.get(5000), tasks.get(5000))]
+
+
+def test_matches_dict_model():
+    rng = random.Random(0)
+    model = {}
+    tasks = PersistentTasks()
+    versions = []
+    for step in range(2000):
+        task_id = rng.choice([rng.randrange(64), rng.randrange(100000)])
+        if rng.random() < 0.3:
+            model.pop(task_id, None)
+            tasks = tasks.delete(task_id)
+        else:
+            model[task_id] = {"id": task_id, "step": step}
+            tasks = tasks.set(model[task_id])
+        versions.append((tasks, dict(model)))
+
+    assert [task["id"] for task in tasks] == sorted(model)
+    assert len(tasks) == len(model)
+    assert all(tasks.get(task_id) is task for task_id, task in model.items())
+    # Every older version still holds its own tasks, and diffs between any two agree
+    for older, older_model in versions[::250]:
+        assert {task["id"]: task for task in older} == older_model
+        expected = {
+            task_id
+            for task_id in set(model) | set(older_model)
+            if model.get(task_id) is not older_model.get(task_id)
+        }
+        assert {task_id for task_id, _, _ in tasks.diff(older)} == expected
+    rebuilt = PersistentTasks(model.values())
+    assert list(rebuilt) == list(tasks)
+
+
+def test_history_undo_redo():
+    history = TaskHistory(PersistentTasks(make_tasks(2)), limit=2)
+    assert not history.can_undo() and not history.can_redo()
+    history.push(history.current.update(1, {"completed": True}))
+    history.push(history.current.delete(2))
+
+    assert history.undo() == [(2, {"id": 2, "title": "Task 2", "completed": False}, None)]
+    (task_id, restored, undone), = history.undo()
+    assert (task_id, restored["completed"], undone["completed"]) == (1, False, True)
+    assert history.undo() == []
+    assert [task_id for task_id, _, _ in history.redo()] == [1]
+    assert history.can_redo()
+
+    # A new change discards the undone versions
+    history.push(history.current.set({"id": 3, "title": "Task 3"}))
+    assert not history.can_redo()
+    history.push(history.current.delete(3))
+    history.undo()
+    history.undo()
+    assert not history.can_undo()  # Only the last two steps are kept
+    assert history.current.get(1)["completed"] is True
+
+
+def test_add_task_to_persistent_tasks():
+    tasks = PersistentTasks(make_tasks(2))
+    added = add_task(tasks, "Task 3", "Description 3", "High", "Work", "2024-01-01")
+    assert len(tasks) == 2
+    assert get_task(added, 3)["title"] == "Task 3"
+    assert generate_unique_id(added) == 4
+
+
+def test_update_task_in_persistent_tasks():
+    tasks = PersistentTasks(make_tasks(2))
+    history = TaskHistory(tasks)
+    updated = update_task(tasks, 1, {"completed": True})
+    history.push(updated)
+
+    assert isinstance(updated, PersistentTasks)
+    assert get_task(updated, 1)["completed"] is True
+    # The earlier version, and the history holding it, keep the original task
+    assert get_task(tasks, 1)["completed"] is False
+    assert history.undo() == [(1, tasks.get(1), updated.get(1))]
+    assert update_task(tasks, 99, {"completed": True}) is tasks
+
+
+def test_delete_task_from_persistent_tasks():
+    tasks = PersistentTasks(make_tasks(2))
+    deleted = delete_task(tasks, 2)
+
+    assert [task["id"] for task in deleted] == [1]
+    assert [task["id"] for task in tasks] == [1, 2]
+    assert delete_task(tasks, 99) is tasks
+
+
+def test_apply_history_step():
+    store = TaskStore(make_tasks(3))
+    with patch("src.app.st") as mock_streamlit:
+        mock_streamlit.session_state = {}
+        from src import app
+
+        history = app.get_task_history(store)
+        assert app.get_task_history(store) is history
+        assert history.current is store.snapshot()
+        with patch("src.app.journal_update"), patch("src.app.journal_delete"), patch(
+            "src.app.journal_add"
+        ) as mock_journal_add:
+            previous = store.snapshot()
+            app.update_task(store, 1, {"completed": True, "tags": ["new"]})
+            app.delete_task(store, 2)
+            app.record_history(history, previous, store)
+            store.update(3, {"title": "Changed elsewhere"})  # Not part of the step
+
+            app.apply_history_step(store, history.undo(), writer=None)
+            # Replaced whole, so fields the step added are gone
+            assert store.get(1) == {"id": 1, "title": "Task 1", "completed": False}
+            assert store.get(2) == {"id": 2, "title": "Task 2", "completed": False}
+            assert store.get(3)["title"] == "Changed elsewhere"
+            mock_journal_add.assert_any_call(store.get(2), writer=None)
+
+            app.apply_history_step(store, history.redo(), writer=None)
+            assert store.get(1)["tags"] == ["new"]
+            assert 2 not in store
+
+            # Tasks changed again since the step are left alone
+            store.update(1, {"title": "Renamed elsewhere"})
+            app.apply_history_step(store, history.undo(), writer=None)
+            assert store.get(1)["title"] == "Renamed elsewhere"
+            assert store.get(2) == {"id": 2, "title": "Task 2", "completed": False}
+        # Changes outside the session don't restart its history
+        assert app.get_task_history(store) is history
+
+
+def test_store_snapshot_shares_unchanged_tasks():
+    store = TaskStore(make_tasks(100))
+    snapshot = store.snapshot()
+    assert store.snapshot() is snapshot
+    assert list(snapshot) == store.to_list()
+
+    store.update(5, {"completed": True})
+    store.delete(6)
+    store.add({"id": 101, "title": "Task 101"})
+    updated = store.snapshot()
+    assert snapshot.get(5)["completed"] is False  # Earlier snapshots never change
+    assert sorted(task_id for task_id, _, _ in updated.diff(snapshot)) == [5, 6, 101]
+    assert list(updated) == store.to_list()
+    assert updated.get(5) is not store.get(5)  # Copied, as the store changes tasks in place
@@ -0,0 +1,199 @@
+import copy
+import pytest
+from src.task_store import TaskStore
+from src.tasks import query_tasks, count_tasks, get_tasks_after, get_num_pages
+
+task1 = {
+    "id": 1,
+    "title": "Task 1",
+    "category": "Work",
+    "completed": False,
+    "description": "Task 1 description important",
+    "due_date": "2000-01-15",
+    "priority": "High",
+}
+task2 = {
+    "id": 2,
+    "title": "Task 2 important",
+    "category": "Personal",
+    "completed": True,
+    "description": "Task 2 description",
+    "due_date": "2000-02-25",
+    "priority": "High",
+}
+task3 = {
+    "id": 3,
+    "title": "Task 3",
+    "category": "Personal",
+    "completed": False,
+    "description": "Task 3 description",
+    "due_date": "2000-03-10",
+    "priority": "Medium",
+}
+task4 = {
+    "id": 4,
+    "title": "Task 4 important",
+    "category": "Work",
+    "completed": True,
+    "description": "Task 4 description",
+    "due_date": "2000-04-18",
+    "priority": "High",
+}
+task5 = {
+    "id": 5,
+    "title": "Task 5",
+    "category": "School",
+    "completed": False,
+    "description": "Task 5 description",
+    "due_date": "2000-05-30",
+    "priority": "Low",
+}
+tasks = [task1, task2, task3, task4, task5]
+
+
+def as_list(tasks):
+    return tasks
+
+
+@pytest.fixture(params=[as_list, TaskStore], ids=["list", "store"])
+def collection(request):
+    return request.param(copy.deepcopy(tasks))
+
+
+@pytest.mark.parametrize(
+    "criteria, expected",
+    [
+        ({}, [task1, task2, task3, task4, task5]),
+        ({"category": "Work"}, [task1, task4]),
+        ({"category": "Work", "priority": "High", "completed": True}, [task4]),
+        ({"priority": "High", "completed": False}, [task1]),
+        ({"due_before": "2000-03-10"}, [task1, task2]),
+        ({"due_before": "2000-04-30", "category": "Personal"}, [task2, task3]),
+        ({"due_before": "2000-12-31", "completed": False}, [task1, task3, task5]),
+        ({"text": "important", "completed": True}, [task2, task4]),
+        ({"text": "important", "due_before": "2000-02-01"}, [task1]),
+        ({"category": "Fitness"}, []),
+    ],
+)
+def test_query_tasks_filters(collection, criteria, expected):
+    page, total = query_tasks(collection, **criteria)
+    assert page == expected
+    assert total == len(expected)
+
+
+@pytest.mark.parametrize(
+    "limit, offset, expected",
+    [
+        (2, 0, [task1, task2]),
+        (2, 2, [task3, task4]),
+        (2, 4, [task5]),
+        (2, 6, []),
+        (0, 0, []),
+        (None, 3, [task4, task5]),
+    ],
+)
+def test_query_tasks_pagination(collection, limit, offset, expected):
+    assert query_tasks(collection, limit=limit, offset=offset) == (expected, 5)
+
+
+@pytest.mark.parametrize(
+    "sort_by, limit, offset, expected",
+    [
+        ("priority", None, 0, [task1, task2, task4, task3, task5]),
+        ("due_date", 2, 1, [task2, task3]),
+        ("title", 1, 0, [task1]),
+        ("id", 0, 0, []),
+    ],
+)
+def test_query_tasks_sorting(collection, sort_by, limit, offset, expected):
+    assert query_tasks(collection, sort_by=sort_by, limit=limit, offset=offset) == (
+        expected,
+        5,
+    )
+
+
+def test_query_tasks_count_for_page_count(collection):
+    _, total = query_tasks(collection, priority="High", limit=0)
+    assert get_num_pages(total, 2) == 2
+
+
+def test_store_select_starts_from_most_selective_index():
+    store = TaskStore(copy.deepcopy(tasks))
+    with_due = list(store.select(due_before="2000-02-01", category="Work"))
+    assert with_due == [task1]
+    assert list(store.select(task_ids={5, 3, 99})) == [task3, task5]
+    assert list(store.select(task_ids={5, 3}, completed=False, priority="Low")) == [task5]
+
+
+def test_query_tasks_stops_once_page_is_full():
+    consumed = []
+
+    def stream():
+        for task in tasks:
+            consumed.append(task["id"])
+            yield task
+
+    page, total = query_tasks(stream(), priority="High", limit=2, count_total=False)
+    assert page == [task1, task2]
+    assert total is None
+    assert consumed == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "criteria, expected",
+    [
+        ({}, 5),
+        ({"priority": "High"}, 3),
+        ({"priority": "High", "completed": True}, 2),
+        ({"category": "Work", "text": "important"}, 2),
+        ({"due_before": "2000-03-01", "completed": False}, 1),
+    ],
+)
+def test_count_tasks(collection, criteria, expected):
+    assert count_tasks(collection, **criteria) == expected
+
+
+def test_store_count_cache_is_invalidated_by_changes():
+    store = TaskStore(copy.deepcopy(tasks))
+    assert count_tasks(store, priority="High", completed=True) == 2
+    store.update(1, {"completed": True})
+    assert count_tasks(store, priority="High", completed=True) == 3
+
+
+@pytest.mark.parametrize("sort_by", ["id", "due_date"])
+def test_get_tasks_after_walks_every_page(collection, sort_by):
+    pages = []
+    page, cursor = get_tasks_after(collection, 2, sort_by=sort_by)
+    pages.append(page)
+    while cursor is not None:
+        page, cursor = get_tasks_after(collection, 2, cursor, sort_by=sort_by)
+        pages.append(page)
+    assert pages == [[task1, task2], [task3, task4], [task5]]
+
+
+def test_get_tasks_after_filters(collection):
+    assert get_tasks_after(collection, 1, priority="High") == ([task1], 1)
+    assert get_tasks_after(collection, 5, 1, priority="High") == ([task2, task4], None)
+    assert get_tasks_after(collection, 2, ("2000-03-10", 3), "due_date", completed=False) == (
+        [task5],
+        None,
+    )
+    assert get_tasks_after(collection, 0) == ([], None)
+
+
+def test_get_tasks_after_is_stable_under_changes():
+    store = TaskStore(copy.deepcopy(tasks))
+    page, cursor = get_tasks_after(store, 2, sort_by="due_date")
+    assert [task["id"] for task in page] == [1, 2]
+
+    # Tasks added or deleted before the cursor don't shift the next page
+    store.delete(1)
+    store.add({"id": 6, "due_date": "1999-12-31"})
+    store.add({"id": 7, "due_date": "2000-03-10"})
+    page, cursor = get_tasks_after(store, 2, cursor, sort_by="due_date")
+    assert [task["id"] for task in page] == [3, 7]
+
+
+def test_get_tasks_after_invalid_sort(collection):
+    with pytest.raises(ValueError):
+        get_tasks_after(collection, 2, sort_by="title")
@@ -0,0 +1,167 @@
+import os
+import pytest
+from unittest.mock import patch
+from src.tasks import delete_tasks, iter_tasks, load_tasks, save_tasks
+from src.record_store import (
+    HEADER,
+    RECORD,
+    RecordFile,
+    add_task_record,
+    delete_task_record,
+    get_heap_path,
+    update_task_record,
+)
+
+
+@pytest.fixture
+def tasks():
+    return [
+        {
+            "id": 1,
+            "title": "Task 1",
+            "description": "Description 1",
+            "priority": "High",
+            "category": "Work",
+            "due_date": "2024-01-01",
+            "completed": False,
+        },
+        {
+            "id": 2,
+            "title": "Task 2",
+            "description": "Description 2",
+            "priority": "Low",
+            "category": "Personal",
+            "due_date": "2024-02-01",
+            "completed": True,
+        },
+        # Missing, oddly typed and extra fields all round-trip
+        {"id": 3, "title": None, "completed": "yes", "priority": 1, "due_date": "soon", "tags": []},
+    ]
+
+
+@pytest.fixture
+def record_file(tmp_path, tasks):
+    file_path = str(tmp_path / "tasks.trec")
+    save_tasks(tasks, file_path)
+    return file_path
+
+
+def test_record_round_trip(tasks, record_file):
+    assert load_tasks(record_file) == tasks
+    assert list(iter_tasks(record_file)) == tasks
+    assert os.path.getsize(record_file) == HEADER.size + len(tasks) * RECORD.size
+
+
+def test_toggle_writes_one_record_in_place(tasks, record_file):
+    heap_path = get_heap_path(record_file, 0)
+    heap_size = os.path.getsize(heap_path)
+
+    with RecordFile(record_file) as records:
+        with patch.object(records, "_write_header") as mock_write_header:
+            with patch.object(
+                records, "_write_record", wraps=records._write_record
+            ) as mock_write_record:
+                records.update(1, {"completed": True})
+                records.update(2, {"priority": "High", "due_date": "2024-03-01"})
+
+    assert mock_write_record.call_count == 2
+    mock_write_header.assert_not_called()
+    assert os.path.getsize(heap_path) == heap_size
+    tasks[0]["completed"] = True
+    tasks[1].update(priority="High", due_date="2024-03-01")
+    assert load_tasks(record_file) == tasks
+
+
+def test_text_update_appends_to_heap(tasks, record_file):
+    heap_size = os.path.getsize(get_heap_path(record_file, 0))
+
+    updated = update_task_record(1, {"title": "Renamed", "category": "New"}, record_file)
+    assert updated["title"] == "Renamed"
+    assert update_task_record(9, {"title": "Missing"}, record_file) is None
+
+    assert os.path.getsize(get_heap_path(record_file, 0)) > heap_size
+    tasks[0].update(title="Renamed", category="New")
+    assert load_tasks(record_file) == tasks
+
+
+def test_add_and_delete(tasks, record_file):
+    add_task_record({"id": 4, "title": "Task 4"}, record_file)
+    assert delete_task_record(2, record_file)
+    assert not delete_task_record(2, record_file)
+
+    assert load_tasks(record_file) == [tasks[0], tasks[2], {"id": 4, "title": "Task 4"}]
+    with RecordFile(record_file) as records:
+        assert len(records) == 3
+        assert records.get(4) == {"id": 4, "title": "Task 4"}
+        assert records.get(2) is None
+
+
+def test_lookups_bisect_sorted_records(tmp_path):
+    file_path = str(tmp_path / "sorted.trec")
+    save_tasks([{"id": task_id, "title": f"Task {task_id}"} for task_id in range(1, 1001)], file_path)
+    add_task_record({"id": 1001, "title": "Task 1001"}, file_path)
+
+    with RecordFile(file_path) as records:
+        with patch.object(records, "_read_record", wraps=records._read_record) as mock_read:
+            assert records.update(500, {"completed": True})["title"] == "Task 500"
+            assert records.get(1001) == {"id": 1001, "title": "Task 1001"}
+            assert records.delete(2)
+            assert 2 not in records and records.get(0) is None
+        # A few reads per lookup rather than one per record
+        assert mock_read.call_count < 100
+        assert len(records) == 1000
+
+    # Re-adding an existing ID puts the records out of order, so lookups scan
+    add_task_record({"id": 3, "title": "Task 3 again"}, file_path)
+    with RecordFile(file_path) as records:
+        assert records.get(3) == {"id": 3, "title": "Task 3 again"}
+        assert records.get(500)["completed"] is True
+        assert 2 not in records
+
+
+def test_in_place_writes_are_synced(tasks, record_file):
+    with patch("src.record_store.os.fsync") as mock_fsync:
+        update_task_record(1, {"completed": True}, record_file)
+    mock_fsync.assert_called_once()
+
+
+def test_reads_never_create_a_heap(tasks, record_file):
+    os.remove(get_heap_path(record_file, 0))  # As if a save just replaced it
+    opened = []
+
+    def tracking_open(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    with patch("src.record_store.open", tracking_open, create=True):
+        with pytest.raises(FileNotFoundError):
+            load_tasks(record_file)
+    assert not os.path.exists(get_heap_path(record_file, 0))
+    # The record file, opened before the heap, is closed again
+    assert [f.mode for f in opened] == ["rb"]
+    assert all(f.closed for f in opened)
+
+
+def test_add_creates_file(tmp_path):
+    file_path = str(tmp_path / "new.trec")
+    add_task_record({"id": 1, "title": "Task 1"}, file_path)
+    assert load_tasks(file_path) == [{"id": 1, "title": "Task 1"}]
+
+
+def test_heap_is_compacted(tasks, record_file):
+    with patch("src.record_store.HEAP_COMPACT_MIN_BYTES", 0):
+        for number in range(5):
+            update_task_record(1, {"description": f"Version {number}"}, record_file)
+
+    with RecordFile(record_file) as records:
+        assert records.generation > 0
+        assert records.garbage <= records.heap_size
+    assert not os.path.exists(get_heap_path(record_file, 0))
+    tasks[0]["description"] = "Version 4"
+    assert load_tasks(record_file) == tasks
+
+
+def test_delete_record_file(record_file, tmp_path):
+    delete_tasks(record_file)
+    assert load_tasks(record_file) == []
+    assert os.listdir(tmp_path) == ["tasks.trec.lock"]
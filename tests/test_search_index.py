@@ -0,0 +1,102 @@
+import pytest
+from src.search_index import SearchIndex, make_scorer, tokenize
+from src.task_store import TaskStore
+from src.columnar import ColumnarTasks
+from src.tasks import count_tasks, make_task_predicate, query_tasks, search_tasks
+
+tasks = [
+    {"id": 1, "title": "Buy groceries", "description": "Milk, eggs and bread"},
+    {"id": 2, "title": "Bake bread", "description": "Use the groceries"},
+    {"id": 3, "title": "Email report", "description": "Send the weekly report"},
+    {"id": 4, "title": "Groceries again", "description": "Forgot the milk"},
+]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    for task in tasks:
+        index.add(task)
+    return index
+
+
+def test_tokenize():
+    assert tokenize("Milk, eggs & Bread!") == ["milk", "eggs", "bread"]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("groceries", [1, 4, 2]),  # Title matches rank above description matches
+        ("groc", [1, 4, 2]),  # Search as you type
+        ("GROCERIES milk", [1, 4]),
+        ("bread", [2, 1]),
+        ("milk report", []),
+        ("zebra", []),
+        ("", [1, 2, 3, 4]),
+    ],
+)
+def test_search(index, query, expected):
+    assert index.search(query) == expected
+
+
+@pytest.mark.parametrize(
+    "query, title, description, expected",
+    [
+        ("milk", "Buy milk", "Milk and eggs", 3),  # The same word in both texts
+        ("milk", "Buy milk", "A milkshake", 2),
+        ("milk", "Buy eggs", "A milkshake", 1),
+        ("milk eggs", "Buy milk", "And eggs", 3),
+        ("ilk", "Buy milk", "", 0),
+        ("", "Buy milk", "", 1),
+    ],
+)
+def test_make_scorer(query, title, description, expected):
+    assert make_scorer(query)(title, description) == expected
+
+
+@pytest.mark.parametrize("query", ["groceries", "groc", "GROCERIES milk", "port", "rep", ""])
+def test_lists_and_stores_search_alike(query):
+    # "port" is a substring of "report" but not the start of a word, so nothing matches it
+    store = TaskStore([dict(task) for task in tasks])
+    expected = [task["id"] for task in search_tasks(store, query)]
+
+    assert [task["id"] for task in search_tasks(tasks, query)] == expected
+    assert [task["id"] for task in search_tasks(ColumnarTasks.from_dicts(tasks), query)] == expected
+    for source in (tasks, store):
+        page, total = query_tasks(source, text=query)
+        assert [task["id"] for task in page] == expected and total == len(expected)
+        assert count_tasks(source, text=query) == len(expected)
+    assert [task["id"] for task in tasks if make_task_predicate(text=query)(task)] == sorted(
+        expected
+    )
+
+
+def test_query_tasks_keeps_relevance_order_with_filters():
+    store = TaskStore([dict(task) for task in tasks])
+    for source in (tasks, store):
+        page, _ = query_tasks(source, text="groceries", limit=2)
+        assert [task["id"] for task in page] == [1, 4]
+        page, _ = query_tasks(source, text="bread", sort_by="id")
+        assert [task["id"] for task in page] == [1, 2]
+
+
+def test_index_updates_incrementally(index):
+    index.add({"id": 3, "title": "Buy milk", "description": ""})
+    assert index.search("report") == []
+    assert index.search("milk") == [3, 1, 4]
+
+    index.remove(1)
+    index.remove(1)
+    assert index.search("milk") == [3, 4]
+    assert len(index) == 3
+
+
+def test_search_tasks_uses_store_index():
+    store = TaskStore([dict(task) for task in tasks])
+    assert [task["id"] for task in search_tasks(store, "gro mil")] == [1, 4]
+
+    store.update(2, {"title": "Bake cake"})
+    store.delete(4)
+    assert [task["id"] for task in search_tasks(store, "bread")] == [1]
+    assert [task["id"] for task in search_tasks(store, "cake")] == [2]
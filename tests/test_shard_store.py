@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import pytest
+from unittest.mock import patch
+from src.tasks import (
+    delete_tasks,
+    file_lock,
+    iter_tasks,
+    load_category_tasks,
+    load_tasks,
+    save_tasks,
+)
+from src.shard_store import (
+    load_category_tasks_sharded,
+    load_manifest,
+    load_tasks_sharded,
+    save_tasks_sharded,
+    shutdown_process_pool,
+)
+
+
+@pytest.fixture
+def tasks():
+    return [
+        {"id": 1, "title": "Task 1", "category": "Work", "completed": False},
+        {"id": 2, "title": "Task 2", "category": "Personal", "completed": True},
+        {"id": 3, "title": "Task 3", "category": "Work", "completed": False},
+        {"id": 4, "title": "Task 4", "category": "School", "completed": False},
+    ]
+
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    return str(tmp_path / "tasks.shards")
+
+
+def test_sharded_round_trip(tasks, manifest_path):
+    save_tasks(tasks, manifest_path)
+
+    assert load_tasks(manifest_path) == tasks
+    assert list(iter_tasks(manifest_path)) == tasks
+    assert len(load_manifest(manifest_path)["shards"]) == 3
+
+
+def test_parallel_load_matches_sequential_load(tasks, manifest_path):
+    save_tasks_sharded(tasks, manifest_path)
+    try:
+        assert load_tasks_sharded(manifest_path, parallel=True) == tasks
+    finally:
+        shutdown_process_pool()
+
+
+def test_only_dirty_shards_are_rewritten(tasks, manifest_path):
+    assert save_tasks_sharded(tasks, manifest_path) == 3
+    files = {shard["key"]: shard["file"] for shard in load_manifest(manifest_path)["shards"]}
+
+    tasks[1]["completed"] = False
+    assert save_tasks_sharded(tasks, manifest_path) == 1
+
+    new_files = {shard["key"]: shard["file"] for shard in load_manifest(manifest_path)["shards"]}
+    assert new_files["Work"] == files["Work"]
+    assert new_files["School"] == files["School"]
+    assert new_files["Personal"] != files["Personal"]
+    assert not os.path.exists(os.path.join(os.path.dirname(manifest_path), files["Personal"]))
+    assert load_tasks(manifest_path) == tasks
+
+
+def test_changed_ids_skip_serializing_clean_shards(tasks, manifest_path):
+    save_tasks_sharded(tasks, manifest_path)
+    files = {shard["key"]: shard["file"] for shard in load_manifest(manifest_path)["shards"]}
+
+    tasks[0]["category"] = "School"  # Moves from the Work shard
+    del tasks[1]  # Empties the Personal shard
+    tasks.append({"id": 5, "title": "Task 5", "category": "Other", "completed": False})
+    with patch("src.shard_store.json.dumps", wraps=json.dumps) as mock_dumps:
+        assert save_tasks_sharded(tasks, manifest_path, changed_ids=[1, 2, 5]) == 3
+    # Work only lost a task, which its count gives away
+    assert mock_dumps.call_count == 3
+
+    new_files = {shard["key"]: shard["file"] for shard in load_manifest(manifest_path)["shards"]}
+    assert set(new_files) == {"Work", "School", "Other"}
+    assert new_files["Work"] != files["Work"] and new_files["School"] != files["School"]
+    assert load_tasks(manifest_path) == tasks
+
+    tasks[2]["title"] = "Renamed"  # Not reported as changed, so not saved
+    assert save_tasks_sharded(tasks, manifest_path, changed_ids=[]) == 0
+    assert load_tasks(manifest_path)[2]["title"] == "Task 4"
+
+
+def test_emptied_shards_are_removed(tasks, manifest_path):
+    save_tasks_sharded(tasks, manifest_path)
+    save_tasks_sharded(tasks[:1], manifest_path)
+
+    (shard,) = load_manifest(manifest_path)["shards"]
+    assert shard["key"] == "Work"
+    assert sorted(os.listdir(os.path.dirname(manifest_path))) == sorted(
+        ["tasks.shards", shard["file"], "tasks.shards.lock"]
+    )
+
+
+def test_partition_by_id_range(tasks, manifest_path):
+    save_tasks_sharded(tasks, manifest_path, partition="id", shard_size=2)
+
+    assert [shard["key"] for shard in load_manifest(manifest_path)["shards"]] == [0, 1, 2]
+    assert load_tasks(manifest_path) == tasks
+
+    save_tasks_sharded(tasks, manifest_path)  # Keeps the partitioning
+    assert load_manifest(manifest_path)["partition"] == "id"
+
+
+def test_unknown_partition(tasks, manifest_path):
+    with pytest.raises(ValueError):
+        save_tasks_sharded(tasks, manifest_path, partition="priority")
+
+
+def test_load_category_reads_one_shard(tasks, manifest_path, tmp_path):
+    save_tasks(tasks, manifest_path)
+    for shard in load_manifest(manifest_path)["shards"]:
+        if shard["key"] != "Work":
+            os.remove(tmp_path / shard["file"])
+
+    assert load_category_tasks_sharded("Work", manifest_path) == [tasks[0], tasks[2]]
+    assert load_category_tasks("Other", manifest_path) == []
+
+
+def test_missing_shard_raises(tasks, manifest_path, tmp_path):
+    save_tasks(tasks, manifest_path)
+    os.remove(tmp_path / load_manifest(manifest_path)["shards"][0]["file"])
+    with pytest.raises(FileNotFoundError):
+        load_tasks_sharded(manifest_path)
+
+
+def test_load_waits_for_save(tasks, manifest_path):
+    save_tasks(tasks, manifest_path)
+    loaded = []
+    with file_lock(manifest_path):
+        thread = threading.Thread(target=lambda: loaded.append(load_tasks(manifest_path)))
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()  # Blocked while a save would hold the lock
+        save_tasks_sharded(tasks[:1], manifest_path)
+    thread.join(5)
+    assert loaded == [tasks[:1]]
+
+
+def test_load_category_tasks_json(tasks, tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks(tasks, file_path)
+    assert load_category_tasks("Work", file_path) == [tasks[0], tasks[2]]
+
+
+def test_delete_sharded_tasks(tasks, manifest_path, tmp_path):
+    save_tasks(tasks, manifest_path)
+    delete_tasks(manifest_path)
+
+    assert load_tasks(manifest_path) == []
+    assert os.listdir(tmp_path) == ["tasks.shards.lock"]
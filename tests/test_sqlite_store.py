@@ -0,0 +1,183 @@
+import pytest
+from contextlib import closing
+from datetime import datetime
+from unittest.mock import patch
+from src.tasks import (
+    load_tasks,
+    save_tasks,
+    filter_tasks_by_priority,
+    filter_tasks_by_category,
+    filter_tasks_by_completion,
+    get_overdue_tasks,
+    get_num_pages,
+    get_paginated_tasks,
+)
+from src import sqlite_store
+
+task1 = {
+    "id": 1,
+    "title": "Task 1",
+    "category": "Work",
+    "completed": False,
+    "description": "Task 1 description important",
+    "due_date": "2000-01-15",
+    "priority": "High",
+}
+task2 = {
+    "id": 2,
+    "title": "Task 2 important",
+    "category": "Personal",
+    "completed": True,
+    "description": "Task 2 description",
+    "due_date": "2000-02-25",
+    "priority": "High",
+}
+task3 = {
+    "id": 3,
+    "title": "Task 3",
+    "category": "Personal",
+    "completed": False,
+    "description": "Task 3 description",
+    "due_date": "2000-03-10",
+    "priority": "Medium",
+}
+task4 = {
+    "id": 4,
+    "title": "Task 4 important",
+    "category": "Work",
+    "completed": True,
+    "description": "Task 4 description",
+    "due_date": "2000-04-18",
+    "priority": "High",
+}
+task5 = {
+    "id": 5,
+    "title": "Task 5",
+    "category": "School",
+    "completed": False,
+    "description": "Task 5 description",
+    "due_date": "2000-05-30",
+    "priority": "Low",
+}
+tasks = [task1, task2, task3, task4, task5]
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    file_path = str(tmp_path / "tasks.db")
+    save_tasks(tasks, file_path)
+    return file_path
+
+
+def test_load_tasks_round_trip(db_file):
+    assert load_tasks(db_file) == tasks
+
+
+def test_save_tasks_replaces_contents(db_file):
+    save_tasks([task3], db_file)
+    assert load_tasks(db_file) == [task3]
+
+
+@pytest.mark.parametrize("priority", ["High", "Medium", "Low", "invalid"])
+def test_filter_tasks_by_priority(db_file, priority):
+    assert sqlite_store.filter_tasks_by_priority(
+        db_file, priority
+    ) == filter_tasks_by_priority(tasks, priority)
+
+
+@pytest.mark.parametrize("category", ["Work", "Personal", "School", "Fitness"])
+def test_filter_tasks_by_category(db_file, category):
+    assert sqlite_store.filter_tasks_by_category(
+        db_file, category
+    ) == filter_tasks_by_category(tasks, category)
+
+
+@pytest.mark.parametrize("completed", [True, False])
+def test_filter_tasks_by_completion(db_file, completed):
+    assert sqlite_store.filter_tasks_by_completion(
+        db_file, completed
+    ) == filter_tasks_by_completion(tasks, completed)
+
+
+@pytest.mark.parametrize("date", ["2001-01-01", "2000-01-01", "2000-03-01"])
+def test_get_overdue_tasks(db_file, date):
+    with patch("src.sqlite_store.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime.strptime(date, "%Y-%m-%d")
+        overdue = sqlite_store.get_overdue_tasks(db_file)
+    with patch("src.tasks.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime.strptime(date, "%Y-%m-%d")
+        assert overdue == get_overdue_tasks(tasks)
+
+
+@pytest.mark.parametrize("page_number, tasks_per_page", [(1, 2), (2, 2), (3, 2), (1, 0)])
+def test_pagination(db_file, page_number, tasks_per_page):
+    assert sqlite_store.get_num_pages(db_file, tasks_per_page) == get_num_pages(
+        tasks, tasks_per_page
+    )
+    assert sqlite_store.get_paginated_tasks(
+        page_number, db_file, tasks_per_page
+    ) == get_paginated_tasks(page_number, tasks, tasks_per_page)
+
+
+def test_filtered_pagination(db_file):
+    assert sqlite_store.get_num_pages(db_file, 2, priority="High") == 2
+    assert sqlite_store.get_paginated_tasks(2, db_file, 2, priority="High") == [task4]
+    assert sqlite_store.count_tasks(db_file, category="Work", completed=True) == 1
+
+
+def test_single_row_mutations(db_file):
+    assert sqlite_store.update_task(3, {"completed": True}, db_file) == {
+        **task3,
+        "completed": True,
+    }
+    assert sqlite_store.update_task(99, {"completed": True}, db_file) is None
+    assert sqlite_store.delete_task(1, db_file)
+    assert not sqlite_store.delete_task(1, db_file)
+    sqlite_store.insert_task({**task1, "id": 6}, db_file)
+
+    assert [task["id"] for task in load_tasks(db_file)] == [2, 3, 4, 5, 6]
+    assert sqlite_store.filter_tasks_by_completion(db_file, True) == [
+        task2,
+        {**task3, "completed": True},
+        task4,
+    ]
+
+
+def test_overdue_query_uses_due_date_index(tmp_path):
+    file_path = str(tmp_path / "many.db")
+    sqlite_store.save_tasks_sqlite(
+        [
+            {"id": i, "completed": i % 10 > 0, "due_date": "2000-01-01" if i % 100 else None}
+            for i in range(2000)
+        ],
+        file_path,
+    )
+    clause, parameters = sqlite_store._where_clause(overdue=True)
+    with closing(sqlite_store.connect(file_path)) as connection:
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT data FROM tasks" + clause, parameters
+        ).fetchall()
+    assert "USING INDEX idx_tasks_open_due_date" in plan[0][3]
+    # Tasks without a due date are overdue, as in get_overdue_tasks
+    assert sqlite_store.count_tasks(file_path, overdue=True) == 200
+
+
+def test_only_first_bulk_load_analyzes(tmp_path):
+    file_path = str(tmp_path / "analyzed.db")
+    sqlite_store.save_tasks_sqlite([{"id": i} for i in range(100)], file_path)
+    with closing(sqlite_store.connect(file_path)) as connection:
+        assert sqlite_store._has_statistics(connection)
+        connection.execute("DELETE FROM sqlite_stat1 WHERE idx = 'idx_tasks_category'")
+        connection.commit()
+
+    sqlite_store.save_tasks_sqlite([{"id": i} for i in range(200)], file_path)
+    with closing(sqlite_store.connect(file_path)) as connection:
+        indexes = {idx for (idx,) in connection.execute("SELECT idx FROM sqlite_stat1")}
+    assert "idx_tasks_category" not in indexes
+
+
+def test_load_missing_database_creates_nothing(tmp_path):
+    file_path = tmp_path / "missing.db"
+    assert load_tasks(str(file_path)) == []
+    assert list(sqlite_store.iter_tasks_sqlite(str(file_path))) == []
+    assert not file_path.exists()
@@ -0,0 +1,91 @@
+import io
+import json
+import pytest
+from src.tasks import (
+    iter_json_array,
+    iter_tasks,
+    load_tasks,
+    save_tasks,
+    search_tasks,
+    filter_tasks_by_category,
+    get_paginated_tasks,
+)
+from src.journal import journal_add, journal_update, journal_delete
+
+tasks = [
+    {"id": 1, "title": "Task 1, with [brackets]", "category": "Work", "tags": [1, {"a": "}"}]},
+    {"id": 2, "title": "Task 2 \"quoted\"", "category": "Personal", "completed": True},
+    {"id": 3, "title": "Task 3 é", "category": "Work", "due_date": None},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64 * 1024])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_matches_json_load(chunk_size, indent):
+    text = json.dumps(tasks, indent=indent)
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == tasks
+
+
+@pytest.mark.parametrize("text, expected", [("[]", []), (" [ 1 , 22 ,333 ] ", [1, 22, 333])])
+def test_iter_json_array_edge_cases(text, expected):
+    assert list(iter_json_array(io.StringIO(text), chunk_size=1)) == expected
+
+
+@pytest.mark.parametrize("text", ["", "{}", "[1, 2", "[1 2]", '[{"id": 1'])
+def test_iter_json_array_invalid(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO(text), chunk_size=3))
+
+
+def test_iter_tasks_reads_lazily():
+    stream = iter_json_array(io.StringIO(json.dumps(tasks)), chunk_size=1)
+    assert next(stream) == tasks[0]
+
+
+@pytest.fixture
+def task_file(tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks(tasks, file_path)
+    return file_path
+
+
+def test_iter_tasks_applies_journal(task_file):
+    journal_update(1, {"completed": True}, task_file)
+    journal_delete(2, task_file)
+    journal_add({"id": 4, "title": "Task 4"}, task_file)
+    assert list(iter_tasks(task_file)) == load_tasks(task_file)
+    assert [task["id"] for task in iter_tasks(task_file)] == [1, 3, 4]
+
+
+def test_iter_tasks_missing_and_corrupted_files(tmp_path, capfd):
+    assert list(iter_tasks(str(tmp_path / "missing.json"))) == []
+
+    file_path = tmp_path / "corrupted.json"
+    file_path.write_text('[{"id": 1}, {"id": 2')
+    assert list(iter_tasks(str(file_path))) == [{"id": 1}]
+    assert "contains invalid JSON" in capfd.readouterr().out
+
+
+def test_iter_tasks_sqlite(tmp_path):
+    file_path = str(tmp_path / "tasks.db")
+    save_tasks(tasks, file_path)
+    assert list(iter_tasks(file_path)) == tasks
+
+
+def test_filters_consume_stream(task_file):
+    assert search_tasks(iter_tasks(task_file), "brackets") == [tasks[0]]
+    assert filter_tasks_by_category(iter_tasks(task_file), "Work") == [tasks[0], tasks[2]]
+
+
+def test_get_paginated_tasks_stops_reading_stream():
+    consumed = []
+
+    def stream():
+        for task in tasks:
+            consumed.append(task["id"])
+            yield task
+
+    assert get_paginated_tasks(1, stream(), 1) == [tasks[0]]
+    assert consumed == [1]
+    assert get_paginated_tasks(2, iter(tasks), 2) == [tasks[2]]
+    assert get_paginated_tasks(1, iter(tasks), 0) == []
@@ -0,0 +1,79 @@
+import sys
+import time
+from unittest.mock import MagicMock, patch
+from src.suite_runner import SuiteRun, build_pytest_command, start_test_run
+
+
+def test_build_pytest_command():
+    assert build_pytest_command("python -m pytest --cov src") == [
+        sys.executable,
+        "-m",
+        "pytest",
+        "--cov",
+        "src",
+        "-n",
+        "auto",
+    ]
+    assert build_pytest_command("python -m pytest -n 2", workers=4)[-2:] == ["-n", "2"]
+    assert build_pytest_command("python -m pytest", workers=None) == [sys.executable, "-m", "pytest"]
+    assert build_pytest_command("python script.py") == [sys.executable, "script.py"]
+    with patch("src.suite_runner.importlib.util.find_spec", return_value=None):
+        assert "-n" not in build_pytest_command("python -m pytest")
+
+
+def test_output_streams_while_running():
+    run = SuiteRun(
+        [
+            sys.executable,
+            "-c",
+            "import sys, time; print('first'); sys.stdout.flush(); time.sleep(30)",
+        ]
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while "first" not in run.output() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert run.output() == "first\n"
+        assert run.is_running()
+        assert run.returncode is None
+    finally:
+        run.cancel()
+    assert run.cancelled
+    assert not run.is_running()
+    assert run.returncode != 0
+
+
+def test_run_finishes():
+    run = SuiteRun([sys.executable, "-c", "import sys; print('out'); print('err', file=sys.stderr)"])
+    assert run.wait(10) == 0
+    assert sorted(run.output().splitlines()) == ["err", "out"]
+    assert not run.cancelled
+    elapsed = run.elapsed
+    assert elapsed == run.elapsed  # Stops counting once finished
+    run.cancel()  # Does nothing once finished
+    assert not run.cancelled
+
+
+def test_start_test_run():
+    with patch("src.suite_runner.SuiteRun") as mock_suite_run:
+        start_test_run("python -m pytest tests/test_basic.py", workers=None)
+    mock_suite_run.assert_called_once_with([sys.executable, "-m", "pytest", "tests/test_basic.py"])
+
+
+def test_display_test_run():
+    run = MagicMock(cancelled=False, returncode=1, elapsed=1.0)
+    run.output.return_value = "1 failed"
+    with patch("src.app.st") as mock_streamlit:
+        from src.app import display_test_run
+
+        run.is_running.return_value = True
+        display_test_run(run, polling=True)
+        run.cancel.assert_called_once()
+        mock_streamlit.rerun.assert_not_called()
+
+        run.is_running.return_value = False
+        display_test_run(run, polling=True)
+        mock_streamlit.rerun.assert_called_once()
+
+        display_test_run(run, polling=False)
+        mock_streamlit.error.assert_called_once()
@@ -0,0 +1,72 @@
+import pytest
+from src.tasks import add_task, load_tasks, reserve_task_ids, save_tasks, delete_tasks
+from src.journal import journal_add, journal_update
+from src.write_behind import WriteBehindQueue
+from src.task_cache import (
+    get_file_signature,
+    load_cached_tasks,
+    refresh_cached_tasks,
+    invalidate_cached_tasks,
+)
+
+
+@pytest.fixture
+def task_file(tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks([{"id": 1, "title": "Task 1", "completed": False}], file_path)
+    yield file_path
+    invalidate_cached_tasks()
+
+
+def test_unchanged_file_is_not_reloaded(task_file):
+    tasks = load_cached_tasks(task_file)
+    assert load_cached_tasks(task_file) is tasks
+    assert tasks.get(1)["title"] == "Task 1"
+
+
+def test_changed_file_is_reloaded(task_file):
+    tasks = load_cached_tasks(task_file)
+    save_tasks([{"id": 1, "title": "Task 1 renamed on disk"}], task_file)
+    reloaded = load_cached_tasks(task_file)
+    assert reloaded is not tasks
+    assert reloaded.get(1)["title"] == "Task 1 renamed on disk"
+
+
+def test_refresh_after_write_keeps_cached_tasks(task_file):
+    tasks = load_cached_tasks(task_file)
+    tasks.update(1, {"completed": True})
+    journal_update(1, {"completed": True}, task_file)
+    refresh_cached_tasks(task_file)
+    assert load_cached_tasks(task_file) is tasks
+
+
+def test_add_waiting_for_commit_survives_cached_loads(task_file):
+    tasks = load_cached_tasks(task_file)
+    queue = WriteBehindQueue(
+        task_file, delay=60, on_commit=lambda external: refresh_cached_tasks(task_file)
+    )
+    task_id = reserve_task_ids(file_path=task_file, tasks=tasks)
+    add_task(tasks, "Task 2", "", "Low", "Work", "2000-01-01", task_id=task_id)
+    journal_add(tasks.get(task_id), task_file, writer=queue)
+
+    # Another session's rerun before the group commit, after the ID was reserved
+    assert load_cached_tasks(task_file) is tasks
+    queue.flush()
+    assert load_cached_tasks(task_file) is tasks
+    assert [task["id"] for task in tasks] == [1, 2]
+    assert [task["id"] for task in load_tasks(task_file)] == [1, 2]
+
+
+def test_invalidate(task_file):
+    tasks = load_cached_tasks(task_file)
+    delete_tasks(task_file)
+    invalidate_cached_tasks(task_file)
+    assert len(load_cached_tasks(task_file)) == 0
+    assert load_cached_tasks(task_file) is not tasks
+
+
+def test_get_file_signature(task_file):
+    signature = get_file_signature(task_file)
+    assert signature[0] is not None and signature[1] is None
+    journal_update(1, {"completed": True}, task_file)
+    assert get_file_signature(task_file) != signature
@@ -0,0 +1,236 @@
+import copy
+import threading
+import pytest
+from src.task_store import TaskStore
+from src.tasks import (
+    filter_tasks_by_priority,
+    filter_tasks_by_category,
+    filter_tasks_by_completion,
+    search_tasks,
+    get_num_pages,
+    generate_unique_id,
+    add_task,
+    get_task,
+    update_task,
+    delete_task,
+    load_next_id,
+    save_next_id,
+    query_tasks,
+)
+
+task1 = {
+    "id": 1,
+    "title": "Task 1",
+    "category": "Work",
+    "completed": False,
+    "description": "Task 1 description important",
+    "due_date": "2000-01-15",
+    "priority": "High",
+}
+task2 = {
+    "id": 2,
+    "title": "Task 2 important",
+    "category": "Personal",
+    "completed": True,
+    "description": "Task 2 description",
+    "due_date": "2000-02-25",
+    "priority": "High",
+}
+task3 = {
+    "id": 3,
+    "title": "Task 3",
+    "category": "Personal",
+    "completed": False,
+    "description": "Task 3 description",
+    "due_date": "2000-03-10",
+    "priority": "Medium",
+}
+task4 = {
+    "id": 4,
+    "title": "Task 4 important",
+    "category": "Work",
+    "completed": True,
+    "description": "Task 4 description",
+    "due_date": "2000-04-18",
+    "priority": "High",
+}
+task5 = {
+    "id": 5,
+    "title": "Task 5",
+    "category": "School",
+    "completed": False,
+    "description": "Task 5 description",
+    "due_date": "2000-05-30",
+    "priority": "Low",
+}
+tasks = [task1, task2, task3, task4, task5]
+
+
+@pytest.fixture
+def store():
+    return TaskStore(copy.deepcopy(tasks))
+
+
+def test_store_preserves_order(store):
+    assert len(store) == 5
+    assert store.to_list() == tasks
+    assert list(store) == tasks
+    assert 3 in store and 6 not in store
+    assert store.get(2) == tasks[1]
+    assert store.get(6) is None
+
+
+@pytest.mark.parametrize("priority", ["High", "Medium", "Low", "invalid"])
+def test_filter_tasks_by_priority(store, priority):
+    assert filter_tasks_by_priority(store, priority) == filter_tasks_by_priority(
+        tasks, priority
+    )
+
+
+@pytest.mark.parametrize("category", ["Work", "Personal", "School", "Fitness"])
+def test_filter_tasks_by_category(store, category):
+    assert filter_tasks_by_category(store, category) == filter_tasks_by_category(
+        tasks, category
+    )
+
+
+@pytest.mark.parametrize("completed", [True, False])
+def test_filter_tasks_by_completion(store, completed):
+    assert filter_tasks_by_completion(
+        store, completed
+    ) == filter_tasks_by_completion(tasks, completed)
+
+
+def test_store_works_with_list_functions(store):
+    assert search_tasks(store, "important") == [tasks[1], tasks[3], tasks[0]]
+    assert get_num_pages(store, 2) == 3
+
+
+def test_combined_filter(store):
+    assert store.filter(category="Work", priority="High", completed=True) == [tasks[3]]
+    assert store.filter(category="Personal", completed=False) == [tasks[2]]
+    assert store.filter(category="School", priority="High") == []
+    assert store.filter() == tasks
+
+
+def test_update_reindexes_in_order(store):
+    store.update(5, {"priority": "High"})
+    store.update(1, {"priority": "Low"})
+    store.update(1, {"priority": "High"})
+    assert [task["id"] for task in store.filter(priority="High")] == [1, 2, 4, 5]
+    assert store.filter(priority="Low") == []
+    assert store.count("priority", "High") == 4
+    assert store.update(99, {"priority": "Low"}) is None
+
+
+def test_add_and_delete(store):
+    store.add({"id": 6, "category": "Work", "priority": "Low", "completed": False})
+    assert [task["id"] for task in store.filter(category="Work")] == [1, 4, 6]
+
+    assert store.delete(1)["id"] == 1
+    assert store.delete(1) is None
+    assert [task["id"] for task in store.filter(category="Work")] == [4, 6]
+    assert store.count("category", "School") == 1
+
+    store.add({**tasks[3], "category": "School"})  # Replaces task 4 in place
+    assert [task["id"] for task in store.filter(category="School")] == [4, 5]
+    assert [task["id"] for task in store] == [2, 3, 4, 5, 6]
+
+
+@pytest.mark.parametrize("as_store", [True, False])
+def test_get_update_delete_task(as_store):
+    collection = copy.deepcopy(tasks)
+    if as_store:
+        collection = TaskStore(collection)
+
+    assert get_task(collection, 3) == tasks[2]
+    assert get_task(collection, 99) is None
+    assert update_task(collection, 3, {"completed": True})["completed"]
+    assert filter_tasks_by_completion(collection, True)[1]["id"] == 3
+    assert update_task(collection, 99, {"completed": True}) is None
+    assert delete_task(collection, 3)["id"] == 3
+    assert delete_task(collection, 3) is None
+    assert [task["id"] for task in collection] == [1, 2, 4, 5]
+
+
+def test_store_id_allocation_is_monotonic():
+    store = TaskStore(copy.deepcopy(tasks))
+    assert generate_unique_id(store) == 6
+    store.delete(5)
+    assert generate_unique_id(store) == 6
+
+    result = add_task(store, "Task 6", "", "Low", "Work", "2000-06-01")
+    assert result is store
+    assert get_task(store, 6)["title"] == "Task 6"
+    assert generate_unique_id(store) == 7
+    assert TaskStore([], next_id=10).next_id == 10
+
+
+def test_next_id_is_persisted(tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    assert load_next_id(file_path) == 1
+    save_next_id(42, file_path)
+    assert load_next_id(file_path) == 42
+    assert TaskStore(tasks, next_id=load_next_id(file_path)).next_id == 42
+
+
+def test_store_version_changes_on_mutation(store):
+    versions = [store.version]
+    store.add({"id": 6, "category": "Work"})
+    versions.append(store.version)
+    store.update(6, {"category": "School"})
+    versions.append(store.version)
+    store.delete(6)
+    versions.append(store.version)
+    store.delete(6)
+    assert store.version == versions[-1]
+    assert len(set(versions)) == 4
+    assert TaskStore(tasks).version not in versions
+
+
+def test_batch_mutations_match_single_mutations(store):
+    single = TaskStore(copy.deepcopy(tasks))
+    new_tasks = [
+        {"id": 7, "category": "Work", "due_date": "2000-01-01", "completed": False},
+        {"id": 6, "category": "School", "due_date": "2000-06-01", "completed": True},
+    ]
+
+    store.add_many(copy.deepcopy(new_tasks))
+    for task in copy.deepcopy(new_tasks):
+        single.add(task)
+    assert [task["id"] for task in store.update_many([1, 3, 99], {"completed": True})] == [1, 3]
+    for task_id in [1, 3]:
+        single.update(task_id, {"completed": True})
+    assert [task["id"] for task in store.delete_many([2, 7, 99])] == [2, 7]
+    for task_id in [2, 7]:
+        single.delete(task_id)
+
+    assert store.to_list() == single.to_list()
+    assert store.next_id == single.next_id == 8
+    for criteria in [{"completed": True}, {"category": "Work"}, {"category": "School"}]:
+        assert store.filter(**criteria) == single.filter(**criteria)
+    assert store.overdue("2001-01-01") == single.overdue("2001-01-01")
+    assert store.due_between("2000-01-01", "2000-12-31") == single.due_between(
+        "2000-01-01", "2000-12-31"
+    )
+    assert list(store.iter_after("id", 3)) == list(single.iter_after("id", 3))
+
+
+def test_store_lock_serializes_threads(store):
+    results = []
+    with store.lock:
+        # A session's allocate-and-add can't be interleaved with another's
+        reader = threading.Thread(target=lambda: results.append(query_tasks(store)[1]))
+        adder = threading.Thread(
+            target=lambda: add_task(store, "Task 7", "", "Low", "Work", "2000-01-01")
+        )
+        reader.start()
+        adder.start()
+        task_id = generate_unique_id(store)
+        add_task(store, "Task 6", "", "Low", "Work", "2000-01-01")
+        reader.join(0.1)
+        assert results == [] and get_task(store, task_id)["title"] == "Task 6"
+    reader.join()
+    adder.join()
+    assert results[0] in (6, 7)
+    assert get_task(store, task_id + 1)["title"] == "Task 7"
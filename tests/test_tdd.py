@@ -2,11 +2,13 @@ import pytest
 import os
 import pandas as pd
 import io
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 from src.tasks import (
     delete_tasks,
     save_tasks,
     export_to_csv_bytes,
+    iter_csv_chunks,
+    get_cached_csv_bytes,
     get_num_pages,
     get_paginated_tasks,
 )
@@ -32,8 +34,9 @@ def test_delete_tasks_file_missing(mock_path_exists, mock_remove):
     mock_remove.assert_not_called()
 
 
-def test_delete_tasks_removes_file():
-    task_file = "test_tasks.json"
+def test_delete_tasks_removes_file(tmp_path):
+    # Saving also writes lock and metadata files next to the task file
+    task_file = str(tmp_path / "test_tasks.json")
     if os.path.exists(task_file):
         os.remove(task_file)
     save_tasks([{"id": 1, "title": "Task 1"}, {"id": 2, "title": "Task 2"}], task_file)
@@ -90,12 +93,10 @@ task5 = {
 tasks = [task1, task2, task3, task4, task5]
 
 
-@patch("pandas.DataFrame", return_value=MagicMock())
-@patch("io.BytesIO", return_value=MagicMock())
-def test_export_to_csv_bytes_calls_to_csv(mock_bytes_io, mock_dataframe):
+@patch("pandas.DataFrame")
+def test_export_to_csv_bytes_does_not_use_pandas(mock_dataframe):
     export_to_csv_bytes(tasks)
-    mock_dataframe.assert_called_once_with(tasks)
-    mock_dataframe.return_value.to_csv.assert_called_once()
+    mock_dataframe.assert_not_called()
 
 
 def test_export_to_csv_bytes_output():
@@ -107,6 +108,46 @@ def test_export_to_csv_bytes_output():
     assert bytes_df.equals(original_df)
 
 
+def test_iter_csv_chunks():
+    chunks = list(iter_csv_chunks(tasks, chunk_size=2))
+    assert len(chunks) == 3
+    assert b"".join(chunks) == export_to_csv_bytes(tasks)
+    assert chunks[0].startswith(b"id,title,category,completed,")
+    assert list(iter_csv_chunks([])) == []
+    assert list(iter_csv_chunks(iter(tasks[:1]), columns=["id", "title"])) == [
+        b"id,title\n1,Task 1\n"
+    ]
+    with pytest.raises(TypeError):
+        next(iter_csv_chunks(iter(tasks)))
+
+
+def test_get_cached_csv_bytes():
+    with patch("src.tasks.export_to_csv_bytes", return_value=b"csv") as mock_export:
+        assert get_cached_csv_bytes(tasks, version=1, view="test") == b"csv"
+        assert get_cached_csv_bytes(tasks, version=1, view="test") == b"csv"
+        mock_export.assert_called_once_with(tasks)
+
+        get_cached_csv_bytes(tasks, version=2, view="test")
+        get_cached_csv_bytes(tasks[:1], version=2, view="other test")
+        assert mock_export.call_count == 3
+
+
+def test_get_cached_csv_bytes_evicts_least_recently_used_view():
+    with patch("src.tasks.CSV_EXPORT_CACHE_SIZE", 2), patch(
+        "src.tasks.export_to_csv_bytes", return_value=b"csv"
+    ) as mock_export:
+        get_cached_csv_bytes(tasks, version=1, view="evict 1")
+        get_cached_csv_bytes(tasks, version=1, view="evict 2")
+        get_cached_csv_bytes(tasks, version=1, view="evict 1")
+        get_cached_csv_bytes(tasks, version=1, view="evict 3")
+        assert mock_export.call_count == 3
+
+        get_cached_csv_bytes(tasks, version=1, view="evict 1")
+        assert mock_export.call_count == 3
+        get_cached_csv_bytes(tasks, version=1, view="evict 2")
+        assert mock_export.call_count == 4
+
+
 @pytest.mark.parametrize(
     "tasks, tasks_per_page, expected",
     [
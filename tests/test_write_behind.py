@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from src.task_store import TaskStore
+from src.tasks import (
+    add_task,
+    atomic_write_json,
+    file_lock,
+    get_journal_path,
+    load_next_id,
+    load_tasks,
+    reserve_task_ids,
+    save_tasks,
+)
+from src.journal import journal_add, journal_update
+from src.write_behind import (
+    WriteBehindQueue,
+    WriteConflictError,
+    commit_tasks,
+    load_version,
+)
+
+
+@pytest.fixture
+def task_file(tmp_path):
+    file_path = str(tmp_path / "tasks.json")
+    save_tasks([{"id": 1, "title": "Task 1", "completed": False}], file_path)
+    return file_path
+
+
+def test_atomic_write_json_leaves_no_temporary_files(tmp_path):
+    file_path = str(tmp_path / "data.json")
+    atomic_write_json({"a": 1}, file_path)
+
+    assert os.listdir(tmp_path) == ["data.json"]
+    with open(file_path) as f:
+        assert json.load(f) == {"a": 1}
+
+
+def test_atomic_write_json_keeps_old_contents_on_failure(tmp_path):
+    file_path = str(tmp_path / "data.json")
+    atomic_write_json({"a": 1}, file_path)
+
+    with pytest.raises(TypeError):
+        atomic_write_json({"a": object()}, file_path)
+
+    assert os.listdir(tmp_path) == ["data.json"]
+    with open(file_path) as f:
+        assert json.load(f) == {"a": 1}
+
+
+def test_file_lock_is_reentrant(task_file):
+    with file_lock(task_file):
+        with file_lock(task_file):
+            pass
+        with file_lock(task_file):
+            pass
+
+
+def test_commit_tasks_replaces_snapshot_and_journal(task_file):
+    journal_update(1, {"completed": True}, task_file)
+    version = load_version(task_file)
+
+    assert commit_tasks([{"id": 2, "title": "Task 2"}], task_file) == version + 1
+    assert not os.path.exists(get_journal_path(task_file))
+    assert load_tasks(task_file) == [{"id": 2, "title": "Task 2"}]
+
+
+def test_commit_tasks_detects_conflicts(task_file):
+    version = load_version(task_file)
+    journal_update(1, {"completed": True}, task_file)  # Another writer commits first
+
+    with pytest.raises(WriteConflictError):
+        commit_tasks([], task_file, expected_version=version)
+    assert load_tasks(task_file) == [{"id": 1, "title": "Task 1", "completed": True}]
+
+    commit_tasks([], task_file, expected_version=version + 1)
+    assert load_tasks(task_file) == []
+
+
+def test_journal_commit_advances_next_id(task_file):
+    journal_add({"id": 7, "title": "Task 7"}, task_file)
+    assert load_next_id(task_file) == 8
+
+
+def test_queue_commits_burst_together(task_file):
+    queue = WriteBehindQueue(task_file, delay=60)
+    version = queue.version
+    for task_id in range(2, 6):
+        journal_add({"id": task_id, "title": f"Task {task_id}"}, task_file, writer=queue)
+    journal_update(1, {"completed": True}, task_file, writer=queue)
+
+    assert len(queue) == 5
+    assert load_tasks(task_file) == [{"id": 1, "title": "Task 1", "completed": False}]
+
+    assert queue.flush() == version + 1
+    assert len(queue) == 0
+    assert [task["id"] for task in load_tasks(task_file)] == [1, 2, 3, 4, 5]
+    assert load_tasks(task_file)[0]["completed"] is True
+    assert load_next_id(task_file) == 6
+
+
+def test_queue_commits_after_delay(task_file):
+    committed = threading.Event()
+    queue = WriteBehindQueue(task_file, delay=0.01, on_commit=lambda _: committed.set())
+    journal_update(1, {"title": "Renamed"}, task_file, writer=queue)
+
+    assert committed.wait(5)
+    assert load_tasks(task_file)[0]["title"] == "Renamed"
+
+
+def test_queue_reports_external_changes(task_file):
+    on_commit = MagicMock()
+    queue = WriteBehindQueue(task_file, delay=60, on_commit=on_commit)
+
+    journal_update(1, {"title": "Mine"}, task_file, writer=queue)
+    queue.flush()
+    on_commit.assert_called_once_with(False)
+
+    journal_update(1, {"completed": True}, task_file)  # Another writer
+    journal_update(1, {"title": "Mine again"}, task_file, writer=queue)
+    queue.flush()
+    on_commit.assert_called_with(True)
+    assert load_tasks(task_file) == [{"id": 1, "title": "Mine again", "completed": True}]
+
+
+def test_concurrent_queues_lose_no_updates(task_file):
+    queues = [WriteBehindQueue(task_file, delay=0.001) for _ in range(4)]
+
+    def write(queue, first_id):
+        for task_id in range(first_id, first_id + 50):
+            journal_add({"id": task_id}, task_file, writer=queue)
+        queue.close()
+
+    with patch("src.journal.JOURNAL_COMPACT_THRESHOLD", 2048):
+        threads = [
+            threading.Thread(target=write, args=(queue, 100 * (number + 1)))
+            for number, queue in enumerate(queues)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(load_tasks(task_file)) == 1 + 4 * 50
+
+
+def test_writers_with_own_cached_tasks_allocate_distinct_ids(task_file):
+    # Two app processes, each with its own copy of the tasks and its own queue
+    writers = [
+        (TaskStore(load_tasks(task_file)), WriteBehindQueue(task_file, delay=60))
+        for _ in range(2)
+    ]
+    for number, (store, queue) in enumerate(writers):
+        task_id = reserve_task_ids(file_path=task_file, tasks=store)
+        add_task(store, f"Writer {number}", "", "Low", "Work", "2000-01-01", task_id=task_id)
+        journal_add(store.get(task_id), task_file, writer=queue)
+    for _, queue in writers:
+        queue.flush()
+
+    assert [task["title"] for task in load_tasks(task_file)] == ["Task 1", "Writer 0", "Writer 1"]
+    assert reserve_task_ids(2, task_file) == 4 and load_next_id(task_file) == 6
+
+
+def test_save_tasks_advances_version(task_file):
+    version = load_version(task_file)
+    journal_update(1, {"completed": True}, task_file)
+    save_tasks([{"id": 2, "title": "Task 2"}], task_file)
+
+    assert load_version(task_file) == version + 2
+    assert not os.path.exists(get_journal_path(task_file))
+    assert sorted(os.listdir(os.path.dirname(task_file))) == [
+        "tasks.json",
+        "tasks.json.lock",
+        "tasks.json.meta",
+    ]